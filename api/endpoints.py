@@ -1,21 +1,89 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Request
 from fastapi.responses import JSONResponse
 from pathlib import Path
-import os
-import json
 
-from services.document_processor import DocumentProcessor
-from services.webhook import WebhookService
-from config.settings import API_KEY
+from services.document_processor import DocumentProcessor, IMAGE_EXTENSIONS
+from services.async_document_processor import AsyncDocumentProcessor
+from services.circuit_breaker import CircuitOpenError
+from services.executor import PipelineExecutor, PipelineQueueFullError
+from services.job_queue import JobQueue, JobQueueFullError
+from services.hedging import chat_hedging
+from services.prompt_builder import prompt_stats
+from services.rate_limiter import RateLimitExceededError, get_scheduler
+from services.webhook import InvalidCallbackURLError, WebhookService, validate_callback_url
+from config.settings import (
+    API_KEY,
+    PIPELINE_MODE,
+    PIPELINE_EXECUTOR,
+    PIPELINE_MAX_WORKERS,
+    PIPELINE_MAX_PENDING,
+    PIPELINE_RETRY_AFTER_SECONDS,
+    UPLOAD_SPOOL_DIR,
+    UPLOAD_CHUNK_SIZE,
+    MAX_UPLOAD_BYTES,
+    BATCH_MAX_FILES,
+    BATCH_MAX_CONCURRENCY,
+    JOB_WORKERS,
+    JOB_QUEUE_MAX_SIZE,
+    JOB_RESULT_TTL_SECONDS,
+    JOB_MAX_WAIT_SECONDS,
+)
 from utils.logger import logger
+from utils.post_processing.models import ExtractionResult
+from utils.post_processing.fast_extractor import fast_path_stats
+from utils.upload_spool import (
+    ReceivedUpload,
+    UploadTooLargeError,
+    discard_received_upload,
+    read_upload,
+    spool_upload,
+)
 
 router = APIRouter()
 webhook_service = WebhookService()
+pipeline_executor = PipelineExecutor(
+    kind=PIPELINE_EXECUTOR,
+    max_workers=PIPELINE_MAX_WORKERS,
+    max_pending=PIPELINE_MAX_PENDING,
+    retry_after=PIPELINE_RETRY_AFTER_SECONDS,
+)
+job_queue = JobQueue(
+    workers=JOB_WORKERS,
+    max_size=JOB_QUEUE_MAX_SIZE,
+    result_ttl=JOB_RESULT_TTL_SECONDS,
+    retry_after=PIPELINE_RETRY_AFTER_SECONDS,
+    max_wait=JOB_MAX_WAIT_SECONDS,
+    webhook_service=webhook_service,
+)
+
+
+# Margen por archivo para los encabezados y separadores del multipart y los campos del formulario
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+def upload_body_limit(path: str) -> Optional[int]:
+    """Tamaño máximo del cuerpo de las rutas que reciben archivos, o None para las demás."""
+    if path.endswith("/upload-documents/"):
+        files = BATCH_MAX_FILES
+    elif path.endswith("/upload-document/") or path.endswith("/jobs"):
+        files = 1
+    else:
+        return None
+    return files * (MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES)
+
 
+def create_document_processor(client, result_cache=None, ocr_cache=None) -> DocumentProcessor:
+    """Crea el procesador de documentos del modo configurado sobre el cliente Mistral compartido."""
+    processor_class = AsyncDocumentProcessor if PIPELINE_MODE == "async" else DocumentProcessor
+    return processor_class(api_key=API_KEY, client=client, result_cache=result_cache, ocr_cache=ocr_cache)
 
-def get_document_processor() -> DocumentProcessor:
+
+def get_document_processor(request: Request) -> DocumentProcessor:
     """Función de inyección de dependencias para obtener la instancia de DocumentProcessor."""
-    return DocumentProcessor(api_key=API_KEY)
+    return request.app.state.document_processor
 
 
 @router.post("/upload-document/")
@@ -24,45 +92,188 @@ async def upload_document(
     document_processor: DocumentProcessor = Depends(get_document_processor)
 ):
     """Endpoint para la carga y procesamiento de documentos (imágenes o PDF)."""
-    # Guardar el archivo en un directorio temporal
-    tmp_dir = Path("/tmp")
-    tmp_dir.mkdir(exist_ok=True)
-    file_path = tmp_dir / file.filename
+    response_json = await process_upload(file, document_processor)
+    return JSONResponse(content=response_json)
+
+
+@router.post("/upload-documents/")
+async def upload_documents(
+    files: List[UploadFile] = File(...),
+    document_processor: DocumentProcessor = Depends(get_document_processor)
+):
+    """Endpoint para procesar varios documentos en una sola solicitud.
+
+    Los archivos se procesan en paralelo, con un máximo de BATCH_MAX_CONCURRENCY a la vez,
+    y la respuesta incluye el resultado o el error de cada archivo en el orden recibido.
+    """
+    if len(files) > BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"Too many files. Maximum per batch is {BATCH_MAX_FILES}.")
+
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+
+    async def process_one(file: UploadFile) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                result = await process_upload(file, document_processor)
+                return {"filename": file.filename, "status": "ok", "result": result}
+            except HTTPException as e:
+                return {"filename": file.filename, "status": "error", "status_code": e.status_code, "error": e.detail}
+
+    results = await asyncio.gather(*(process_one(file) for file in files))
+    return JSONResponse(content={"results": results})
+
+
+@router.post("/jobs", status_code=202)
+async def create_job(
+    request: Request,
+    file: UploadFile = File(...),
+    callback_url: Optional[str] = Form(None),
+):
+    """Encola un documento para procesarlo en segundo plano y retorna el id del trabajo.
+
+    El estado y el resultado se consultan en GET /jobs/{job_id}; si se indica callback_url,
+    el resultado final también se envía por POST a esa URL, que debe ser http(s) y pública.
+    """
+    if callback_url:
+        try:
+            await asyncio.to_thread(validate_callback_url, callback_url)
+        except InvalidCallbackURLError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    received = await receive_upload(file)
+    try:
+        job = job_queue.submit(received, callback_url)
+    except JobQueueFullError as e:
+        discard_received_upload(received)
+        raise HTTPException(
+            status_code=503,
+            detail="Job queue is full. Please retry later.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    return {"job_id": job.id, "status": job.status, "status_url": str(request.url_for("get_job", job_id=job.id))}
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Retorna el estado de un trabajo y, si terminó, su resultado o error."""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job.to_dict()
 
+
+async def process_upload(file: UploadFile, document_processor: DocumentProcessor) -> ExtractionResult:
+    """Valida, recibe y procesa un archivo subido, retornando la respuesta estructurada.
+
+    :raises HTTPException: Con el código de estado correspondiente si el archivo no puede procesarse.
+    """
+    received = await receive_upload(file)
+    try:
+        response = await run_pipeline(received, document_processor)
+    except PipelineQueueFullError as e:
+        logger.warning(f"Documento rechazado por saturación: {file.filename}")
+        raise HTTPException(
+            status_code=503,
+            detail="Service is busy processing other documents. Please retry later.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except RateLimitExceededError as e:
+        # Cuota de Mistral agotada: es saturación esperable, no un error que deba alertarse
+        logger.warning(f"Documento rechazado por límite de Mistral: {file.filename}")
+        raise HTTPException(
+            status_code=503,
+            detail="Document extraction quota is temporarily exhausted. Please retry later.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except CircuitOpenError as e:
+        # El circuito ya alertó al abrirse en los logs; no repetir la alerta por cada documento
+        logger.warning(f"Documento rechazado con el circuito '{e.endpoint}' abierto: {file.filename}")
+        raise HTTPException(
+            status_code=503,
+            detail="Document extraction service is temporarily unavailable. Please retry later.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except Exception as e:
+        logger.error(f"Error processing document: {e}")
+        webhook_service.send_to_webhook(f"Error processing document: {e}")
+        raise HTTPException(status_code=500, detail=f"Error processing document: {e}")
+    finally:
+        # Eliminar el archivo temporal aunque el procesamiento falle
+        discard_received_upload(received)
+
+    return response
+
+
+async def receive_upload(file: UploadFile) -> ReceivedUpload:
+    """Valida el tipo de archivo y lo recibe: las imágenes en memoria y los PDF en un temporal único.
+
+    :raises HTTPException: 415 si el tipo no es soportado, 413 si supera el tamaño máximo, 500 si falla la lectura.
+    """
     # Validar el tipo de archivo
-    file_ext = file_path.suffix.lower()
-    if file_ext not in ['.jpg', '.jpeg', '.png', '.pdf']:
+    file_ext = Path(file.filename or "").suffix.lower()
+    if file_ext not in IMAGE_EXTENSIONS and file_ext != '.pdf':
         logger.error(f"Unsupported file type: {file_ext}")
         webhook_service.send_to_webhook(f"Unsupported file type: {file_ext}")
         raise HTTPException(status_code=415, detail="Unsupported file type. Only PDFs and images are allowed.")
 
     try:
-        with open(file_path, "wb") as buffer:
-            buffer.write(await file.read())
+        if file_ext == '.pdf':
+            spooled = await spool_upload(file, file_ext, UPLOAD_SPOOL_DIR, MAX_UPLOAD_BYTES, UPLOAD_CHUNK_SIZE)
+            return ReceivedUpload(file.filename, file_ext, spooled.content_hash, path=spooled.path)
+        buffered = await read_upload(file, MAX_UPLOAD_BYTES, UPLOAD_CHUNK_SIZE)
+        return ReceivedUpload(file.filename, file_ext, buffered.content_hash, data=buffered.data)
+    except UploadTooLargeError as e:
+        logger.warning(f"Upload too large: {file.filename}")
+        raise HTTPException(status_code=413, detail=f"File too large. Maximum size is {e.max_bytes} bytes.")
     except Exception as e:
         logger.error(f"Error saving file: {e}")
         webhook_service.send_to_webhook(f"Error saving file: {e}")
         raise HTTPException(status_code=500, detail=f"Error saving file: {e}")
 
-    try:
-        response = document_processor.process_document(str(file_path))
-        response_json = json.loads(response)  # Convertir la cadena JSON a un objeto JSON
-    except Exception as e:
-        logger.error(f"Error processing document: {e}")
-        webhook_service.send_to_webhook(f"Error processing document: {e}")
-        raise HTTPException(status_code=500, detail=f"Error processing document: {e}")
 
-    # Eliminar el archivo temporal después del procesamiento
-    try:
-        os.remove(file_path)
-    except Exception as e:
-        logger.warning(f"Error deleting file: {e}")
-        # Se podría registrar el error, pero no interrumpe la respuesta
-        pass
+async def run_pipeline(received: ReceivedUpload, document_processor: DocumentProcessor) -> ExtractionResult:
+    """Ejecuta el pipeline sobre una carga recibida a través del pool de procesamiento.
 
-    return JSONResponse(content=response_json)
+    :raises PipelineQueueFullError: Si la cola de admisión está llena.
+    :raises RateLimitExceededError: Si el presupuesto de llamadas a Mistral está agotado.
+    :raises CircuitOpenError: Si el circuito de algún endpoint de Mistral está abierto.
+    """
+    if received.path is not None:
+        return await pipeline_executor.process_document(document_processor, received.path, received.content_hash)
+    return await pipeline_executor.process_image_bytes(
+        document_processor, received.data, received.file_ext, received.content_hash
+    )
 
 
 @router.get("/health")
 async def health():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+
+@router.get("/metrics")
+async def metrics(request: Request):
+    """Expone contadores internos del servicio.
+
+    Con el pool de procesos cada worker tiene sus propias cachés, planificador y contadores,
+    que el proceso principal no puede leer; esas secciones se retornan como null.
+    """
+    pipeline = {"in_flight": pipeline_executor.in_flight, "capacity": pipeline_executor.capacity}
+    if pipeline_executor.runs_in_workers(request.app.state.document_processor):
+        local_sections = (
+            "result_cache", "ocr_cache", "prompt_tokens", "fast_path",
+            "rate_limit", "concurrency", "circuit_breakers", "chat_hedging",
+        )
+        return {"pipeline": pipeline, "jobs": job_queue.stats(), **dict.fromkeys(local_sections)}
+    result_cache = request.app.state.result_cache
+    ocr_cache = request.app.state.ocr_cache
+    return {
+        "pipeline": pipeline,
+        "result_cache": result_cache.stats() if result_cache is not None else None,
+        "ocr_cache": ocr_cache.stats() if ocr_cache is not None else None,
+        "jobs": job_queue.stats(),
+        "prompt_tokens": prompt_stats.snapshot(),
+        "fast_path": fast_path_stats.snapshot(),
+        "rate_limit": get_scheduler().stats(),
+        "concurrency": get_scheduler().concurrency_stats(),
+        "circuit_breakers": get_scheduler().circuit_stats(),
+        "chat_hedging": chat_hedging.snapshot(),
+    }
@@ -1,14 +1,61 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 import uvicorn
 
-from api.endpoints import router as document_router
+from api.endpoints import (
+    router as document_router,
+    pipeline_executor,
+    job_queue,
+    webhook_service,
+    create_document_processor,
+    run_pipeline,
+    upload_body_limit,
+)
+from api.middleware import BodySizeLimitMiddleware
+from config.settings import API_KEY
+from services.mistral_client import SharedMistralClient
+from services.caches import create_ocr_cache, create_result_cache
+from services.hedging import chat_hedging
+from services.rate_limiter import get_scheduler
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Un único cliente Mistral por proceso, compartido por todas las solicitudes
+    shared_client = SharedMistralClient(API_KEY)
+    app.state.mistral_client = shared_client
+    app.state.result_cache = create_result_cache()
+    app.state.ocr_cache = create_ocr_cache()
+    app.state.document_processor = create_document_processor(
+        shared_client.client, app.state.result_cache, app.state.ocr_cache
+    )
+    webhook_service.start()
+    job_queue.start(lambda received: run_pipeline(received, app.state.document_processor))
+    yield
+    await job_queue.stop()
+    # Entregar los resúmenes de alertas pendientes antes de apagar
+    await webhook_service.stop()
+    # Esperar a que terminen los documentos en curso antes de apagar
+    pipeline_executor.shutdown()
+    await shared_client.aclose()
+    chat_hedging.shutdown()
+    get_scheduler().close()
+    for cache in (app.state.result_cache, app.state.ocr_cache):
+        if cache is not None:
+            cache.close()
+
 
 app = FastAPI(
     title="Mistral API",
     version="1.0.0",
-    description="API para procesamiento de documentos utilizando Mistral para OCR y generación de respuestas estructuradas."
+    description="API para procesamiento de documentos utilizando Mistral para OCR y generación de respuestas estructuradas.",
+    lifespan=lifespan
 )
 
+# Rechazar las cargas demasiado grandes mientras se reciben, antes de interpretar el multipart
+app.add_middleware(BodySizeLimitMiddleware, limit_for=upload_body_limit)
+
 # Incluir los endpoints definidos en endpoints.py con un prefijo para la versión o agrupación
 app.include_router(document_router, prefix="/api")
 
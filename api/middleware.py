@@ -0,0 +1,74 @@
+from typing import Callable, Optional
+
+from fastapi import HTTPException
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from utils.logger import logger
+
+
+class _BodyTooLarge(HTTPException):
+    # HTTPException para que FastAPI no la convierta en un 400 al interpretar el formulario
+    def __init__(self, limit: int):
+        super().__init__(status_code=413, detail=f"Request body too large. Maximum size is {limit} bytes.")
+
+
+class BodySizeLimitMiddleware:
+    def __init__(self, app: ASGIApp, limit_for: Callable[[str], Optional[int]]):
+        """Rechaza con 413 los cuerpos de solicitud que superan el límite de su ruta mientras se reciben.
+
+        El límite se aplica antes de que Starlette interprete el multipart y lo vuelque a disco:
+        si Content-Length ya lo supera se responde sin leer el cuerpo, y si no se declara (o es
+        falso) se cuentan los bytes recibidos y se corta la recepción al superarlo.
+
+        :param app: Aplicación ASGI envuelta.
+        :param limit_for: Retorna el tamaño máximo del cuerpo para una ruta, o None si no tiene límite.
+        """
+        self.app = app
+        self.limit_for = limit_for
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limit = self.limit_for(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope.get("headers") or []).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            logger.warning(f"Cuerpo de {int(content_length)} bytes rechazado en {scope['path']} (máximo {limit})")
+            await self._reject(send, limit)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise _BodyTooLarge(limit)
+            return message
+
+        async def tracked_send(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except _BodyTooLarge:
+            logger.warning(f"Cuerpo rechazado en {scope['path']} al superar {limit} bytes durante la recepción")
+            if not response_started:
+                await self._reject(send, limit)
+
+    @staticmethod
+    async def _reject(send: Send, limit: int) -> None:
+        body = f'{{"detail":"Request body too large. Maximum size is {limit} bytes."}}'.encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
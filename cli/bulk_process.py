@@ -0,0 +1,194 @@
+"""Procesamiento masivo de documentos desde la línea de comandos.
+
+Recorre un directorio (o un manifiesto con una ruta por línea), procesa los documentos con
+DocumentProcessor en paralelo y escribe cada resultado en un archivo JSONL a medida que termina.
+Un archivo de checkpoint registra los documentos ya procesados para reanudar una ejecución
+interrumpida sin repetirlos. Los documentos fallidos se reintentan al reanudar, y su nuevo
+registro reemplaza al de error de la ejecución anterior.
+
+Uso:
+    python -m cli.bulk_process /ruta/documentos --output resultados.jsonl --concurrency 8
+    python -m cli.bulk_process --manifest rutas.txt --output resultados.jsonl
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Set
+
+from config.settings import API_KEY
+from services.caches import create_ocr_cache, create_result_cache
+from services.document_processor import DocumentProcessor, IMAGE_EXTENSIONS
+from services.mistral_client import SharedMistralClient
+from utils.logger import logger
+
+SUPPORTED_EXTENSIONS = set(IMAGE_EXTENSIONS) | {'.pdf'}
+
+
+def iter_documents(directory: Optional[str], manifest: Optional[str]) -> Iterator[str]:
+    """Genera las rutas de los documentos a procesar desde un directorio o un manifiesto."""
+    if manifest:
+        with open(manifest, encoding="utf-8") as f:
+            for line in f:
+                path = line.strip()
+                if path and not path.startswith("#"):
+                    yield path
+    if directory:
+        for path in sorted(Path(directory).rglob("*")):
+            if path.is_file() and path.suffix.lower() in SUPPORTED_EXTENSIONS:
+                yield str(path)
+
+
+def load_checkpoint(checkpoint_path: Path) -> Set[str]:
+    """Carga las rutas ya procesadas con éxito en ejecuciones anteriores."""
+    if not checkpoint_path.exists():
+        return set()
+    with open(checkpoint_path, encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def drop_retried_records(output_path: Path, done: Set[str]) -> int:
+    """Elimina del JSONL de una ejecución anterior los registros de los documentos que se reintentarán.
+
+    Solo se conservan los resultados correctos de documentos marcados en el checkpoint. Los
+    fallidos (y los correctos cuyo checkpoint no llegó a escribirse) se vuelven a procesar al
+    reanudar; sin esta limpieza el archivo tendría dos registros para el mismo documento.
+
+    :param output_path: Archivo JSONL de resultados.
+    :param done: Rutas ya procesadas con éxito según el checkpoint.
+    :return: Número de registros eliminados.
+    """
+    if not output_path.exists():
+        return 0
+    dropped = 0
+    temp_path = output_path.with_name(output_path.name + ".tmp")
+    with open(output_path, encoding="utf-8") as source, open(temp_path, "w", encoding="utf-8") as target:
+        for line in source:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Línea a medio escribir por una interrupción
+                record = {}
+            if record.get("status") == "ok" and record.get("file") in done:
+                target.write(line if line.endswith("\n") else line + "\n")
+            else:
+                dropped += 1
+    os.replace(temp_path, output_path)
+    return dropped
+
+
+class BulkRunner:
+    def __init__(self, processor: DocumentProcessor, output_path: Path, checkpoint_path: Path, concurrency: int):
+        """Ejecuta el procesamiento masivo escribiendo resultados y checkpoint de forma incremental.
+
+        :param processor: Procesador de documentos compartido por todos los hilos.
+        :param output_path: Archivo JSONL donde se añaden los resultados.
+        :param checkpoint_path: Archivo con las rutas ya procesadas con éxito.
+        :param concurrency: Número de documentos procesándose a la vez.
+        """
+        self.processor = processor
+        self.concurrency = concurrency
+        self._output = open(output_path, "a", encoding="utf-8")
+        self._checkpoint = open(checkpoint_path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self.succeeded = 0
+        self.failed = 0
+
+    def _process(self, path: str) -> None:
+        try:
+            result = self.processor.process_document(path)
+            record = {"file": path, "status": "ok", "result": result}
+        except Exception as e:
+            logger.error(f"Error procesando {path}: {e}")
+            record = {"file": path, "status": "error", "error": str(e)}
+
+        with self._lock:
+            self._output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._output.flush()
+            if record["status"] == "ok":
+                # Solo los documentos correctos se marcan como terminados; los fallidos se reintentan al reanudar
+                self._checkpoint.write(path + "\n")
+                self._checkpoint.flush()
+                self.succeeded += 1
+            else:
+                self.failed += 1
+
+    def run(self, paths: Iterable[str]) -> None:
+        """Procesa las rutas manteniendo como máximo 'concurrency' documentos en vuelo."""
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            pending = set()
+            for path in paths:
+                if len(pending) >= self.concurrency * 2:
+                    _, pending = wait(pending, return_when=FIRST_COMPLETED)
+                pending.add(executor.submit(self._process, path))
+            wait(pending)
+
+    def close(self) -> None:
+        self._output.close()
+        self._checkpoint.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Procesa masivamente documentos fiscales con Mistral.")
+    parser.add_argument("directory", nargs="?", help="Directorio con los documentos (se recorre recursivamente).")
+    parser.add_argument("--manifest", help="Archivo con una ruta de documento por línea.")
+    parser.add_argument("--output", required=True, help="Archivo JSONL donde se escriben los resultados.")
+    parser.add_argument("--checkpoint", help="Archivo de checkpoint (por defecto <output>.checkpoint).")
+    parser.add_argument("--concurrency", type=int, default=8, help="Documentos procesándose a la vez.")
+    args = parser.parse_args(argv)
+
+    if not args.directory and not args.manifest:
+        parser.error("Se requiere un directorio o --manifest")
+
+    output_path = Path(args.output)
+    checkpoint_path = Path(args.checkpoint or f"{args.output}.checkpoint")
+    done = load_checkpoint(checkpoint_path)
+    if done:
+        logger.info(f"Reanudando: {len(done)} documentos ya procesados se omitirán")
+    dropped = drop_retried_records(output_path, done)
+    if dropped:
+        logger.info(f"Reanudando: se eliminan {dropped} registros de documentos que se reintentarán")
+
+    shared_client = SharedMistralClient(API_KEY)
+    processor = DocumentProcessor(
+        api_key=API_KEY,
+        client=shared_client.client,
+        result_cache=create_result_cache(),
+        ocr_cache=create_ocr_cache(),
+    )
+    runner = BulkRunner(processor, output_path, checkpoint_path, args.concurrency)
+
+    skipped = 0
+
+    def pending_paths() -> Iterator[str]:
+        nonlocal skipped
+        for path in iter_documents(args.directory, args.manifest):
+            if path in done:
+                skipped += 1
+                continue
+            yield path
+
+    start = time.monotonic()
+    try:
+        runner.run(pending_paths())
+    except KeyboardInterrupt:
+        logger.warning("Ejecución interrumpida; el checkpoint permite reanudarla")
+    finally:
+        runner.close()
+        shared_client.http_client.close()
+
+    elapsed = time.monotonic() - start
+    processed = runner.succeeded + runner.failed
+    print(f"Procesados: {processed} (correctos: {runner.succeeded}, con error: {runner.failed}), omitidos: {skipped}")
+    print(f"Tiempo: {elapsed:.1f}s, rendimiento: {processed / elapsed if elapsed else 0:.2f} docs/s, "
+          f"tasa de error: {runner.failed / processed if processed else 0:.2%}")
+    return 1 if runner.failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
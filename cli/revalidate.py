@@ -0,0 +1,170 @@
+"""Revalidación masiva y local de resultados archivados.
+
+Lee un archivo JSONL con la respuesta original del modelo y el markdown OCR de cada documento,
+vuelve a aplicar FiscalDocumentValidator y ResponsePostProcessor en un pool de procesos y
+escribe los registros corregidos junto con un resumen de los campos que cambiaron. No se
+realiza ninguna llamada a Mistral, por lo que sirve para aplicar una corrección de
+utils/post_processing a todo el histórico.
+
+Cada línea de entrada es un objeto JSON con, al menos, la respuesta del modelo (cadena JSON
+u objeto) y el OCR. Si el registro incluye el resultado corregido anteriormente, el resumen
+compara contra él; si no, contra la respuesta original del modelo.
+
+Uso:
+    python -m cli.revalidate historico.jsonl --output revalidado.jsonl --workers 8
+    python -m cli.revalidate historico.jsonl --output revalidado.jsonl --raw-field response --ocr-field ocr
+"""
+import argparse
+import json
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Tuple
+
+from utils.logger import logger
+from utils.post_processing.models import parse_extraction
+from utils.post_processing.processor import ResponsePostProcessor
+from utils.post_processing.validators.fiscal_validator import FiscalDocumentValidator
+
+# Validador propio de cada proceso worker
+_validator = None
+
+
+def _flatten(value: Any, prefix: str = "") -> Dict[str, Any]:
+    """Aplana un resultado anidado en un diccionario ruta → valor (por ejemplo "location.country")."""
+    if isinstance(value, dict):
+        flat: Dict[str, Any] = {}
+        for key, item in value.items():
+            flat.update(_flatten(item, f"{prefix}.{key}" if prefix else key))
+        return flat
+    return {prefix: value}
+
+
+def changed_fields(before: Dict[str, Any], after: Dict[str, Any]) -> List[str]:
+    """Retorna las rutas de los campos cuyo valor difiere entre dos resultados."""
+    flat_before, flat_after = _flatten(before), _flatten(after)
+    return sorted(path for path in flat_before.keys() | flat_after.keys() if flat_before.get(path) != flat_after.get(path))
+
+
+def _revalidate_chunk(lines: List[str], raw_field: str, ocr_field: str, previous_field: str) -> Tuple[List[str], Counter, int, int]:
+    """Revalida un bloque de líneas JSONL dentro de un proceso worker.
+
+    :return: Tupla (líneas de salida, cambios por campo, registros modificados, registros con error).
+    """
+    global _validator
+    if _validator is None:
+        _validator = FiscalDocumentValidator()
+
+    output: List[str] = []
+    field_changes: Counter = Counter()
+    modified = 0
+    failed = 0
+    for line in lines:
+        try:
+            record = json.loads(line)
+            raw = record[raw_field]
+            data = parse_extraction(raw) if isinstance(raw, str) else raw
+            ocr_markdown = record.get(ocr_field) or ""
+            baseline = record.get(previous_field)
+            if baseline is None:
+                baseline = json.loads(json.dumps(data))
+
+            _validator.validate_data(data, ocr_markdown)
+            if not ResponsePostProcessor.process_data(data, ocr_markdown):
+                # El post-procesamiento falló: se conserva el resultado anterior sin contarlo como cambio
+                failed += 1
+                record["status"] = "error"
+                record["error"] = "Post-processing failed"
+                output.append(json.dumps(record, ensure_ascii=False))
+                continue
+
+            changes = changed_fields(baseline, data)
+            field_changes.update(changes)
+            if changes:
+                modified += 1
+            record[previous_field] = data
+            record["changes"] = changes
+        except Exception as e:
+            failed += 1
+            record = {"status": "error", "error": str(e), "line": line.rstrip("\n")}
+        output.append(json.dumps(record, ensure_ascii=False))
+    return output, field_changes, modified, failed
+
+
+def iter_chunks(path: str, chunk_size: int) -> Iterator[List[str]]:
+    """Lee el archivo JSONL en bloques de líneas no vacías."""
+    chunk: List[str] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                chunk.append(line)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+    if chunk:
+        yield chunk
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Revalida localmente resultados archivados sin llamar a Mistral.")
+    parser.add_argument("input", help="Archivo JSONL con la respuesta del modelo y el OCR de cada documento.")
+    parser.add_argument("--output", required=True, help="Archivo JSONL donde se escriben los registros corregidos.")
+    parser.add_argument("--summary", help="Archivo JSON donde se guarda el resumen de cambios.")
+    parser.add_argument("--raw-field", default="raw", help="Campo con la respuesta original del modelo.")
+    parser.add_argument("--ocr-field", default="ocr_markdown", help="Campo con el markdown OCR.")
+    parser.add_argument("--result-field", default="result",
+                        help="Campo con el resultado corregido anterior; se sobrescribe con el nuevo.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Procesos worker.")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Registros enviados a cada worker por bloque.")
+    args = parser.parse_args(argv)
+
+    field_changes: Counter = Counter()
+    total = modified = failed = 0
+    start = time.monotonic()
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor, open(args.output, "w", encoding="utf-8") as out:
+        # Ventana acotada de bloques en vuelo; se escriben en el orden de entrada
+        in_flight = deque()
+
+        def drain_one() -> None:
+            nonlocal total, modified, failed
+            lines, chunk_changes, chunk_modified, chunk_failed = in_flight.popleft().result()
+            out.write("\n".join(lines) + "\n")
+            field_changes.update(chunk_changes)
+            total += len(lines)
+            modified += chunk_modified
+            failed += chunk_failed
+
+        for chunk in iter_chunks(args.input, args.chunk_size):
+            if len(in_flight) >= args.workers * 2:
+                drain_one()
+            in_flight.append(
+                executor.submit(_revalidate_chunk, chunk, args.raw_field, args.ocr_field, args.result_field)
+            )
+        while in_flight:
+            drain_one()
+
+    elapsed = time.monotonic() - start
+    summary = {
+        "records": total,
+        "modified": modified,
+        "errors": failed,
+        "field_changes": dict(field_changes.most_common()),
+        "elapsed_seconds": round(elapsed, 2),
+    }
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    print(f"Revalidados: {total} (modificados: {modified}, con error: {failed}) en {elapsed:.1f}s, "
+          f"rendimiento: {total / elapsed if elapsed else 0:.0f} registros/s")
+    for path, count in field_changes.most_common(20):
+        print(f"  {path}: {count}")
+    if failed:
+        logger.warning(f"{failed} registros no pudieron revalidarse; ver el campo 'error' en la salida")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -10,6 +10,120 @@ class Settings(BaseSettings):
     HOST: str
     PORT: int
     WEBHOOK_URL: str
+    # Las alertas idénticas dentro de la ventana se agrupan en un solo mensaje con el número de repeticiones
+    WEBHOOK_COALESCE_WINDOW_SECONDS: float = 60.0
+    WEBHOOK_MAX_PENDING: int = 100
+    WEBHOOK_TIMEOUT_SECONDS: float = 10.0
+
+    # Ejecución del pipeline fuera del event loop
+    PIPELINE_MODE: str = "executor"  # "executor" (pool de hilos/procesos) o "async" (SDK asíncrono)
+    PIPELINE_EXECUTOR: str = "thread"  # "thread" o "process"
+    PIPELINE_MAX_WORKERS: int = 8
+    # Solicitudes admitidas en espera además de las que ya están en ejecución
+    PIPELINE_MAX_PENDING: int = 32
+    # Segundos sugeridos al cliente en la cabecera Retry-After cuando la cola está llena
+    PIPELINE_RETRY_AFTER_SECONDS: int = 5
+
+    # Recepción de archivos: se copian por bloques a un temporal único por solicitud
+    UPLOAD_SPOOL_DIR: str = "/tmp"
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    MAX_UPLOAD_BYTES: int = 25 * 1024 * 1024
+
+    # Carga de varios documentos en una sola solicitud
+    BATCH_MAX_FILES: int = 10
+    BATCH_MAX_CONCURRENCY: int = 4
+
+    # Trabajos en segundo plano (POST /api/jobs)
+    JOB_WORKERS: int = 4
+    JOB_QUEUE_MAX_SIZE: int = 100
+    JOB_RESULT_TTL_SECONDS: int = 3600
+    # Segundos máximos que un trabajo espera por saturación (pool, cuota o circuito abierto) antes de fallar
+    JOB_MAX_WAIT_SECONDS: float = 900.0
+    # Hosts permitidos para callback_url separados por comas (vacío = cualquier host público)
+    JOB_CALLBACK_ALLOWED_HOSTS: str = ""
+
+    # Pool de conexiones HTTP del cliente Mistral compartido
+    MISTRAL_MAX_CONNECTIONS: int = 100
+    MISTRAL_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    MISTRAL_KEEPALIVE_EXPIRY: float = 30.0
+    MISTRAL_HTTP2: bool = False
+    MISTRAL_TIMEOUT_SECONDS: float = 120.0
+
+    # Presupuesto de llamadas a Mistral (ocr, files y chat) y reintentos ante 429/5xx
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_REQUESTS_PER_MINUTE: int = 300  # 0 = sin límite
+    RATE_LIMIT_TOKENS_PER_MINUTE: int = 1000000  # 0 = sin límite
+    # Archivo SQLite con el saldo compartido entre workers de uvicorn (vacío = saldo propio de cada proceso)
+    RATE_LIMIT_STATE_PATH: str = "/tmp/mistral-rate-limit.db"
+    RATE_LIMIT_MAX_RETRIES: int = 5
+    RATE_LIMIT_BACKOFF_BASE_SECONDS: float = 1.0
+    RATE_LIMIT_BACKOFF_MAX_SECONDS: float = 60.0
+    # Espera máxima por presupuesto antes de responder 503 con Retry-After
+    RATE_LIMIT_MAX_WAIT_SECONDS: float = 60.0
+
+    # Límite adaptativo (AIMD) de llamadas simultáneas a Mistral por etapa: crece mientras la
+    # latencia está bajo el objetivo y se reduce ante timeouts y errores 429/5xx
+    ADAPTIVE_CONCURRENCY_ENABLED: bool = True
+    ADAPTIVE_CONCURRENCY_BACKOFF_RATIO: float = 0.5
+    OCR_CONCURRENCY_INITIAL: int = 8
+    OCR_CONCURRENCY_MIN: int = 1
+    OCR_CONCURRENCY_MAX: int = 64
+    OCR_LATENCY_TARGET_SECONDS: float = 30.0
+    CHAT_CONCURRENCY_INITIAL: int = 8
+    CHAT_CONCURRENCY_MIN: int = 1
+    CHAT_CONCURRENCY_MAX: int = 64
+    CHAT_LATENCY_TARGET_SECONDS: float = 20.0
+
+    # Hedging del chat: si la llamada supera el percentil de latencia reciente se lanza una copia
+    # y se toma la primera respuesta; las copias no superan CHAT_HEDGE_MAX_RATIO de las llamadas
+    CHAT_HEDGING_ENABLED: bool = False
+    CHAT_HEDGE_PERCENTILE: float = 95.0
+    CHAT_HEDGE_MAX_RATIO: float = 0.1
+    CHAT_HEDGE_MIN_SAMPLES: int = 20
+
+    # Circuito por endpoint de Mistral (ocr, files, chat): tras varios fallos consecutivos (5xx,
+    # timeouts) las llamadas fallan de inmediato con 503 hasta que una llamada de prueba responde
+    CIRCUIT_BREAKER_ENABLED: bool = True
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_BREAKER_RECOVERY_SECONDS: float = 30.0
+    CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS: int = 1
+
+    # Modelos de Mistral utilizados en el pipeline
+    OCR_MODEL: str = "mistral-ocr-latest"
+    CHAT_MODEL: str = "pixtral-12b-latest"
+
+    # OCR en paralelo por rangos de páginas para PDFs largos
+    OCR_PAGE_PARALLEL_ENABLED: bool = True
+    OCR_PAGE_PARALLEL_MIN_PAGES: int = 10
+    OCR_PAGES_PER_CHUNK: int = 5
+    OCR_PAGE_CONCURRENCY: int = 4
+
+    # Preprocesamiento de imágenes antes del envío a Mistral
+    IMAGE_PREPROCESSING_ENABLED: bool = True
+    IMAGE_MAX_SIDE: int = 2048
+    IMAGE_JPEG_QUALITY: int = 85
+    # Las imágenes más pesadas se recomprimen aunque no superen IMAGE_MAX_SIDE
+    IMAGE_RECOMPRESS_MIN_BYTES: int = 1024 * 1024
+
+    # Caché de resultados por contenido del documento
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_MAX_ENTRIES: int = 1024
+    RESULT_CACHE_TTL_SECONDS: int = 86400
+    # Ruta del archivo SQLite para persistir la caché entre reinicios (vacío = solo memoria)
+    RESULT_CACHE_DISK_PATH: str = ""
+
+    # Caché del markdown OCR, independiente de la plantilla y del modelo de chat
+    OCR_CACHE_ENABLED: bool = True
+    OCR_CACHE_MAX_ENTRIES: int = 2048
+    OCR_CACHE_TTL_SECONDS: int = 604800
+
+    # Enviar al chat solo las reglas del país detectado en el OCR (si no se detecta, prompt completo)
+    PROMPT_COUNTRY_SPECIFIC: bool = True
+
+    # Extraer con reglas sobre el OCR, sin llamar al chat, los formularios conocidos (RUT, AFIP, SUNAT)
+    # cuyo número fiscal supera la verificación de su dígito
+    FAST_PATH_ENABLED: bool = False
+
     TEMPLATE: str = """
     Eres un experto en facturación y debes extraer información del documento en un JSON estructurado. 
     Asegúrate de respetar el formato y no inventar datos. Si algún dato no está en el documento, deja el campo vacío.
@@ -134,4 +248,72 @@ DEBUG = settings.DEBUG
 HOST = settings.HOST
 PORT = settings.PORT
 TEMPLATE = settings.TEMPLATE
-WEBHOOK_URL = settings.WEBHOOK_URL
\ No newline at end of file
+WEBHOOK_URL = settings.WEBHOOK_URL
+WEBHOOK_COALESCE_WINDOW_SECONDS = settings.WEBHOOK_COALESCE_WINDOW_SECONDS
+WEBHOOK_MAX_PENDING = settings.WEBHOOK_MAX_PENDING
+WEBHOOK_TIMEOUT_SECONDS = settings.WEBHOOK_TIMEOUT_SECONDS
+PIPELINE_MODE = settings.PIPELINE_MODE
+PIPELINE_EXECUTOR = settings.PIPELINE_EXECUTOR
+PIPELINE_MAX_WORKERS = settings.PIPELINE_MAX_WORKERS
+PIPELINE_MAX_PENDING = settings.PIPELINE_MAX_PENDING
+PIPELINE_RETRY_AFTER_SECONDS = settings.PIPELINE_RETRY_AFTER_SECONDS
+MISTRAL_MAX_CONNECTIONS = settings.MISTRAL_MAX_CONNECTIONS
+MISTRAL_MAX_KEEPALIVE_CONNECTIONS = settings.MISTRAL_MAX_KEEPALIVE_CONNECTIONS
+MISTRAL_KEEPALIVE_EXPIRY = settings.MISTRAL_KEEPALIVE_EXPIRY
+MISTRAL_HTTP2 = settings.MISTRAL_HTTP2
+MISTRAL_TIMEOUT_SECONDS = settings.MISTRAL_TIMEOUT_SECONDS
+RATE_LIMIT_ENABLED = settings.RATE_LIMIT_ENABLED
+RATE_LIMIT_REQUESTS_PER_MINUTE = settings.RATE_LIMIT_REQUESTS_PER_MINUTE
+RATE_LIMIT_TOKENS_PER_MINUTE = settings.RATE_LIMIT_TOKENS_PER_MINUTE
+RATE_LIMIT_STATE_PATH = settings.RATE_LIMIT_STATE_PATH
+RATE_LIMIT_MAX_RETRIES = settings.RATE_LIMIT_MAX_RETRIES
+RATE_LIMIT_BACKOFF_BASE_SECONDS = settings.RATE_LIMIT_BACKOFF_BASE_SECONDS
+RATE_LIMIT_BACKOFF_MAX_SECONDS = settings.RATE_LIMIT_BACKOFF_MAX_SECONDS
+RATE_LIMIT_MAX_WAIT_SECONDS = settings.RATE_LIMIT_MAX_WAIT_SECONDS
+ADAPTIVE_CONCURRENCY_ENABLED = settings.ADAPTIVE_CONCURRENCY_ENABLED
+ADAPTIVE_CONCURRENCY_BACKOFF_RATIO = settings.ADAPTIVE_CONCURRENCY_BACKOFF_RATIO
+OCR_CONCURRENCY_INITIAL = settings.OCR_CONCURRENCY_INITIAL
+OCR_CONCURRENCY_MIN = settings.OCR_CONCURRENCY_MIN
+OCR_CONCURRENCY_MAX = settings.OCR_CONCURRENCY_MAX
+OCR_LATENCY_TARGET_SECONDS = settings.OCR_LATENCY_TARGET_SECONDS
+CHAT_CONCURRENCY_INITIAL = settings.CHAT_CONCURRENCY_INITIAL
+CHAT_CONCURRENCY_MIN = settings.CHAT_CONCURRENCY_MIN
+CHAT_CONCURRENCY_MAX = settings.CHAT_CONCURRENCY_MAX
+CHAT_LATENCY_TARGET_SECONDS = settings.CHAT_LATENCY_TARGET_SECONDS
+CHAT_HEDGING_ENABLED = settings.CHAT_HEDGING_ENABLED
+CHAT_HEDGE_PERCENTILE = settings.CHAT_HEDGE_PERCENTILE
+CHAT_HEDGE_MAX_RATIO = settings.CHAT_HEDGE_MAX_RATIO
+CHAT_HEDGE_MIN_SAMPLES = settings.CHAT_HEDGE_MIN_SAMPLES
+CIRCUIT_BREAKER_ENABLED = settings.CIRCUIT_BREAKER_ENABLED
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD
+CIRCUIT_BREAKER_RECOVERY_SECONDS = settings.CIRCUIT_BREAKER_RECOVERY_SECONDS
+CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS = settings.CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS
+OCR_MODEL = settings.OCR_MODEL
+CHAT_MODEL = settings.CHAT_MODEL
+RESULT_CACHE_ENABLED = settings.RESULT_CACHE_ENABLED
+RESULT_CACHE_MAX_ENTRIES = settings.RESULT_CACHE_MAX_ENTRIES
+RESULT_CACHE_TTL_SECONDS = settings.RESULT_CACHE_TTL_SECONDS
+RESULT_CACHE_DISK_PATH = settings.RESULT_CACHE_DISK_PATH
+OCR_CACHE_ENABLED = settings.OCR_CACHE_ENABLED
+OCR_CACHE_MAX_ENTRIES = settings.OCR_CACHE_MAX_ENTRIES
+OCR_CACHE_TTL_SECONDS = settings.OCR_CACHE_TTL_SECONDS
+PROMPT_COUNTRY_SPECIFIC = settings.PROMPT_COUNTRY_SPECIFIC
+FAST_PATH_ENABLED = settings.FAST_PATH_ENABLED
+UPLOAD_SPOOL_DIR = settings.UPLOAD_SPOOL_DIR
+UPLOAD_CHUNK_SIZE = settings.UPLOAD_CHUNK_SIZE
+MAX_UPLOAD_BYTES = settings.MAX_UPLOAD_BYTES
+BATCH_MAX_FILES = settings.BATCH_MAX_FILES
+BATCH_MAX_CONCURRENCY = settings.BATCH_MAX_CONCURRENCY
+JOB_WORKERS = settings.JOB_WORKERS
+JOB_QUEUE_MAX_SIZE = settings.JOB_QUEUE_MAX_SIZE
+JOB_RESULT_TTL_SECONDS = settings.JOB_RESULT_TTL_SECONDS
+JOB_MAX_WAIT_SECONDS = settings.JOB_MAX_WAIT_SECONDS
+JOB_CALLBACK_ALLOWED_HOSTS = [host.strip().lower() for host in settings.JOB_CALLBACK_ALLOWED_HOSTS.split(",") if host.strip()]
+OCR_PAGE_PARALLEL_ENABLED = settings.OCR_PAGE_PARALLEL_ENABLED
+OCR_PAGE_PARALLEL_MIN_PAGES = settings.OCR_PAGE_PARALLEL_MIN_PAGES
+OCR_PAGES_PER_CHUNK = settings.OCR_PAGES_PER_CHUNK
+OCR_PAGE_CONCURRENCY = settings.OCR_PAGE_CONCURRENCY
+IMAGE_PREPROCESSING_ENABLED = settings.IMAGE_PREPROCESSING_ENABLED
+IMAGE_MAX_SIDE = settings.IMAGE_MAX_SIDE
+IMAGE_JPEG_QUALITY = settings.IMAGE_JPEG_QUALITY
+IMAGE_RECOMPRESS_MIN_BYTES = settings.IMAGE_RECOMPRESS_MIN_BYTES
\ No newline at end of file
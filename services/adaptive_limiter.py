@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+from utils.logger import logger
+
+
+class _Waiter:
+    """Llamada en espera de un cupo; el cupo se le entrega ya reservado al despertarla."""
+
+    __slots__ = ("wake", "granted")
+
+    def __init__(self, wake: Callable[[], None]):
+        self.wake = wake
+        self.granted = False
+
+
+class AdaptiveLimiter:
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        latency_target: float = 30.0,
+        backoff_ratio: float = 0.5,
+    ):
+        """Límite de llamadas simultáneas que se ajusta con AIMD según la latencia y los errores.
+
+        Cada llamada terminada por debajo de la latencia objetivo suma 1/limit al límite (un
+        cupo más por cada ronda completa de llamadas); un timeout o un 429/5xx lo multiplica
+        por backoff_ratio, como mucho una vez por cada ronda de llamadas en vuelo.
+
+        :param name: Nombre de la etapa ("ocr" o "chat"), usado en los logs y métricas.
+        :param initial_limit: Límite inicial de llamadas simultáneas.
+        :param min_limit: Límite mínimo.
+        :param max_limit: Límite máximo.
+        :param latency_target: Latencia en segundos por debajo de la cual se aumenta el límite.
+        :param backoff_ratio: Factor por el que se multiplica el límite ante congestión.
+        """
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff_ratio = backoff_ratio
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        self._waiters: "deque[_Waiter]" = deque()
+        self._last_decrease_at = 0.0
+        self._lock = threading.Lock()
+        self.decreases = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def _try_acquire_locked(self) -> bool:
+        if not self._waiters and self._in_flight < self.limit:
+            self._in_flight += 1
+            return True
+        return False
+
+    def _wake_waiters_locked(self) -> None:
+        """Entrega los cupos libres a las llamadas en espera, en orden de llegada."""
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+            self._in_flight += 1
+            waiter.wake()
+
+    def acquire(self) -> float:
+        """Espera un cupo de forma síncrona y retorna el instante de inicio de la llamada."""
+        with self._lock:
+            if self._try_acquire_locked():
+                return time.monotonic()
+            event = threading.Event()
+            self._waiters.append(_Waiter(event.set))
+        event.wait()
+        return time.monotonic()
+
+    def try_acquire(self) -> Optional[float]:
+        """Toma un cupo solo si hay uno libre sin esperar; retorna el instante de inicio o None."""
+        with self._lock:
+            return time.monotonic() if self._try_acquire_locked() else None
+
+    def abandon(self) -> None:
+        """Devuelve un cupo que no llegó a usarse, sin ajustar el límite."""
+        with self._lock:
+            self._in_flight -= 1
+            self._wake_waiters_locked()
+
+    async def acquire_async(self) -> float:
+        """Espera un cupo sin bloquear el event loop y retorna el instante de inicio de la llamada."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._try_acquire_locked():
+                return time.monotonic()
+            future = loop.create_future()
+            waiter = _Waiter(lambda: loop.call_soon_threadsafe(_resolve, future))
+            self._waiters.append(waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.granted:
+                    # El cupo ya se había entregado: devolverlo a la siguiente llamada
+                    self._in_flight -= 1
+                    self._wake_waiters_locked()
+                else:
+                    self._waiters.remove(waiter)
+            raise
+        return time.monotonic()
+
+    def release(self, started_at: float, congested: bool = False) -> None:
+        """Libera el cupo y ajusta el límite según el resultado de la llamada.
+
+        :param started_at: Instante retornado por acquire.
+        :param congested: True si la llamada terminó en timeout o en un error 429/5xx.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._in_flight -= 1
+            if congested:
+                # Las llamadas iniciadas antes del último recorte pertenecen a la misma congestión
+                if started_at >= self._last_decrease_at:
+                    previous = self.limit
+                    self._limit = max(float(self.min_limit), self._limit * self.backoff_ratio)
+                    self._last_decrease_at = now
+                    self.decreases += 1
+                    if self.limit != previous:
+                        logger.warning(f"Límite de concurrencia '{self.name}' reducido de {previous} a {self.limit}")
+            elif now - started_at <= self.latency_target:
+                self._limit = min(float(self.max_limit), self._limit + 1 / self._limit)
+            self._wake_waiters_locked()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "waiting": len(self._waiters),
+                "decreases": self.decreases,
+            }
+
+
+def _resolve(future: "asyncio.Future[Optional[bool]]") -> None:
+    if not future.done():
+        future.set_result(True)
@@ -0,0 +1,96 @@
+import asyncio
+from pathlib import Path
+from typing import Any, Optional
+
+from mistralai import Mistral
+from services.document_processor import DocumentProcessor, IMAGE_EXTENSIONS
+from services.ocr_processor import AsyncOCRProcessor
+from services.chat_processor import AsyncChatProcessor
+from utils.cache import LayeredCache
+from utils.post_processing.validators.fiscal_validator import FiscalDocumentValidator
+from utils.post_processing.processor import ResponsePostProcessor
+from utils.post_processing.models import ExtractionResult
+from utils.file_encoder import FileEncoder
+from utils.image_preprocessor import preprocess_image
+from utils.logger import logger
+
+
+class AsyncDocumentProcessor(DocumentProcessor):
+    def __init__(
+        self,
+        api_key: str,
+        client: Optional[Any] = None,
+        result_cache: Optional[LayeredCache] = None,
+        ocr_cache: Optional[LayeredCache] = None,
+    ):
+        """Inicializa el procesador asíncrono de documentos con las variantes asíncronas de OCR y chat.
+
+        :param api_key: Clave API de Mistral, usada solo si no se recibe un cliente.
+        :param client: Cliente Mistral compartido; si se omite se crea uno propio.
+        :param result_cache: Caché de resultados por contenido; si se omite no se cachea.
+        :param ocr_cache: Caché de markdown OCR por contenido; si se omite no se cachea.
+        """
+        self.client = client if client is not None else Mistral(api_key=api_key)
+        self.ocr_processor = AsyncOCRProcessor(self.client, ocr_cache)
+        self.chat_processor = AsyncChatProcessor(self.client)
+        self.fiscal_validator = FiscalDocumentValidator()
+        self.post_processor = ResponsePostProcessor()
+        self.result_cache = result_cache
+
+    async def process_document(self, file_path: str, content_hash: Optional[str] = None) -> ExtractionResult:
+        """Procesa de forma asíncrona un documento (imagen o PDF) y retorna el resultado de la extracción.
+
+        Las llamadas a Mistral se realizan como corrutinas, por lo que un único proceso
+        puede mantener muchos documentos en vuelo sin ocupar un hilo por cada uno. La
+        lectura del archivo, su hash y las cachés (con capa SQLite en disco) bloquean, por lo
+        que se ejecutan en hilos para no detener al resto de solicitudes del event loop.
+
+        :param file_path: Ruta del archivo a procesar.
+        :param content_hash: SHA-256 del archivo, si ya fue calculado por el llamador.
+        :return: Resultado de la extracción, validado y post-procesado.
+        :raises ValueError: Si el tipo de archivo no es soportado.
+        """
+        file_ext = Path(file_path).suffix.lower()
+
+        if file_ext in IMAGE_EXTENSIONS:
+            image_bytes = await asyncio.to_thread(Path(file_path).read_bytes)
+            return await self.process_image_bytes(image_bytes, file_ext, content_hash)
+        elif file_ext == ".pdf":
+            if content_hash is None and self._uses_content_hash():
+                content_hash = await asyncio.to_thread(FileEncoder.hash_file, file_path)
+            cache_key, cached = await asyncio.to_thread(self._get_cached_result, content_hash)
+            if cached is not None:
+                return cached
+
+            ocr_markdown = await self.ocr_processor.process_pdf(file_path, content_hash)
+            structured_response = self._try_fast_path(ocr_markdown)
+            if structured_response is None:
+                structured_response = await self.chat_processor.get_structured_response_text(ocr_markdown)
+            return await asyncio.to_thread(self._finish, structured_response, ocr_markdown, cache_key)
+        else:
+            logger.error(f"Tipo de archivo no soportado: {file_ext}")
+            raise ValueError("Tipo de archivo no soportado. Solo se permiten PDFs e imágenes (JPG, JPEG, PNG, WEBP, GIF).")
+
+    async def process_image_bytes(self, image_bytes: bytes, file_ext: str, content_hash: Optional[str] = None) -> ExtractionResult:
+        """Procesa de forma asíncrona una imagen recibida en memoria.
+
+        :param image_bytes: Contenido de la imagen.
+        :param file_ext: Extensión original del archivo (por ejemplo ".png").
+        :param content_hash: SHA-256 de la imagen, si ya fue calculado por el llamador.
+        :return: Resultado de la extracción, validado y post-procesado.
+        """
+        if content_hash is None and self._uses_content_hash():
+            content_hash = await asyncio.to_thread(FileEncoder.hash_bytes, image_bytes)
+        cache_key, cached = await asyncio.to_thread(self._get_cached_result, content_hash)
+        if cached is not None:
+            return cached
+
+        # El redimensionado usa CPU, se ejecuta fuera del event loop
+        prepared_bytes, mime_type = await asyncio.to_thread(preprocess_image, image_bytes, file_ext)
+        base64_data_url = FileEncoder.to_data_url(prepared_bytes, mime_type)
+        ocr_markdown = await self.ocr_processor.process_image_data_url(base64_data_url, content_hash)
+        structured_response = self._try_fast_path(ocr_markdown)
+        if structured_response is None:
+            structured_response = await self.chat_processor.get_structured_response_image(base64_data_url, ocr_markdown)
+        # La validación y el post-procesamiento son ligeros, pero _finish escribe en la caché de resultados
+        return await asyncio.to_thread(self._finish, structured_response, ocr_markdown, cache_key)
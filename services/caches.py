@@ -0,0 +1,78 @@
+import hashlib
+from typing import Optional
+
+from config.settings import (
+    TEMPLATE,
+    PROMPT_COUNTRY_SPECIFIC,
+    FAST_PATH_ENABLED,
+    OCR_MODEL,
+    CHAT_MODEL,
+    RESULT_CACHE_ENABLED,
+    RESULT_CACHE_MAX_ENTRIES,
+    RESULT_CACHE_TTL_SECONDS,
+    RESULT_CACHE_DISK_PATH,
+    OCR_CACHE_ENABLED,
+    OCR_CACHE_MAX_ENTRIES,
+    OCR_CACHE_TTL_SECONDS,
+)
+from utils.cache import DiskCache, LayeredCache, MemoryCache
+from utils.logger import logger
+
+# Hash de la plantilla y del modo de extracción: un cambio en el prompt invalida los resultados anteriores
+_TEMPLATE_HASH = hashlib.sha256(
+    f"{TEMPLATE}:{PROMPT_COUNTRY_SPECIFIC}:{FAST_PATH_ENABLED}".encode("utf-8")
+).hexdigest()[:16]
+
+
+def result_cache_key(content_hash: str) -> str:
+    """Construye la clave de caché de un resultado a partir del hash del documento.
+
+    :param content_hash: SHA-256 del contenido del archivo subido.
+    :return: Clave que combina el contenido, la plantilla y los modelos utilizados.
+    """
+    return f"{content_hash}:{_TEMPLATE_HASH}:{OCR_MODEL}:{CHAT_MODEL}"
+
+
+def ocr_cache_key(content_hash: str) -> str:
+    """Construye la clave de caché del OCR a partir del hash del documento.
+
+    El markdown del OCR solo depende del contenido y del modelo OCR, no de la plantilla
+    ni del modelo de chat, por lo que sobrevive a cambios de prompt o post-procesamiento.
+
+    :param content_hash: SHA-256 del contenido del archivo subido.
+    :return: Clave que combina el contenido y el modelo OCR.
+    """
+    return f"{content_hash}:{OCR_MODEL}"
+
+
+def create_result_cache() -> Optional[LayeredCache]:
+    """Crea la caché de resultados según la configuración, o None si está deshabilitada."""
+    if not RESULT_CACHE_ENABLED:
+        return None
+    disk = None
+    if RESULT_CACHE_DISK_PATH:
+        disk = DiskCache(RESULT_CACHE_DISK_PATH, ttl_seconds=RESULT_CACHE_TTL_SECONDS, namespace="result")
+    logger.info(f"Caché de resultados habilitada (max_entries={RESULT_CACHE_MAX_ENTRIES}, disco={bool(disk)})")
+    return LayeredCache(
+        "result",
+        MemoryCache(max_entries=RESULT_CACHE_MAX_ENTRIES, ttl_seconds=RESULT_CACHE_TTL_SECONDS),
+        disk,
+    )
+
+
+def create_ocr_cache() -> Optional[LayeredCache]:
+    """Crea la caché de markdown OCR según la configuración, o None si está deshabilitada.
+
+    Comparte el archivo SQLite de la caché de resultados, en un espacio de nombres propio.
+    """
+    if not OCR_CACHE_ENABLED:
+        return None
+    disk = None
+    if RESULT_CACHE_DISK_PATH:
+        disk = DiskCache(RESULT_CACHE_DISK_PATH, ttl_seconds=OCR_CACHE_TTL_SECONDS, namespace="ocr")
+    logger.info(f"Caché de OCR habilitada (max_entries={OCR_CACHE_MAX_ENTRIES}, disco={bool(disk)})")
+    return LayeredCache(
+        "ocr",
+        MemoryCache(max_entries=OCR_CACHE_MAX_ENTRIES, ttl_seconds=OCR_CACHE_TTL_SECONDS),
+        disk,
+    )
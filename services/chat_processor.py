@@ -1,148 +1,181 @@
-from typing import Any, Dict, List
-import json
+from typing import Any, Dict, List, Optional, Tuple
 from mistralai.models import ImageURLChunk, TextChunk
 
-from config.settings import TEMPLATE
+from config.settings import CHAT_MODEL
+from services.prompt_builder import build_prompt, prompt_stats
+from services.rate_limiter import (
+    COMPLETION_TOKENS_ALLOWANCE,
+    IMAGE_TOKENS_ALLOWANCE,
+    MistralCallScheduler,
+    estimate_tokens,
+    get_scheduler,
+)
 from utils.logger import logger
-
+from utils.post_processing.models import ExtractionResult, parse_extraction
 
 class ChatProcessor:
-    def __init__(self, client: Any):
+    def __init__(self, client: Any, scheduler: Optional[MistralCallScheduler] = None):
         """
         Inicializa el procesador de chat con una instancia del cliente de Mistral.
         
         :param client: Instancia del cliente Mistral, ya configurado con la clave API.
+        :param scheduler: Planificador de llamadas a Mistral; si se omite se usa el del proceso.
         """
         self.client = client
+        self.scheduler = scheduler if scheduler is not None else get_scheduler()
 
-    def get_structured_response_image(self, base64_data_url: str, ocr_markdown: str) -> str:
+    def get_structured_response_image(self, base64_data_url: str, ocr_markdown: str) -> ExtractionResult:
         """
         Genera una respuesta estructurada en JSON para imágenes a partir del OCR obtenido.
 
         :param base64_data_url: Imagen codificada en base64 en formato data URL.
         :param ocr_markdown: Texto obtenido del OCR en formato markdown.
-        :return: Cadena JSON con la respuesta estructurada.
+        :return: Respuesta estructurada ya convertida a ExtractionResult.
+        """
+        messages, prompt_country = self._build_image_messages(base64_data_url, ocr_markdown)
+        estimated_tokens = self._estimate_tokens(messages)
+        # temperature=0: el planificador puede duplicar la llamada (hedging), ya que la copia es equivalente
+        chat_response = self.scheduler.call(
+            "chat",
+            self.client.chat.complete,
+            model=CHAT_MODEL,
+            messages=messages,
+            response_format={"type": "json_object"},
+            temperature=0,
+            tokens=estimated_tokens,
+        )
+        self._record_usage(chat_response, prompt_country, estimated_tokens)
+        return self._extract_result(chat_response)
+
+    def get_structured_response_text(self, ocr_markdown: str) -> ExtractionResult:
+        """
+        Genera una respuesta estructurada en JSON a partir del markdown OCR de un documento PDF.
+
+        El PDF ya fue leído por el OCR, por lo que el modelo recibe solo el texto en lugar
+        de volver a procesar el documento completo.
+
+        :param ocr_markdown: Texto obtenido del OCR en formato markdown.
+        :return: Respuesta estructurada ya convertida a ExtractionResult.
         """
-        # Definición de la plantilla JSON para la respuesta
-        template = TEMPLATE
-        messages: List[Dict] = [
+        messages, prompt_country = self._build_text_messages(ocr_markdown)
+        estimated_tokens = self._estimate_tokens(messages)
+        # temperature=0: el planificador puede duplicar la llamada (hedging), ya que la copia es equivalente
+        chat_response = self.scheduler.call(
+            "chat",
+            self.client.chat.complete,
+            model=CHAT_MODEL,
+            messages=messages,
+            response_format={"type": "json_object"},
+            temperature=0,
+            tokens=estimated_tokens,
+        )
+        self._record_usage(chat_response, prompt_country, estimated_tokens)
+        return self._extract_result(chat_response)
+
+    @staticmethod
+    def _build_image_messages(base64_data_url: str, ocr_markdown: str) -> Tuple[List[Dict], Optional[str]]:
+        """Construye los mensajes del chat para una imagen y su OCR, junto con el país del prompt."""
+        prompt, prompt_country = build_prompt(ocr_markdown, "image's")
+        messages = [
             {
                 "role": "user",
                 "content": [
                     ImageURLChunk(image_url=base64_data_url),
-                    TextChunk(
-                        text=(
-                            f"This is image's OCR in markdown:\n\n{ocr_markdown}\n\n"
-                            "IMPORTANTE: Debes devolver SIEMPRE un JSON válido con la siguiente estructura. "
-                            "Si algún campo no está presente en el documento, déjalo como cadena vacía pero manteniendo "
-                            "la estructura intacta.\n\n"
-                            
-                            "DETECCIÓN DE DOCUMENTOS FISCALES: Analiza cuidadosamente cada país según estas reglas:\n\n"
-                            
-                            "1. COLOMBIA: Un documento colombiano ES un documento fiscal si contiene UNO DE ESTOS elementos: "
-                            "(a) Menciona 'RUT' o 'Registro Único Tributario' en cualquier parte del documento, O "
-                            "(b) Contiene un NIT junto con un dígito de verificación, O "
-                            "(c) Contiene una referencia a la DIAN. "
-                            "Si cualquiera de estos elementos está presente, el documento es fiscal (`true`).\n\n"
-                            
-                            "2. PANAMÁ: Un documento panameño ES un documento fiscal cuando contiene: "
-                            "(a) Un número de identificación con guiones (como '3-753-2443'), Y "
-                            "(b) Menciona un establecimiento comercial o actividades económicas, Y "
-                            "(c) Contiene referencias a PanamaEmprende o Aviso de Operación.\n\n"
-                            
-                            "3. ARGENTINA: Un documento argentino ES un documento fiscal cuando contiene: "
-                            "(a) Un número CUIT/CUIL (como '33-70707631-9'), Y "
-                            "(b) Menciona una empresa u organización, Y "
-                            "(c) Hace referencia a la AFIP.\n\n"
-                            
-                            "IMPORTANTE: No exijas que se cumplan TODAS las condiciones para Colombia, con UNA es suficiente.\n\n"
-                            
-                            f"{template}"
-                        )
-                    ),
+                    TextChunk(text=prompt),
                 ],
             }
         ]
+        return messages, prompt_country
 
-        chat_response = self.client.chat.complete(
-            model="pixtral-12b-latest",
-            messages=messages,
-            response_format={"type": "json_object"},
-            temperature=0,
-        )
+    @staticmethod
+    def _build_text_messages(ocr_markdown: str) -> Tuple[List[Dict], Optional[str]]:
+        """Construye los mensajes del chat para un documento del que solo se envía el OCR."""
+        prompt, prompt_country = build_prompt(ocr_markdown, "the document's")
+        messages = [
+            {
+                "role": "user",
+                "content": [
+                    TextChunk(text=prompt),
+                ],
+            }
+        ]
+        return messages, prompt_country
+
+    @staticmethod
+    def _estimate_tokens(messages: List[Dict]) -> int:
+        """Estima los tokens de la llamada (prompt, imágenes y respuesta) para reservar presupuesto."""
+        tokens = COMPLETION_TOKENS_ALLOWANCE
+        for message in messages:
+            for chunk in message["content"]:
+                tokens += IMAGE_TOKENS_ALLOWANCE if isinstance(chunk, ImageURLChunk) else estimate_tokens(chunk.text)
+        return tokens
 
-        # Verificar si la respuesta es un JSON válido
+    def _record_usage(self, chat_response: Any, prompt_country: Optional[str], estimated_tokens: int) -> None:
+        """Registra los tokens consumidos según el tipo de prompt y corrige el presupuesto reservado."""
+        usage = getattr(chat_response, "usage", None)
+        prompt_stats.record(prompt_country, getattr(usage, "prompt_tokens", None))
+        self.scheduler.settle_tokens(estimated_tokens, getattr(usage, "total_tokens", None))
+
+    @staticmethod
+    def _extract_result(chat_response: Any) -> ExtractionResult:
+        """Convierte el contenido de la respuesta del modelo en un ExtractionResult, una sola vez."""
+        response_content = chat_response.choices[0].message.content
+        logger.info(f"Respuesta estructurada generada: {response_content}")
         try:
-            response_content = chat_response.choices[0].message.content
-            json.loads(response_content)  # Intentar cargar como JSON
-        except json.JSONDecodeError:
+            return parse_extraction(response_content)
+        except ValueError:
             logger.error("La respuesta del modelo no es un JSON válido")
             raise ValueError("La respuesta del modelo no es un JSON válido")
-        
-        return chat_response.choices[0].message.content
 
-    def get_structured_response_pdf(self, document_url: str) -> str:
-        """
-        Genera una respuesta estructurada en JSON para documentos PDF a partir de su URL firmado.
 
-        :param document_url: URL firmado del documento PDF.
-        :return: Cadena JSON con la respuesta estructurada.
+class AsyncChatProcessor(ChatProcessor):
+    """Variante de ChatProcessor que utiliza los métodos asíncronos del SDK de Mistral."""
+
+    async def _arecord_usage(self, chat_response: Any, prompt_country: Optional[str], estimated_tokens: int) -> None:
+        """Variante asíncrona de _record_usage que corrige el presupuesto fuera del event loop."""
+        usage = getattr(chat_response, "usage", None)
+        prompt_stats.record(prompt_country, getattr(usage, "prompt_tokens", None))
+        await self.scheduler.asettle_tokens(estimated_tokens, getattr(usage, "total_tokens", None))
+
+    async def get_structured_response_image(self, base64_data_url: str, ocr_markdown: str) -> ExtractionResult:
         """
-        template = TEMPLATE
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "document_url",
-                        "document_url": document_url
-                    },
-                    {
-                        "type": "text", 
-                        "text": "DETECCIÓN DE DOCUMENTOS FISCALES: Analiza cuidadosamente cada país según estas reglas:\n\n"
-                            
-                            "1. COLOMBIA: Un documento colombiano ES un documento fiscal si contiene UNO DE ESTOS elementos: "
-                            "(a) Menciona 'RUT' o 'Registro Único Tributario' en cualquier parte del documento, O "
-                            "(b) Contiene un NIT junto con un dígito de verificación, O "
-                            "(c) Contiene una referencia a la DIAN. "
-                            "Si cualquiera de estos elementos está presente, el documento es fiscal (`true`).\n\n"
-                            
-                            "2. PANAMÁ: Un documento panameño ES un documento fiscal cuando contiene: "
-                            "(a) Un número de identificación con guiones (como '3-753-2443'), Y "
-                            "(b) Menciona un establecimiento comercial o actividades económicas, Y "
-                            "(c) Contiene referencias a PanamaEmprende o Aviso de Operación.\n\n"
-                            
-                            "3. ARGENTINA: Un documento argentino ES un documento fiscal cuando contiene: "
-                            "(a) Un número CUIT/CUIL (como '33-70707631-9'), Y "
-                            "(b) Menciona una empresa u organización, Y "
-                            "(c) Hace referencia a la AFIP.\n\n"
-                            
-                            "IMPORTANTE: No exijas que se cumplan TODAS las condiciones para Colombia, con UNA es suficiente."
-                    },
-                    {
-                        "type": "text",
-                        "text": "Puedes devolver un json estructurado con la siguiente estructura"
-                    },
-                    {
-                        "type": "text",
-                        "text": template
-                    }
-                ]
-            }
-        ]
+        Genera de forma asíncrona una respuesta estructurada en JSON para imágenes.
 
-        chat_response = self.client.chat.complete(
-            model="pixtral-12b-latest",
+        :param base64_data_url: Imagen codificada en base64 en formato data URL.
+        :param ocr_markdown: Texto obtenido del OCR en formato markdown.
+        :return: Respuesta estructurada ya convertida a ExtractionResult.
+        """
+        messages, prompt_country = self._build_image_messages(base64_data_url, ocr_markdown)
+        estimated_tokens = self._estimate_tokens(messages)
+        chat_response = await self.scheduler.acall(
+            "chat",
+            self.client.chat.complete_async,
+            model=CHAT_MODEL,
             messages=messages,
             response_format={"type": "json_object"},
             temperature=0,
+            tokens=estimated_tokens,
         )
+        await self._arecord_usage(chat_response, prompt_country, estimated_tokens)
+        return self._extract_result(chat_response)
 
-        # Verificar si la respuesta es un JSON válido
-        try:
-            response_content = chat_response.choices[0].message.content
-            json.loads(response_content)  # Intentar cargar como JSON
-        except json.JSONDecodeError:
-            logger.error("La respuesta del modelo no es un JSON válido")
-            raise ValueError("La respuesta del modelo no es un JSON válido")
-        return chat_response.choices[0].message.content
\ No newline at end of file
+    async def get_structured_response_text(self, ocr_markdown: str) -> ExtractionResult:
+        """
+        Genera de forma asíncrona una respuesta estructurada en JSON a partir del markdown OCR.
+
+        :param ocr_markdown: Texto obtenido del OCR en formato markdown.
+        :return: Respuesta estructurada ya convertida a ExtractionResult.
+        """
+        messages, prompt_country = self._build_text_messages(ocr_markdown)
+        estimated_tokens = self._estimate_tokens(messages)
+        chat_response = await self.scheduler.acall(
+            "chat",
+            self.client.chat.complete_async,
+            model=CHAT_MODEL,
+            messages=messages,
+            response_format={"type": "json_object"},
+            temperature=0,
+            tokens=estimated_tokens,
+        )
+        await self._arecord_usage(chat_response, prompt_country, estimated_tokens)
+        return self._extract_result(chat_response)
@@ -0,0 +1,119 @@
+import math
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from utils.logger import logger
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Se lanza sin llamar a Mistral mientras el circuito de un endpoint está abierto."""
+
+    def __init__(self, endpoint: str, retry_after: int):
+        super().__init__(f"El servicio '{endpoint}' de Mistral no está disponible temporalmente")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+    def __reduce__(self):
+        # Permite devolver la excepción desde un proceso worker del pipeline
+        return self.__class__, (self.endpoint, self.retry_after)
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_seconds: float = 30.0,
+                 half_open_max_calls: int = 1):
+        """Circuito de un endpoint de Mistral que corta las llamadas mientras el servicio está degradado.
+
+        Tras failure_threshold fallos consecutivos (5xx, timeouts o errores de conexión) el
+        circuito se abre y las llamadas fallan de inmediato. Pasados recovery_seconds se deja
+        pasar un número limitado de llamadas de prueba: si una responde se cierra, y si falla
+        vuelve a abrirse.
+
+        :param name: Nombre del endpoint ("ocr", "files" o "chat").
+        :param failure_threshold: Fallos consecutivos que abren el circuito.
+        :param recovery_seconds: Segundos que el circuito permanece abierto antes de probar.
+        :param half_open_max_calls: Llamadas de prueba simultáneas permitidas en estado semiabierto.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._lock = threading.Lock()
+
+    def check(self) -> None:
+        """Falla de inmediato si el circuito está abierto y aún no toca probar el servicio.
+
+        :raises CircuitOpenError: Si el circuito está abierto.
+        """
+        with self._lock:
+            if self.state != OPEN:
+                return
+            remaining = self.recovery_seconds - (time.monotonic() - self._opened_at)
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, max(1, math.ceil(remaining)))
+
+    def allow(self) -> bool:
+        """Autoriza una llamada o lanza CircuitOpenError si el circuito está abierto.
+
+        :return: True si la llamada es una prueba del estado semiabierto.
+        :raises CircuitOpenError: Si el circuito está abierto o ya hay pruebas en curso.
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.recovery_seconds:
+                self.state = HALF_OPEN
+                logger.info(f"Circuito '{self.name}' semiabierto, se prueba el servicio")
+            if self.state == CLOSED:
+                return False
+            if self.state == HALF_OPEN and self._probes_in_flight < self.half_open_max_calls:
+                self._probes_in_flight += 1
+                return True
+            self.rejected += 1
+            remaining = self.recovery_seconds - (time.monotonic() - self._opened_at)
+            raise CircuitOpenError(self.name, max(1, math.ceil(remaining)))
+
+    def record(self, probe: bool, outcome: Optional[bool]) -> None:
+        """Registra el resultado de una llamada autorizada.
+
+        :param probe: Valor retornado por allow para esta llamada.
+        :param outcome: True si el servicio respondió, False si falló por indisponibilidad,
+            None si el resultado no dice nada del servicio (por ejemplo una cancelación o un 429).
+        """
+        with self._lock:
+            if probe:
+                self._probes_in_flight -= 1
+            if outcome is None:
+                return
+            if outcome:
+                if self.state != CLOSED:
+                    logger.info(f"Circuito '{self.name}' cerrado, el servicio respondió")
+                self.state = CLOSED
+                self.consecutive_failures = 0
+                return
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or (
+                self.state == CLOSED and self.consecutive_failures >= self.failure_threshold
+            ):
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+                logger.warning(
+                    f"Circuito '{self.name}' abierto tras {self.consecutive_failures} fallos consecutivos; "
+                    f"se rechazan llamadas durante {self.recovery_seconds:.0f}s"
+                )
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "rejected": self.rejected,
+            }
@@ -1,63 +1,160 @@
 from pathlib import Path
+from typing import Any, Optional, Tuple
 
 from mistralai import Mistral
 from services.ocr_processor import OCRProcessor
 from services.chat_processor import ChatProcessor
+from services.caches import result_cache_key
+from config.settings import FAST_PATH_ENABLED
+from utils.cache import LayeredCache
 from utils.post_processing.validators.fiscal_validator import FiscalDocumentValidator
 from utils.post_processing.processor import ResponsePostProcessor
+from utils.post_processing.models import ExtractionResult, parse_extraction, serialize_extraction
+from utils.post_processing.fast_extractor import extract_from_ocr, fast_path_stats
 from utils.file_encoder import FileEncoder
+from utils.image_preprocessor import preprocess_image
 from utils.logger import logger
 
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.webp', '.gif']
+
 
 class DocumentProcessor:
-    def __init__(self, api_key: str):
-        """Inicializa el procesador de documentos creando instancias del cliente Mistral, OCRProcessor y ChatProcessor."""
-        self.client = Mistral(api_key=api_key)
-        self.ocr_processor = OCRProcessor(self.client)
+    def __init__(
+        self,
+        api_key: str,
+        client: Optional[Any] = None,
+        result_cache: Optional[LayeredCache] = None,
+        ocr_cache: Optional[LayeredCache] = None,
+    ):
+        """Inicializa el procesador de documentos con el cliente Mistral, OCRProcessor y ChatProcessor.
+
+        :param api_key: Clave API de Mistral, usada solo si no se recibe un cliente.
+        :param client: Cliente Mistral compartido; si se omite se crea uno propio.
+        :param result_cache: Caché de resultados por contenido; si se omite no se cachea.
+        :param ocr_cache: Caché de markdown OCR por contenido; si se omite no se cachea.
+        """
+        self.client = client if client is not None else Mistral(api_key=api_key)
+        self.ocr_processor = OCRProcessor(self.client, ocr_cache)
         self.chat_processor = ChatProcessor(self.client)
         self.fiscal_validator = FiscalDocumentValidator()
         self.post_processor = ResponsePostProcessor()
+        self.result_cache = result_cache
 
-    def process_document(self, file_path: str) -> str:
-        """Procesa un documento (imagen o PDF) basado en su extensión y retorna una respuesta estructurada en formato JSON.
+    def process_document(self, file_path: str, content_hash: Optional[str] = None) -> ExtractionResult:
+        """Procesa un documento (imagen o PDF) basado en su extensión y retorna el resultado de la extracción.
+
+        Si el mismo contenido ya fue procesado con la plantilla y modelos actuales, el resultado
+        se obtiene de la caché sin llamar a Mistral.
 
         :param file_path: Ruta del archivo a procesar.
-        :return: Respuesta estructurada en formato JSON.
-        :raises ValueError: Si el tipo de archivo no es soportado o falla la codificación de la imagen.
+        :param content_hash: SHA-256 del archivo, si ya fue calculado por el llamador.
+        :return: Resultado de la extracción, validado y post-procesado.
+        :raises ValueError: Si el tipo de archivo no es soportado.
         """
         file_ext = Path(file_path).suffix.lower()
-        ocr_markdown = ""
-
-        if file_ext in ['.jpg', '.jpeg', '.png', '.webp', '.gif']:
-            ocr_markdown = self.ocr_processor.process_image(file_path)
-            base64_image = FileEncoder.encode_image(file_path)
-            if base64_image is None:
-                logger.error(f"Error al codificar la imagen: {file_path}")
-                raise ValueError(f"Error al codificar la imagen: {file_path}")
-            base64_data_url = f"data:image/jpeg;base64,{base64_image}"
-            structured_response = self.chat_processor.get_structured_response_image(base64_data_url, ocr_markdown)
+
+        if file_ext in IMAGE_EXTENSIONS:
+            return self.process_image_bytes(Path(file_path).read_bytes(), file_ext, content_hash)
         elif file_ext == ".pdf":
-            document_url = self.ocr_processor.process_pdf(file_path)
-            structured_response = self.chat_processor.get_structured_response_pdf(document_url)
+            if content_hash is None and self._uses_content_hash():
+                content_hash = FileEncoder.hash_file(file_path)
+            cache_key, cached = self._get_cached_result(content_hash)
+            if cached is not None:
+                return cached
+
+            ocr_markdown = self.ocr_processor.process_pdf(file_path, content_hash)
+            structured_response = self._try_fast_path(ocr_markdown)
+            if structured_response is None:
+                structured_response = self.chat_processor.get_structured_response_text(ocr_markdown)
+            return self._finish(structured_response, ocr_markdown, cache_key)
         else:
             logger.error(f"Tipo de archivo no soportado: {file_ext}")
             raise ValueError("Tipo de archivo no soportado. Solo se permiten PDFs e imágenes (JPG, JPEG, PNG, WEBP, GIF).")
 
-        logger.info(f"Respuesta estructurada generada: {structured_response}")
+    def process_image_bytes(self, image_bytes: bytes, file_ext: str, content_hash: Optional[str] = None) -> ExtractionResult:
+        """Procesa una imagen recibida en memoria y retorna el resultado de la extracción.
+
+        La imagen se reduce y recomprime si es necesario, y el data URL se construye una sola
+        vez con su tipo MIME real para reutilizarlo en las llamadas de OCR y chat, sin pasar
+        por un archivo temporal.
+
+        :param image_bytes: Contenido de la imagen.
+        :param file_ext: Extensión original del archivo (por ejemplo ".png").
+        :param content_hash: SHA-256 de la imagen, si ya fue calculado por el llamador.
+        :return: Resultado de la extracción, validado y post-procesado.
+        """
+        if content_hash is None and self._uses_content_hash():
+            content_hash = FileEncoder.hash_bytes(image_bytes)
+        cache_key, cached = self._get_cached_result(content_hash)
+        if cached is not None:
+            return cached
+
+        base64_data_url = FileEncoder.to_data_url(*preprocess_image(image_bytes, file_ext))
+        ocr_markdown = self.ocr_processor.process_image_data_url(base64_data_url, content_hash)
+        structured_response = self._try_fast_path(ocr_markdown)
+        if structured_response is None:
+            structured_response = self.chat_processor.get_structured_response_image(base64_data_url, ocr_markdown)
+        return self._finish(structured_response, ocr_markdown, cache_key)
+
+    def _uses_content_hash(self) -> bool:
+        """Indica si alguna caché necesita el hash del contenido."""
+        return self.result_cache is not None or self.ocr_processor.ocr_cache is not None
+
+    @staticmethod
+    def _try_fast_path(ocr_markdown: str) -> Optional[ExtractionResult]:
+        """Extrae el documento solo con reglas sobre el OCR si la ruta rápida está activa y es confiable."""
+        if not FAST_PATH_ENABLED:
+            return None
+        structured_response = extract_from_ocr(ocr_markdown)
+        fast_path_stats.record(structured_response is not None)
+        return structured_response
+
+    def _get_cached_result(self, content_hash: Optional[str]) -> Tuple[Optional[str], Optional[ExtractionResult]]:
+        """Retorna la clave de caché del documento y el resultado cacheado, si existe."""
+        if self.result_cache is None or content_hash is None:
+            return None, None
+        cache_key = result_cache_key(content_hash)
+        cached = self.result_cache.get(cache_key)
+        if cached is None:
+            return cache_key, None
+        logger.info(f"Resultado obtenido de la caché para el documento {content_hash[:12]}")
+        return cache_key, parse_extraction(cached)
 
+    def _finish(self, structured_response: ExtractionResult, ocr_markdown: str, cache_key: Optional[str]) -> ExtractionResult:
+        """Valida y post-procesa la respuesta del modelo y la guarda en la caché de resultados.
+
+        Si el post-procesamiento falla se retorna la respuesta validada sin corregir, pero no
+        se cachea, para que el documento vuelva a procesarse en la próxima solicitud.
+        """
+        if not self._validate_and_post_process(structured_response, ocr_markdown):
+            logger.warning("Post-procesamiento fallido: el resultado no se guarda en la caché")
+            return structured_response
+        if cache_key is not None:
+            self.result_cache.set(cache_key, serialize_extraction(structured_response))
+        return structured_response
+
+    def _validate_and_post_process(self, structured_response: ExtractionResult, ocr_markdown: str) -> bool:
+        """Aplica en sitio la validación fiscal y el post-procesamiento a la respuesta del modelo.
+
+        :param structured_response: Respuesta del modelo ya convertida; se modifica en sitio.
+        :param ocr_markdown: Texto OCR del documento.
+        :return: False si el post-procesamiento falló y la respuesta quedó sin corregir.
+        :raises ValueError: Si falla la validación o el post-procesamiento.
+        """
         # Validar el documento fiscal
         try:
-            structured_response = self.fiscal_validator.validate(structured_response, ocr_markdown)
+            self.fiscal_validator.validate_data(structured_response, ocr_markdown)
         except Exception as e:
             logger.error(f"Error al validar el documento fiscal: {e}")
             raise ValueError(f"Error al validar el documento fiscal: {e}")
         
         # Post-procesar la respuesta estructurada
         try:
-            structured_response = self.post_processor.process_response(structured_response, ocr_markdown)
+            post_processed = self.post_processor.process_data(structured_response, ocr_markdown)
         except Exception as e:
             logger.error(f"Error al post-procesar la respuesta estructurada: {e}")
             raise ValueError(f"Error al post-procesar la respuesta estructurada: {e}")
         
-        logger.info(f"Documento validado y post procesado: {structured_response}")
-        return structured_response
\ No newline at end of file
+        if post_processed:
+            logger.info(f"Documento validado y post procesado: {structured_response}")
+        return post_processed
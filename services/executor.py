@@ -0,0 +1,156 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from config.settings import API_KEY
+from utils.logger import logger
+
+
+class PipelineQueueFullError(Exception):
+    """Se lanza cuando la cola de admisión del pipeline está llena."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("La cola de procesamiento de documentos está llena")
+        self.retry_after = retry_after
+
+
+# Procesador propio de cada proceso worker (solo se usa con el pool de procesos)
+_worker_processor = None
+
+
+def _call_in_worker(method_name: str, *args: Any) -> Dict[str, Any]:
+    """Ejecuta un método del pipeline dentro de un proceso worker, reutilizando su propio DocumentProcessor."""
+    global _worker_processor
+    if _worker_processor is None:
+        from services.document_processor import DocumentProcessor
+        from services.mistral_client import SharedMistralClient
+        from services.caches import create_ocr_cache, create_result_cache
+        _worker_processor = DocumentProcessor(
+            api_key=API_KEY,
+            client=SharedMistralClient(API_KEY).client,
+            result_cache=create_result_cache(),
+            ocr_cache=create_ocr_cache(),
+        )
+    return getattr(_worker_processor, method_name)(*args)
+
+
+class PipelineExecutor:
+    def __init__(self, kind: str = "thread", max_workers: int = 8, max_pending: int = 32, retry_after: int = 5):
+        """Inicializa el ejecutor del pipeline con un pool acotado y una cola de admisión.
+
+        :param kind: Tipo de pool: "thread" o "process".
+        :param max_workers: Número máximo de documentos procesándose a la vez.
+        :param max_pending: Número máximo de documentos esperando un worker libre.
+        :param retry_after: Segundos sugeridos al cliente cuando la cola está llena.
+        :raises ValueError: Si el tipo de pool no es soportado.
+        """
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Tipo de ejecutor no soportado: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self._executor: Optional[Executor] = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        """Número total de documentos admitidos (en ejecución más en espera)."""
+        return self.max_workers + self.max_pending
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pipeline")
+            logger.info(f"Pool de pipeline '{self.kind}' iniciado con {self.max_workers} workers")
+        return self._executor
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                logger.warning(f"Cola de pipeline llena ({self._in_flight}/{self.capacity}), rechazando solicitud")
+                raise PipelineQueueFullError(self.retry_after)
+            self._in_flight += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Ejecuta una función bloqueante en el pool respetando la cola de admisión.
+
+        El cupo se libera cuando termina el trabajo en el pool, no cuando deja de esperarse:
+        si la solicitud se cancela (por ejemplo, el cliente se desconecta) el trabajo ya
+        iniciado sigue ocupando un worker y debe seguir contando en la cola de admisión.
+
+        :raises PipelineQueueFullError: Si no hay capacidad para admitir la solicitud.
+        """
+        self._admit()
+        try:
+            future = self._get_executor().submit(func, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return await asyncio.wrap_future(future)
+
+    async def run_coroutine(self, coro: Awaitable[Any]) -> Any:
+        """Espera una corrutina del pipeline asíncrono respetando la misma cola de admisión.
+
+        :raises PipelineQueueFullError: Si no hay capacidad para admitir la solicitud.
+        """
+        try:
+            self._admit()
+        except PipelineQueueFullError:
+            coro.close()
+            raise
+        try:
+            return await coro
+        finally:
+            self._release()
+
+    def runs_in_workers(self, document_processor: Any) -> bool:
+        """Indica si el pipeline del procesador se ejecuta en procesos worker con su propio estado.
+
+        En ese caso las cachés y contadores del proceso principal no reflejan el trabajo realizado.
+        """
+        return self.kind == "process" and not asyncio.iscoroutinefunction(document_processor.process_document)
+
+    async def submit(self, document_processor: Any, method_name: str, *args: Any) -> Dict[str, Any]:
+        """Ejecuta un método del procesador de documentos en el pool configurado.
+
+        Con el pool de hilos se reutiliza el procesador recibido; con el pool de procesos
+        cada worker mantiene su propio procesador, ya que el cliente no es serializable.
+        Un procesador asíncrono se espera directamente en el event loop.
+        """
+        method = getattr(document_processor, method_name)
+        if asyncio.iscoroutinefunction(method):
+            return await self.run_coroutine(method(*args))
+        if self.kind == "process":
+            return await self.run(_call_in_worker, method_name, *args)
+        return await self.run(method, *args)
+
+    async def process_document(self, document_processor: Any, file_path: str, content_hash: Optional[str] = None) -> Dict[str, Any]:
+        """Procesa un documento almacenado en disco."""
+        return await self.submit(document_processor, "process_document", file_path, content_hash)
+
+    async def process_image_bytes(
+        self, document_processor: Any, image_bytes: bytes, file_ext: str, content_hash: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Procesa una imagen recibida en memoria."""
+        return await self.submit(document_processor, "process_image_bytes", image_bytes, file_ext, content_hash)
+
+    def shutdown(self) -> None:
+        """Detiene el pool esperando a que terminen los documentos en curso."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            logger.info("Pool de pipeline detenido")
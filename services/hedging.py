@@ -0,0 +1,302 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from config.settings import (
+    CHAT_HEDGING_ENABLED,
+    CHAT_HEDGE_PERCENTILE,
+    CHAT_HEDGE_MAX_RATIO,
+    CHAT_HEDGE_MIN_SAMPLES,
+    PIPELINE_MAX_WORKERS,
+)
+from utils.logger import logger
+
+# Latencias recientes consideradas para calcular el percentil
+_LATENCY_WINDOW = 500
+
+# Libera la capacidad reservada para una copia, con el error con que terminó (None si respondió)
+_Finish = Callable[[Optional[BaseException]], None]
+
+
+def _future_error(future: Any) -> Optional[BaseException]:
+    """Error con el que terminó una copia (futuro de hilo o tarea asyncio), o None si respondió."""
+    if future.cancelled():
+        return asyncio.CancelledError()
+    return future.exception()
+
+
+def _release_when_done(future: Any, finish: Optional[_Finish]) -> None:
+    """Libera la capacidad de una copia cuando termina, aunque la otra ya haya respondido."""
+    if finish is not None:
+        future.add_done_callback(lambda done: finish(_future_error(done)))
+
+
+class LatencyTracker:
+    """Ventana de las latencias más recientes de una llamada, con cálculo de percentiles."""
+
+    def __init__(self, window: int = _LATENCY_WINDOW):
+        self._samples: "deque[float]" = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Retorna el percentil indicado (0-100) de las latencias recientes, o None si no hay muestras."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(percentile / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class HedgingPolicy:
+    def __init__(self, name: str, enabled: bool = False, percentile: float = 95.0, max_ratio: float = 0.1,
+                 min_samples: int = 20, max_workers: int = 16):
+        """Política de solicitudes duplicadas (hedging) para recortar la cola de latencia.
+
+        Si una llamada no ha respondido al alcanzar el percentil configurado de las latencias
+        recientes, se lanza una copia y se toma la primera respuesta. Cada llamada suma
+        max_ratio copias a un saldo de como mucho una, y cada copia gasta una, de modo que
+        también durante un incidente de latencia las copias no superan esa proporción de las
+        llamadas recientes. Solo debe usarse con llamadas deterministas (temperature=0), cuyas
+        respuestas son equivalentes.
+
+        :param name: Nombre de la llamada, usado en los logs.
+        :param enabled: Si se lanzan copias; si es falso solo se registran las latencias.
+        :param percentile: Percentil de latencia (0-100) tras el que se lanza la copia.
+        :param max_ratio: Proporción máxima de llamadas que pueden duplicarse.
+        :param min_samples: Latencias necesarias antes de empezar a duplicar llamadas.
+        :param max_workers: Hilos disponibles para las llamadas síncronas duplicadas.
+        """
+        self.name = name
+        self.enabled = enabled
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self.tracker = LatencyTracker()
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._hedge_credit = 1.0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _hedge_delay(self) -> Optional[float]:
+        """Segundos tras los que se duplica la llamada, o None si no debe duplicarse."""
+        if not self.enabled or len(self.tracker) < self.min_samples:
+            return None
+        return self.tracker.percentile(self.percentile)
+
+    def _start_call(self) -> None:
+        with self._lock:
+            self.calls += 1
+            self._hedge_credit = min(1.0, self._hedge_credit + self.max_ratio)
+
+    def _reserve_hedge(self) -> bool:
+        """Reserva una copia si el saldo de copias lo permite."""
+        with self._lock:
+            if self._hedge_credit < 1.0:
+                return False
+            self._hedge_credit -= 1.0
+            self.hedged += 1
+            return True
+
+    def _refund_hedge(self) -> None:
+        """Devuelve una copia reservada que finalmente no se lanzó."""
+        with self._lock:
+            self._hedge_credit = min(1.0, self._hedge_credit + 1.0)
+            self.hedged -= 1
+
+    def _start_hedge(self, reserve: Optional[Callable[[], Optional[_Finish]]]) -> Tuple[bool, Optional[_Finish]]:
+        """Reserva una copia y la capacidad externa que necesita; retorna si se lanza y cómo liberarla."""
+        if not self._reserve_hedge():
+            return False, None
+        if reserve is None:
+            return True, None
+        finish = reserve()
+        if finish is None:
+            self._refund_hedge()
+            return False, None
+        return True, finish
+
+    def _record_win(self, is_hedge: bool) -> None:
+        if is_hedge:
+            with self._lock:
+                self.hedge_wins += 1
+
+    def _timed(self, fn: Callable[[], Any]) -> Any:
+        started_at = time.monotonic()
+        result = fn()
+        self.tracker.record(time.monotonic() - started_at)
+        return result
+
+    async def _atimed(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        started_at = time.monotonic()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # La copia perdedora se cancela: su latencia fue al menos la transcurrida. Sin esta
+            # muestra la cola lenta saldría de la ventana y el percentil bajaría sin motivo
+            self.tracker.record(time.monotonic() - started_at)
+            raise
+        self.tracker.record(time.monotonic() - started_at)
+        return result
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{self.name}-hedge")
+            return self._executor
+
+    def call(self, fn: Callable[[], Any], reserve: Optional[Callable[[], Optional[_Finish]]] = None,
+             finish: Optional[_Finish] = None) -> Any:
+        """Ejecuta una llamada síncrona, duplicándola si tarda más que el percentil de latencia.
+
+        La copia perdedora no puede interrumpirse y termina en segundo plano; su respuesta se
+        descarta, y su capacidad se libera cuando termina, no cuando responde la ganadora.
+
+        :param fn: Función sin argumentos que realiza la llamada.
+        :param reserve: Reserva sin esperar la capacidad (presupuesto, cupo) de la copia; retorna
+            la función que la libera con el error de la copia, o None si no hay margen y no se duplica.
+        :param finish: Libera la capacidad de la llamada original con su error (o None) cuando termina.
+        :return: La primera respuesta exitosa.
+        """
+        self._start_call()
+        delay = self._hedge_delay()
+        if delay is None:
+            try:
+                result = self._timed(fn)
+            except BaseException as e:
+                if finish is not None:
+                    finish(e)
+                raise
+            if finish is not None:
+                finish(None)
+            return result
+
+        executor = self._get_executor()
+        try:
+            primary = executor.submit(self._timed, fn)
+        except BaseException as e:
+            if finish is not None:
+                finish(e)
+            raise
+        _release_when_done(primary, finish)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        hedged, hedge_finish = self._start_hedge(reserve)
+        if not hedged:
+            return primary.result()
+
+        logger.info(f"Llamada '{self.name}' sin respuesta tras {delay:.1f}s, se lanza una copia")
+        try:
+            hedge = executor.submit(self._timed, fn)
+        except BaseException as e:
+            if hedge_finish is not None:
+                hedge_finish(e)
+            raise
+        _release_when_done(hedge, hedge_finish)
+        pending = {primary, hedge}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self._record_win(future is hedge)
+                    return future.result()
+            if not pending:
+                # Ambas fallaron: propagar el error de la llamada original
+                return primary.result()
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]],
+                    reserve: Optional[Callable[[], Awaitable[Optional[_Finish]]]] = None,
+                    finish: Optional[_Finish] = None) -> Any:
+        """Variante asíncrona de call; la copia perdedora se cancela y su capacidad se libera al terminar.
+
+        :param fn: Función sin argumentos que retorna la corrutina de la llamada.
+        :param reserve: Variante asíncrona del parámetro reserve de call.
+        :param finish: Libera la capacidad de la llamada original con su error (o None) cuando termina.
+        :return: La primera respuesta exitosa.
+        """
+        self._start_call()
+        delay = self._hedge_delay()
+        if delay is None:
+            try:
+                result = await self._atimed(fn)
+            except BaseException as e:
+                if finish is not None:
+                    finish(e)
+                raise
+            if finish is not None:
+                finish(None)
+            return result
+
+        primary = asyncio.ensure_future(self._atimed(fn))
+        _release_when_done(primary, finish)
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or not self._reserve_hedge():
+                return await primary
+            hedge_finish = None
+            if reserve is not None:
+                hedge_finish = await reserve()
+                if hedge_finish is None:
+                    self._refund_hedge()
+                    return await primary
+
+            logger.info(f"Llamada '{self.name}' sin respuesta tras {delay:.1f}s, se lanza una copia")
+            hedge = asyncio.ensure_future(self._atimed(fn))
+            _release_when_done(hedge, hedge_finish)
+            tasks.add(hedge)
+            pending = set(tasks)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self._record_win(task is hedge)
+                        return task.result()
+                if not pending:
+                    # Ambas fallaron: propagar el error de la llamada original
+                    return primary.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def snapshot(self) -> Dict[str, Any]:
+        delay = self._hedge_delay()
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "hedge_delay_seconds": round(delay, 3) if delay is not None else None,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+chat_hedging = HedgingPolicy(
+    "chat",
+    enabled=CHAT_HEDGING_ENABLED,
+    percentile=CHAT_HEDGE_PERCENTILE,
+    max_ratio=CHAT_HEDGE_MAX_RATIO,
+    min_samples=CHAT_HEDGE_MIN_SAMPLES,
+    max_workers=2 * PIPELINE_MAX_WORKERS,
+)
@@ -0,0 +1,186 @@
+import asyncio
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from services.circuit_breaker import CircuitOpenError
+from services.executor import PipelineQueueFullError
+from services.rate_limiter import RateLimitExceededError
+from services.webhook import WebhookService, validate_callback_url
+from utils.logger import logger
+from utils.upload_spool import ReceivedUpload, discard_received_upload
+
+
+class JobQueueFullError(Exception):
+    """Se lanza cuando la cola de trabajos en segundo plano está llena."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("La cola de trabajos está llena")
+        self.retry_after = retry_after
+
+
+class Job:
+    def __init__(self, upload: ReceivedUpload, callback_url: Optional[str] = None):
+        """Trabajo de procesamiento de un documento en segundo plano.
+
+        :param upload: Archivo recibido a procesar.
+        :param callback_url: URL que recibirá el resultado final, si se indica.
+        """
+        self.id = uuid.uuid4().hex
+        self.upload = upload
+        self.callback_url = callback_url
+        self.status = "queued"
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "filename": self.upload.filename,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    def __init__(
+        self,
+        workers: int = 4,
+        max_size: int = 100,
+        result_ttl: int = 3600,
+        retry_after: int = 5,
+        max_wait: float = 900.0,
+        webhook_service: Optional[WebhookService] = None,
+    ):
+        """Cola de trabajos en memoria atendida por workers asíncronos.
+
+        :param workers: Número de trabajos procesándose a la vez.
+        :param max_size: Número máximo de trabajos en espera.
+        :param result_ttl: Segundos que se conservan los trabajos terminados para su consulta.
+        :param retry_after: Segundos sugeridos al cliente cuando la cola está llena.
+        :param max_wait: Segundos máximos que un trabajo reintenta por saturación antes de marcarse fallido.
+        :param webhook_service: Servicio usado para entregar los resultados a la URL de callback.
+        """
+        self.runner: Optional[Callable[[ReceivedUpload], Awaitable[str]]] = None
+        self.workers = workers
+        self.max_size = max_size
+        self.result_ttl = result_ttl
+        self.retry_after = retry_after
+        self.max_wait = max_wait
+        self.webhook_service = webhook_service or WebhookService()
+        self._jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self, runner: Callable[[ReceivedUpload], Awaitable[str]]) -> None:
+        """Inicia los workers en el event loop actual.
+
+        :param runner: Corrutina que ejecuta el pipeline sobre una carga y retorna el resultado de la extracción.
+        """
+        self.runner = runner
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Cola de trabajos iniciada con {self.workers} workers")
+
+    async def stop(self) -> None:
+        """Detiene los workers y libera los archivos de los trabajos pendientes."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job in self._jobs.values():
+            if job.status in ("queued", "running"):
+                discard_received_upload(job.upload)
+        logger.info("Cola de trabajos detenida")
+
+    def submit(self, upload: ReceivedUpload, callback_url: Optional[str] = None) -> Job:
+        """Encola un documento para procesarlo en segundo plano.
+
+        :raises JobQueueFullError: Si la cola está llena.
+        """
+        self._prune()
+        job = Job(upload, callback_url)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            logger.warning(f"Cola de trabajos llena ({self.max_size}), rechazando {upload.filename}")
+            raise JobQueueFullError(self.retry_after)
+        self._jobs[job.id] = job
+        logger.info(f"Trabajo {job.id} encolado para {upload.filename}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        counts["queue_size"] = self._queue.qsize() if self._queue is not None else 0
+        return counts
+
+    def _prune(self) -> None:
+        """Elimina los trabajos terminados cuyo resultado ya expiró."""
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.result_ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        job.status = "running"
+        deadline = time.monotonic() + self.max_wait
+        try:
+            while True:
+                try:
+                    response = await self.runner(job.upload)
+                    break
+                except (PipelineQueueFullError, RateLimitExceededError, CircuitOpenError) as e:
+                    # El pool o la cuota de Mistral están saturados, o Mistral no responde; esperar y reintentar
+                    if time.monotonic() + e.retry_after > deadline:
+                        raise
+                    await asyncio.sleep(e.retry_after)
+            job.result = response
+            job.status = "completed"
+        except (PipelineQueueFullError, RateLimitExceededError, CircuitOpenError) as e:
+            # La saturación ya se registra donde se produce; no se alerta por cada trabajo abandonado
+            logger.warning(f"Trabajo {job.id} abandonado tras {self.max_wait:.0f}s de saturación: {e}")
+            job.error = f"Service unavailable: {e}"
+            job.status = "failed"
+        except Exception as e:
+            logger.error(f"Error processing job {job.id}: {e}")
+            job.error = f"Error processing document: {e}"
+            job.status = "failed"
+            self.webhook_service.send_to_webhook(f"Error processing job {job.id}: {e}")
+        finally:
+            job.finished_at = time.time()
+            discard_received_upload(job.upload)
+            # Liberar el contenido en memoria; solo se conserva el resultado
+            job.upload = job.upload._replace(data=None)
+
+        if job.callback_url:
+            await self._deliver_callback(job)
+
+    async def _deliver_callback(self, job: Job) -> None:
+        try:
+            # Se valida de nuevo al entregar: el DNS del host pudo cambiar desde que se encoló
+            await asyncio.to_thread(validate_callback_url, job.callback_url)
+            await asyncio.to_thread(self.webhook_service.send_callback, job.callback_url, job.to_dict())
+            logger.info(f"Resultado del trabajo {job.id} entregado en {job.callback_url}")
+        except Exception as e:
+            logger.error(f"Error delivering callback for job {job.id}: {e}")
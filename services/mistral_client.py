@@ -0,0 +1,56 @@
+import httpx
+from mistralai import Mistral
+
+from config.settings import (
+    MISTRAL_MAX_CONNECTIONS,
+    MISTRAL_MAX_KEEPALIVE_CONNECTIONS,
+    MISTRAL_KEEPALIVE_EXPIRY,
+    MISTRAL_HTTP2,
+    MISTRAL_TIMEOUT_SECONDS,
+)
+from utils.logger import logger
+
+
+class SharedMistralClient:
+    def __init__(self, api_key: str):
+        """Crea un cliente Mistral de larga duración sobre transportes HTTP con pool de conexiones.
+
+        El mismo cliente se comparte entre OCRProcessor y ChatProcessor (y entre solicitudes),
+        de modo que las conexiones keep-alive evitan repetir el handshake TCP+TLS.
+
+        :param api_key: Clave API de Mistral.
+        """
+        limits = httpx.Limits(
+            max_connections=MISTRAL_MAX_CONNECTIONS,
+            max_keepalive_connections=MISTRAL_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=MISTRAL_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(MISTRAL_TIMEOUT_SECONDS)
+        http2 = MISTRAL_HTTP2 and self._http2_available()
+
+        self.http_client = httpx.Client(limits=limits, timeout=timeout, http2=http2)
+        self.async_http_client = httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+        self.client = Mistral(
+            api_key=api_key,
+            client=self.http_client,
+            async_client=self.async_http_client,
+        )
+        logger.info(
+            f"Cliente Mistral compartido creado (max_connections={MISTRAL_MAX_CONNECTIONS}, "
+            f"keepalive={MISTRAL_MAX_KEEPALIVE_CONNECTIONS}, http2={http2})"
+        )
+
+    @staticmethod
+    def _http2_available() -> bool:
+        try:
+            import h2  # noqa: F401
+            return True
+        except ImportError:
+            logger.warning("HTTP/2 solicitado pero el paquete 'h2' no está instalado; se usará HTTP/1.1")
+            return False
+
+    async def aclose(self) -> None:
+        """Cierra los transportes HTTP y libera las conexiones del pool."""
+        self.http_client.close()
+        await self.async_http_client.aclose()
+        logger.info("Cliente Mistral compartido cerrado")
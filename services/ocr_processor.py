@@ -1,79 +1,334 @@
-import base64
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Any, List, Optional
 from mistralai.models import ImageURLChunk
+from config.settings import (
+    OCR_MODEL,
+    OCR_PAGE_PARALLEL_ENABLED,
+    OCR_PAGE_PARALLEL_MIN_PAGES,
+    OCR_PAGES_PER_CHUNK,
+    OCR_PAGE_CONCURRENCY,
+)
+from services.caches import ocr_cache_key
+from services.rate_limiter import MistralCallScheduler, get_scheduler
+from utils.cache import LayeredCache
+from utils.file_encoder import FileEncoder
+from utils.image_preprocessor import preprocess_image
+from utils.pdf_pages import count_pdf_pages, page_ranges
 from utils.logger import logger
 
 class OCRProcessor:
-    def __init__(self, client):
+    def __init__(self, client, ocr_cache: Optional[LayeredCache] = None,
+                 scheduler: Optional[MistralCallScheduler] = None):
         """Inicializa el procesador de OCR con una instancia del cliente Mistral.
 
         :param client: Instancia del cliente Mistral, configurado con la clave API.
+        :param ocr_cache: Caché de markdown OCR por contenido; si se omite no se cachea.
+        :param scheduler: Planificador de llamadas a Mistral; si se omite se usa el del proceso.
         """
         self.client = client
+        self.ocr_cache = ocr_cache
+        self.scheduler = scheduler if scheduler is not None else get_scheduler()
 
-    def process_image(self, image_path: str) -> str:
+    def process_image(self, image_path: str, content_hash: Optional[str] = None) -> str:
         """Procesa una imagen utilizando OCR y retorna el resultado en formato markdown.
 
         :param image_path: Ruta del archivo de imagen.
+        :param content_hash: SHA-256 del archivo, si ya fue calculado por el llamador.
         :return: Texto en formato markdown extraído de la imagen.
         :raises FileNotFoundError: Si el archivo no existe.
         :raises Exception: Para otros errores durante el procesamiento.
         """
-        image_file = Path(image_path)
-        if not image_file.is_file():
-            logger.error(f"Archivo no encontrado: {image_path}")
-            raise FileNotFoundError(f"Archivo no encontrado: {image_path}")
+        image_bytes = self._require_file(image_path).read_bytes()
+        if content_hash is None and self.ocr_cache is not None:
+            content_hash = FileEncoder.hash_bytes(image_bytes)
+        prepared_bytes, mime_type = preprocess_image(image_bytes, Path(image_path).suffix)
+        return self.process_image_data_url(FileEncoder.to_data_url(prepared_bytes, mime_type), content_hash)
+
+    def process_image_data_url(self, base64_data_url: str, content_hash: Optional[str] = None) -> str:
+        """Procesa una imagen ya codificada como data URL y retorna el markdown extraído.
+
+        :param base64_data_url: Imagen codificada en base64 en formato data URL.
+        :param content_hash: SHA-256 de la imagen original; sin él no se usa la caché.
+        :return: Texto en formato markdown extraído de la imagen.
+        :raises Exception: Para errores durante el procesamiento.
+        """
+        cache_key = ocr_cache_key(content_hash) if self.ocr_cache is not None and content_hash else None
+        cached = self._get_cached_markdown(cache_key)
+        if cached is not None:
+            return cached
 
         try:
-            encoded = base64.b64encode(image_file.read_bytes()).decode('utf-8')
-            base64_data_url = f"data:image/jpeg;base64,{encoded}"
-            image_response = self.client.ocr.process(
+            image_response = self.scheduler.call(
+                "ocr",
+                self.client.ocr.process,
                 document=ImageURLChunk(image_url=base64_data_url),
-                model="mistral-ocr-latest"
+                model=OCR_MODEL
             )
-            return image_response.pages[0].markdown
+            markdown = image_response.pages[0].markdown
+            self._store_markdown(cache_key, markdown)
+            return markdown
         except Exception as e:
-            logger.error(f"Error al procesar la imagen {image_path}: {e}")
+            logger.error(f"Error al procesar la imagen: {e}")
             raise e
 
-    def process_pdf(self, pdf_path: str) -> str:
-        """Procesa un documento PDF utilizando OCR y retorna la URL firmada del documento procesado.
+    def process_pdf(self, pdf_path: str, content_hash: Optional[str] = None) -> str:
+        """Procesa un documento PDF utilizando OCR y retorna el markdown de todas sus páginas.
+
+        Se realiza una única llamada de OCR sin imágenes embebidas; el markdown resultante
+        se reutiliza en el chat y en los validadores. Si está en caché no se sube el archivo.
 
         :param pdf_path: Ruta del archivo PDF.
-        :return: URL firmada del documento PDF.
+        :param content_hash: SHA-256 del archivo, si ya fue calculado por el llamador.
+        :return: Texto en formato markdown extraído del PDF, con las páginas en orden.
         :raises FileNotFoundError: Si el archivo no existe.
         :raises Exception: Para otros errores durante el procesamiento.
         """
-        pdf_file = Path(pdf_path)
-        if not pdf_file.is_file():
-            logger.error(f"Archivo no encontrado: {pdf_path}")
-            raise FileNotFoundError(f"Archivo no encontrado: {pdf_path}")
+        pdf_file = self._require_file(pdf_path)
+        cache_key = self._ocr_cache_key(pdf_path, content_hash)
+        cached = self._get_cached_markdown(cache_key)
+        if cached is not None:
+            return cached
 
         try:
-            with open(pdf_file, "rb") as file_content:
-                uploaded_file = self.client.files.upload(
-                    file={
-                        "file_name": "uploaded_file.pdf",
-                        "content": file_content,
-                    },
-                    purpose="ocr",
-                )
-            # Se realiza la recuperación y firma del archivo subido
-            self.client.files.retrieve(file_id=uploaded_file.id)
-            signed_url = self.client.files.get_signed_url(file_id=uploaded_file.id)
-
-            # Opcional: Procesar el OCR del PDF si se requiere
-            ocr_response = self.client.ocr.process(
-                model="mistral-ocr-latest",
-                document={
-                    "type": "document_url",
-                    "document_url": signed_url.url,
+            # El contenido se lee completo para poder repetir la subida si Mistral responde 429/5xx
+            uploaded_file = self.scheduler.call(
+                "files",
+                self.client.files.upload,
+                file={
+                    "file_name": "uploaded_file.pdf",
+                    "content": pdf_file.read_bytes(),
                 },
-                include_image_base64=True,
+                purpose="ocr",
             )
-            
-            return signed_url.url
+            signed_url = self.scheduler.call("files", self.client.files.get_signed_url, file_id=uploaded_file.id)
+
+            page_count = self._parallel_page_count(pdf_path)
+            if page_count:
+                markdown = self._ocr_pages_in_parallel(signed_url.url, page_count)
+            else:
+                markdown = self._join_pages(self._ocr_document_url(signed_url.url))
+            self._store_markdown(cache_key, markdown)
+            return markdown
         except Exception as e:
             logger.error(f"Error al procesar el PDF {pdf_path}: {e}", exc_info=True)
-            raise e
\ No newline at end of file
+            raise e
+
+    def _ocr_document_url(self, document_url: str, pages: Optional[List[int]] = None) -> Any:
+        """Ejecuta el OCR sobre un documento firmado, opcionalmente solo sobre algunas páginas."""
+        return self.scheduler.call(
+            "ocr",
+            self.client.ocr.process,
+            model=OCR_MODEL,
+            document={
+                "type": "document_url",
+                "document_url": document_url,
+            },
+            pages=pages,
+            include_image_base64=False,
+        )
+
+    def _ocr_pages_in_parallel(self, document_url: str, page_count: int) -> str:
+        """Ejecuta el OCR por rangos de páginas en paralelo y reensambla el markdown en orden.
+
+        Si algún rango falla, o las páginas recibidas no son exactamente las estimadas, se
+        repite el OCR en una sola llamada, de modo que el resultado es siempre el mismo que
+        el de la llamada única.
+        """
+        ranges = page_ranges(page_count, OCR_PAGES_PER_CHUNK)
+        logger.info(f"OCR en paralelo de {page_count} páginas en {len(ranges)} rangos")
+        try:
+            with ThreadPoolExecutor(max_workers=OCR_PAGE_CONCURRENCY, thread_name_prefix="ocr-pages") as executor:
+                responses = list(executor.map(
+                    lambda page_range: self._ocr_document_url(document_url, list(range(*page_range))),
+                    ranges,
+                ))
+        except Exception as e:
+            logger.warning(f"Error en el OCR por rangos, se repite en una sola llamada: {e}")
+            return self._join_pages(self._ocr_document_url(document_url))
+        markdown = self._join_pages_in_order(responses, page_count)
+        if markdown is None:
+            return self._join_pages(self._ocr_document_url(document_url))
+        return markdown
+
+    @staticmethod
+    def _parallel_page_count(pdf_path: str) -> int:
+        """Retorna el número de páginas si el PDF debe procesarse por rangos, o 0 en caso contrario."""
+        if not OCR_PAGE_PARALLEL_ENABLED:
+            return 0
+        page_count = count_pdf_pages(pdf_path)
+        return page_count if page_count >= OCR_PAGE_PARALLEL_MIN_PAGES else 0
+
+    @staticmethod
+    def _require_file(file_path: str) -> Path:
+        """Retorna la ruta como Path verificando que el archivo exista."""
+        file = Path(file_path)
+        if not file.is_file():
+            logger.error(f"Archivo no encontrado: {file_path}")
+            raise FileNotFoundError(f"Archivo no encontrado: {file_path}")
+        return file
+
+    def _ocr_cache_key(self, file_path: str, content_hash: Optional[str]) -> Optional[str]:
+        """Retorna la clave de caché OCR del archivo, o None si la caché está deshabilitada."""
+        if self.ocr_cache is None:
+            return None
+        return ocr_cache_key(content_hash or FileEncoder.hash_file(file_path))
+
+    def _get_cached_markdown(self, cache_key: Optional[str]) -> Optional[str]:
+        if cache_key is None:
+            return None
+        markdown = self.ocr_cache.get(cache_key)
+        if markdown is not None:
+            logger.info("Markdown OCR obtenido de la caché")
+        return markdown
+
+    def _store_markdown(self, cache_key: Optional[str], markdown: str) -> None:
+        if cache_key is not None:
+            self.ocr_cache.set(cache_key, markdown)
+
+    @staticmethod
+    def _join_pages(ocr_response: Any) -> str:
+        """Une el markdown de todas las páginas de la respuesta OCR en orden."""
+        return "\n\n".join(page.markdown for page in ocr_response.pages)
+
+    @staticmethod
+    def _join_pages_in_order(ocr_responses: List[Any], page_count: int) -> Optional[str]:
+        """Une el markdown de varias respuestas OCR parciales ordenando las páginas por su índice.
+
+        Retorna None si las páginas recibidas no son exactamente 0..page_count-1, lo que indica
+        que la estimación del número de páginas era incorrecta (faltan o sobran páginas).
+        """
+        pages = sorted((page for response in ocr_responses for page in response.pages), key=lambda page: page.index)
+        if [page.index for page in pages] != list(range(page_count)):
+            logger.warning(
+                f"El OCR por rangos retornó {len(pages)} páginas para {page_count} estimadas, "
+                "se repite en una sola llamada"
+            )
+            return None
+        return "\n\n".join(page.markdown for page in pages)
+
+
+class AsyncOCRProcessor(OCRProcessor):
+    """Variante de OCRProcessor que utiliza los métodos asíncronos del SDK de Mistral."""
+
+    async def process_image(self, image_path: str, content_hash: Optional[str] = None) -> str:
+        """Procesa de forma asíncrona una imagen utilizando OCR y retorna el resultado en formato markdown.
+
+        :param image_path: Ruta del archivo de imagen.
+        :param content_hash: SHA-256 del archivo, si ya fue calculado por el llamador.
+        :return: Texto en formato markdown extraído de la imagen.
+        :raises FileNotFoundError: Si el archivo no existe.
+        :raises Exception: Para otros errores durante el procesamiento.
+        """
+        # La lectura, el hash y el redimensionado usan disco y CPU, se ejecutan fuera del event loop
+        image_bytes = await asyncio.to_thread(lambda: self._require_file(image_path).read_bytes())
+        if content_hash is None and self.ocr_cache is not None:
+            content_hash = await asyncio.to_thread(FileEncoder.hash_bytes, image_bytes)
+        prepared_bytes, mime_type = await asyncio.to_thread(preprocess_image, image_bytes, Path(image_path).suffix)
+        return await self.process_image_data_url(FileEncoder.to_data_url(prepared_bytes, mime_type), content_hash)
+
+    async def process_image_data_url(self, base64_data_url: str, content_hash: Optional[str] = None) -> str:
+        """Procesa de forma asíncrona una imagen ya codificada como data URL y retorna el markdown extraído.
+
+        :param base64_data_url: Imagen codificada en base64 en formato data URL.
+        :param content_hash: SHA-256 de la imagen original; sin él no se usa la caché.
+        :return: Texto en formato markdown extraído de la imagen.
+        :raises Exception: Para errores durante el procesamiento.
+        """
+        cache_key = ocr_cache_key(content_hash) if self.ocr_cache is not None and content_hash else None
+        # La caché puede tener una capa SQLite en disco: se consulta fuera del event loop
+        cached = await asyncio.to_thread(self._get_cached_markdown, cache_key)
+        if cached is not None:
+            return cached
+
+        try:
+            image_response = await self.scheduler.acall(
+                "ocr",
+                self.client.ocr.process_async,
+                document=ImageURLChunk(image_url=base64_data_url),
+                model=OCR_MODEL
+            )
+            markdown = image_response.pages[0].markdown
+            await asyncio.to_thread(self._store_markdown, cache_key, markdown)
+            return markdown
+        except Exception as e:
+            logger.error(f"Error al procesar la imagen: {e}")
+            raise e
+
+    async def process_pdf(self, pdf_path: str, content_hash: Optional[str] = None) -> str:
+        """Procesa de forma asíncrona un documento PDF utilizando OCR y retorna su markdown.
+
+        :param pdf_path: Ruta del archivo PDF.
+        :param content_hash: SHA-256 del archivo, si ya fue calculado por el llamador.
+        :return: Texto en formato markdown extraído del PDF, con las páginas en orden.
+        :raises FileNotFoundError: Si el archivo no existe.
+        :raises Exception: Para otros errores durante el procesamiento.
+        """
+        # El hash, la caché en disco, la lectura y el conteo de páginas bloquean: fuera del event loop
+        pdf_file = await asyncio.to_thread(self._require_file, pdf_path)
+        cache_key = await asyncio.to_thread(self._ocr_cache_key, pdf_path, content_hash)
+        cached = await asyncio.to_thread(self._get_cached_markdown, cache_key)
+        if cached is not None:
+            return cached
+
+        try:
+            pdf_bytes = await asyncio.to_thread(pdf_file.read_bytes)
+            uploaded_file = await self.scheduler.acall(
+                "files",
+                self.client.files.upload_async,
+                file={
+                    "file_name": "uploaded_file.pdf",
+                    "content": pdf_bytes,
+                },
+                purpose="ocr",
+            )
+            signed_url = await self.scheduler.acall(
+                "files", self.client.files.get_signed_url_async, file_id=uploaded_file.id
+            )
+
+            page_count = await asyncio.to_thread(self._parallel_page_count, pdf_path)
+            if page_count:
+                markdown = await self._ocr_pages_in_parallel(signed_url.url, page_count)
+            else:
+                markdown = self._join_pages(await self._ocr_document_url(signed_url.url))
+            await asyncio.to_thread(self._store_markdown, cache_key, markdown)
+            return markdown
+        except Exception as e:
+            logger.error(f"Error al procesar el PDF {pdf_path}: {e}", exc_info=True)
+            raise e
+
+    async def _ocr_document_url(self, document_url: str, pages: Optional[List[int]] = None) -> Any:
+        """Ejecuta de forma asíncrona el OCR sobre un documento firmado, opcionalmente sobre algunas páginas."""
+        return await self.scheduler.acall(
+            "ocr",
+            self.client.ocr.process_async,
+            model=OCR_MODEL,
+            document={
+                "type": "document_url",
+                "document_url": document_url,
+            },
+            pages=pages,
+            include_image_base64=False,
+        )
+
+    async def _ocr_pages_in_parallel(self, document_url: str, page_count: int) -> str:
+        """Ejecuta el OCR por rangos de páginas como corrutinas concurrentes y reensambla el markdown."""
+        ranges = page_ranges(page_count, OCR_PAGES_PER_CHUNK)
+        logger.info(f"OCR en paralelo de {page_count} páginas en {len(ranges)} rangos")
+        semaphore = asyncio.Semaphore(OCR_PAGE_CONCURRENCY)
+
+        async def process_range(start: int, end: int) -> Any:
+            async with semaphore:
+                return await self._ocr_document_url(document_url, list(range(start, end)))
+
+        try:
+            responses = await asyncio.gather(*(process_range(start, end) for start, end in ranges))
+        except Exception as e:
+            logger.warning(f"Error en el OCR por rangos, se repite en una sola llamada: {e}")
+            return self._join_pages(await self._ocr_document_url(document_url))
+        markdown = self._join_pages_in_order(responses, page_count)
+        if markdown is None:
+            return self._join_pages(await self._ocr_document_url(document_url))
+        return markdown
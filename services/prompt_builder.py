@@ -0,0 +1,162 @@
+import re
+import threading
+from typing import Dict, Optional, Tuple
+
+from config.settings import TEMPLATE, PROMPT_COUNTRY_SPECIFIC
+from utils.logger import logger
+from utils.post_processing.country_processors import fold_accents, normalize_country
+
+# Instrucción común que encabeza todos los prompts
+RESPONSE_INSTRUCTIONS = (
+    "IMPORTANTE: Debes devolver SIEMPRE un JSON válido con la siguiente estructura. "
+    "Si algún campo no está presente en el documento, déjalo como cadena vacía pero manteniendo "
+    "la estructura intacta.\n\n"
+)
+
+FISCAL_DETECTION_HEADER = "DETECCIÓN DE DOCUMENTOS FISCALES: Analiza cuidadosamente cada país según estas reglas:\n\n"
+
+# Reglas de detección de documentos fiscales por país
+FISCAL_DETECTION_RULES = {
+    "colombia": (
+        "COLOMBIA: Un documento colombiano ES un documento fiscal si contiene UNO DE ESTOS elementos: "
+        "(a) Menciona 'RUT' o 'Registro Único Tributario' en cualquier parte del documento, O "
+        "(b) Contiene un NIT junto con un dígito de verificación, O "
+        "(c) Contiene una referencia a la DIAN. "
+        "Si cualquiera de estos elementos está presente, el documento es fiscal (`true`). "
+        "IMPORTANTE: No exijas que se cumplan TODAS las condiciones para Colombia, con UNA es suficiente.\n\n"
+    ),
+    "panama": (
+        "PANAMÁ: Un documento panameño ES un documento fiscal cuando contiene: "
+        "(a) Un número de identificación con guiones (como '3-753-2443'), Y "
+        "(b) Menciona un establecimiento comercial o actividades económicas, Y "
+        "(c) Contiene referencias a PanamaEmprende o Aviso de Operación.\n\n"
+    ),
+    "argentina": (
+        "ARGENTINA: Un documento argentino ES un documento fiscal cuando contiene: "
+        "(a) Un número CUIT/CUIL (como '33-70707631-9'), Y "
+        "(b) Menciona una empresa u organización, Y "
+        "(c) Hace referencia a la AFIP.\n\n"
+    ),
+}
+
+# Marcadores fuertes de cada país en el texto OCR, usados para elegir la sección del prompt
+_COUNTRY_MARKERS = {
+    "colombia": re.compile(r"\bDIAN\b|\bNIT\b|Registro\s+[ÚU]nico\s+Tributario|\bColombia", re.IGNORECASE),
+    "panama": re.compile(r"PanamaEmprende|Aviso\s+de\s+Operaci[óo]n|\bPanam[aá]\b", re.IGNORECASE),
+    "argentina": re.compile(r"\bAFIP\b|\bCUIT\b|\bCUIL\b|\bArgentina\b", re.IGNORECASE),
+    "peru": re.compile(r"\bSUNAT\b|Ficha\s+RUC|\bPer[uú]\b", re.IGNORECASE),
+}
+
+_COUNTRY_RULES_HEADER = "### **Reglas por País**"
+_JSON_FORMAT_HEADER = "### **Formato JSON esperado**"
+_COUNTRY_SECTION_PATTERN = re.compile(r"^[ \t]*####[ \t]*(.+?):[ \t]*$", re.MULTILINE)
+
+
+def _split_template(template: str) -> Optional[Tuple[str, Dict[str, str], str]]:
+    """Divide la plantilla en reglas generales, secciones por país y formato JSON.
+
+    :return: Tupla (reglas generales, secciones por país, formato JSON) o None si la
+        plantilla no tiene la estructura esperada (por ejemplo, si fue personalizada).
+    """
+    rules_start = template.find(_COUNTRY_RULES_HEADER)
+    format_start = template.find(_JSON_FORMAT_HEADER)
+    if rules_start < 0 or format_start < rules_start:
+        return None
+
+    country_block = template[rules_start + len(_COUNTRY_RULES_HEADER):format_start]
+    headings = list(_COUNTRY_SECTION_PATTERN.finditer(country_block))
+    if not headings:
+        return None
+
+    sections = {}
+    for i, heading in enumerate(headings):
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(country_block)
+        key = normalize_country(heading.group(1)) or fold_accents(heading.group(1)).split()[0]
+        sections[key] = country_block[heading.start():end].strip("\n")
+    return template[:rules_start].rstrip() + "\n\n", sections, template[format_start:].strip("\n")
+
+
+_TEMPLATE_PARTS = _split_template(TEMPLATE)
+
+
+def detect_prompt_country(ocr_markdown: str) -> Optional[str]:
+    """Detecta el país del documento a partir de marcadores fuertes en el OCR.
+
+    Solo retorna un país si es el único con la mayor cantidad de marcadores; ante empate
+    o ausencia de marcadores retorna None y se usa el prompt completo.
+    """
+    if not ocr_markdown:
+        return None
+    scores = {country: len(pattern.findall(ocr_markdown)) for country, pattern in _COUNTRY_MARKERS.items()}
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    best, best_score = ranked[0]
+    if best_score == 0 or best_score == ranked[1][1]:
+        return None
+    return best
+
+
+def build_prompt(ocr_markdown: str, source: str) -> Tuple[str, Optional[str]]:
+    """Construye el prompt del chat con un prefijo estático común y las reglas del país detectado.
+
+    El prefijo (instrucciones, reglas generales y formato JSON) es idéntico en todas las
+    solicitudes; después se añaden solo las reglas del país y, al final, el OCR.
+    Si no se detecta el país o la plantilla no tiene la estructura esperada, se incluyen
+    las reglas de todos los países.
+
+    :param ocr_markdown: Texto obtenido del OCR en formato markdown.
+    :param source: Descripción del origen del OCR (por ejemplo "image's").
+    :return: Tupla (prompt, país usado o None si se usó el prompt completo).
+    """
+    ocr_block = f"This is {source} OCR in markdown:\n\n{ocr_markdown}\n\n"
+    if _TEMPLATE_PARTS is None:
+        fiscal_rules = "".join(FISCAL_DETECTION_RULES.values())
+        return RESPONSE_INSTRUCTIONS + TEMPLATE + "\n\n" + FISCAL_DETECTION_HEADER + fiscal_rules + ocr_block, None
+
+    general_rules, sections, json_format = _TEMPLATE_PARTS
+    country = detect_prompt_country(ocr_markdown) if PROMPT_COUNTRY_SPECIFIC else None
+    if country is not None and country in sections:
+        country_sections = [sections[country]]
+        fiscal_rules = [FISCAL_DETECTION_RULES[country]] if country in FISCAL_DETECTION_RULES else []
+    else:
+        country = None
+        country_sections = list(sections.values())
+        fiscal_rules = list(FISCAL_DETECTION_RULES.values())
+
+    prompt = (
+        RESPONSE_INSTRUCTIONS
+        + general_rules
+        + json_format + "\n\n"
+        + _COUNTRY_RULES_HEADER + "\n"
+        + "\n\n".join(country_sections) + "\n\n"
+        + (FISCAL_DETECTION_HEADER + "".join(fiscal_rules) if fiscal_rules else "")
+        + ocr_block
+    )
+    return prompt, country
+
+
+class PromptStats:
+    """Contadores de tokens de entrada por tipo de prompt, para medir el ahorro."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def record(self, country: Optional[str], prompt_tokens: Optional[int]) -> None:
+        key = country or "full"
+        logger.info(f"Prompt '{key}' enviado con {prompt_tokens} tokens de entrada")
+        if prompt_tokens is None:
+            return
+        with self._lock:
+            stats = self._stats.setdefault(key, {"requests": 0, "prompt_tokens": 0})
+            stats["requests"] += 1
+            stats["prompt_tokens"] += prompt_tokens
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                key: {**stats, "avg_prompt_tokens": round(stats["prompt_tokens"] / stats["requests"], 1)}
+                for key, stats in self._stats.items()
+            }
+
+
+prompt_stats = PromptStats()
@@ -0,0 +1,597 @@
+import asyncio
+import functools
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import httpx
+
+from config.settings import (
+    ADAPTIVE_CONCURRENCY_ENABLED,
+    ADAPTIVE_CONCURRENCY_BACKOFF_RATIO,
+    OCR_CONCURRENCY_INITIAL,
+    OCR_CONCURRENCY_MIN,
+    OCR_CONCURRENCY_MAX,
+    OCR_LATENCY_TARGET_SECONDS,
+    CHAT_CONCURRENCY_INITIAL,
+    CHAT_CONCURRENCY_MIN,
+    CHAT_CONCURRENCY_MAX,
+    CHAT_LATENCY_TARGET_SECONDS,
+    CIRCUIT_BREAKER_ENABLED,
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    CIRCUIT_BREAKER_RECOVERY_SECONDS,
+    CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS,
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_REQUESTS_PER_MINUTE,
+    RATE_LIMIT_TOKENS_PER_MINUTE,
+    RATE_LIMIT_STATE_PATH,
+    RATE_LIMIT_MAX_RETRIES,
+    RATE_LIMIT_BACKOFF_BASE_SECONDS,
+    RATE_LIMIT_BACKOFF_MAX_SECONDS,
+    RATE_LIMIT_MAX_WAIT_SECONDS,
+)
+from services.adaptive_limiter import AdaptiveLimiter
+from services.circuit_breaker import CLOSED, CircuitBreaker, CircuitOpenError
+from services.hedging import HedgingPolicy, chat_hedging
+from utils.logger import logger
+
+# Segundos de presupuesto de solicitudes que pueden consumirse de golpe tras un periodo inactivo
+_REQUEST_BURST_SECONDS = 10
+# Tokens reservados para la respuesta del chat y para cada imagen, además de los del prompt
+COMPLETION_TOKENS_ALLOWANCE = 1024
+IMAGE_TOKENS_ALLOWANCE = 1500
+_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Etapa del pipeline a la que pertenece cada llamada; cada etapa tiene su propio límite de concurrencia
+_STAGES = {"ocr": "ocr", "files": "ocr", "chat": "chat"}
+
+
+class RateLimitExceededError(Exception):
+    """Se lanza cuando el presupuesto de Mistral no alcanza dentro del tiempo máximo de espera."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Se agotó el presupuesto de solicitudes a Mistral")
+        self.retry_after = retry_after
+
+    def __reduce__(self):
+        # Permite devolver la excepción desde un proceso worker del pipeline
+        return self.__class__, (self.retry_after,)
+
+
+class Bucket(NamedTuple):
+    """Cubeta de tokens: capacidad máxima y reposición por segundo."""
+    name: str
+    capacity: float
+    refill_per_second: float
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación rápida de los tokens de un texto (unos 4 caracteres por token)."""
+    return len(text) // 4 + 1
+
+
+def _take(state: Dict[str, Tuple[float, float]], demands: List[Tuple[Bucket, float]], paused_until: float,
+          now: float) -> float:
+    """Repone las cubetas y, si todas tienen saldo, descuenta la demanda de cada una.
+
+    :param state: Saldo y fecha de actualización de cada cubeta; se modifica en sitio.
+    :param demands: Cubetas y cantidad a descontar de cada una.
+    :param paused_until: Instante hasta el que Mistral pidió no enviar solicitudes.
+    :param now: Instante actual (segundos desde epoch).
+    :return: 0 si se concedió la demanda, o los segundos a esperar antes de reintentar.
+    """
+    if paused_until > now:
+        return paused_until - now
+    wait = 0.0
+    for bucket, amount in demands:
+        level, updated_at = state.get(bucket.name, (bucket.capacity, now))
+        level = min(bucket.capacity, level + max(0.0, now - updated_at) * bucket.refill_per_second)
+        state[bucket.name] = (level, now)
+        # Una demanda mayor que la capacidad se limita para que pueda concederse alguna vez
+        amount = min(amount, bucket.capacity)
+        if level < amount:
+            wait = max(wait, (amount - level) / bucket.refill_per_second)
+    if wait > 0:
+        return wait
+    for bucket, amount in demands:
+        level, _ = state[bucket.name]
+        state[bucket.name] = (level - min(amount, bucket.capacity), now)
+    return 0.0
+
+
+class MemoryBudgetStore:
+    """Saldo de las cubetas en memoria, propio de cada proceso."""
+
+    # Las operaciones no bloquean: pueden ejecutarse directamente en el event loop
+    blocking = False
+
+    def __init__(self):
+        self._state: Dict[str, Tuple[float, float]] = {}
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def take(self, demands: List[Tuple[Bucket, float]]) -> float:
+        with self._lock:
+            return _take(self._state, demands, self._paused_until, time.time())
+
+    def adjust(self, bucket: Bucket, amount: float) -> None:
+        """Suma (o resta, si es negativo) saldo a una cubeta, sin superar su capacidad."""
+        with self._lock:
+            level, updated_at = self._state.get(bucket.name, (bucket.capacity, time.time()))
+            self._state[bucket.name] = (min(bucket.capacity, level + amount), updated_at)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.time() + seconds)
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteBudgetStore:
+    """Saldo de las cubetas en SQLite, compartido por todos los workers de uvicorn de la máquina."""
+
+    _PAUSE_ROW = "__paused__"
+    # Cada operación espera el bloqueo de escritura del archivo: fuera del event loop
+    blocking = True
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit: las transacciones se abren explícitamente con BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Con WAL basta sincronizar en los checkpoints; el saldo no necesita sobrevivir a un corte de energía
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit ("
+            "name TEXT PRIMARY KEY, level REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _transaction(self, update: Callable[[Dict[str, Tuple[float, float]], float], Any]) -> Any:
+        """Ejecuta una actualización del estado bajo un bloqueo de escritura entre procesos."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                state = {
+                    name: (level, updated_at)
+                    for name, level, updated_at in self._conn.execute("SELECT name, level, updated_at FROM rate_limit")
+                }
+                paused_until = state.pop(self._PAUSE_ROW, (0.0, 0.0))[1]
+                result = update(state, paused_until)
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO rate_limit (name, level, updated_at) VALUES (?, ?, ?)",
+                    [(name, level, updated_at) for name, (level, updated_at) in state.items()],
+                )
+                self._conn.execute("COMMIT")
+                return result
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def take(self, demands: List[Tuple[Bucket, float]]) -> float:
+        return self._transaction(lambda state, paused_until: _take(state, demands, paused_until, time.time()))
+
+    def adjust(self, bucket: Bucket, amount: float) -> None:
+        """Suma (o resta, si es negativo) saldo a una cubeta, sin superar su capacidad."""
+        def update(state, paused_until):
+            level, updated_at = state.get(bucket.name, (bucket.capacity, time.time()))
+            state[bucket.name] = (min(bucket.capacity, level + amount), updated_at)
+        self._transaction(update)
+
+    def pause(self, seconds: float) -> None:
+        def update(state, paused_until):
+            state[self._PAUSE_ROW] = (0.0, max(paused_until, time.time() + seconds))
+        self._transaction(update)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    """Código HTTP de un error del SDK de Mistral o de httpx, si lo tiene."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Segundos indicados por la cabecera Retry-After de la respuesta de error, si existe."""
+    response = getattr(error, "raw_response", None) or getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    value = headers.get("retry-after") if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_retryable(error: BaseException) -> bool:
+    return _status_code(error) in _RETRYABLE_STATUS or isinstance(error, httpx.TransportError)
+
+
+def _service_outcome(error: Optional[BaseException]) -> Optional[bool]:
+    """Indica si el intento muestra el servicio disponible (True), caído (False) o nada (None).
+
+    Un 429 es un límite de cuota, no una caída, y una cancelación no dice nada del servicio.
+    """
+    if error is None:
+        return True
+    if not isinstance(error, Exception):
+        return None
+    status = _status_code(error)
+    if status == 429:
+        return None
+    if (status is not None and status >= 500) or isinstance(error, httpx.TransportError):
+        return False
+    return True
+
+
+class MistralCallScheduler:
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        store: Any,
+        max_retries: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        max_wait: float = 120.0,
+        limiters: Optional[Dict[str, AdaptiveLimiter]] = None,
+        breakers: Optional[Dict[str, CircuitBreaker]] = None,
+        hedging: Optional[Dict[str, HedgingPolicy]] = None,
+    ):
+        """Planificador de las llamadas a Mistral con presupuesto por minuto y reintentos.
+
+        Antes de cada llamada se reserva una solicitud y, para el chat, los tokens estimados;
+        si no hay saldo se espera lo justo para que se reponga. Los errores 429 y 5xx se
+        reintentan con espera exponencial con jitter, respetando Retry-After, y un 429 pausa
+        a todos los workers que comparten el estado. Si se indican limitadores, cada intento
+        ocupa además un cupo de concurrencia de su etapa, que se ajusta con AIMD, y si se
+        indican circuitos, las llamadas a un endpoint caído fallan de inmediato. Con una
+        política de hedging, el intento ya admitido se duplica si tarda más que el percentil
+        de latencia y sobra presupuesto y cupo para la copia.
+
+        :param requests_per_minute: Solicitudes por minuto permitidas (0 = sin límite).
+        :param tokens_per_minute: Tokens por minuto permitidos en el chat (0 = sin límite).
+        :param store: Almacén del saldo (MemoryBudgetStore o SQLiteBudgetStore).
+        :param max_retries: Reintentos por llamada ante errores transitorios.
+        :param backoff_base: Espera base en segundos del primer reintento.
+        :param backoff_max: Espera máxima en segundos entre reintentos.
+        :param max_wait: Segundos máximos esperando presupuesto antes de rechazar la llamada.
+        :param limiters: Limitador de concurrencia adaptativo de cada etapa ("ocr", "chat").
+        :param breakers: Circuito de cada endpoint ("ocr", "files", "chat").
+        :param hedging: Política de hedging de cada endpoint (por ejemplo "chat").
+        """
+        self.requests_bucket = Bucket(
+            "requests", max(1.0, requests_per_minute / 60 * _REQUEST_BURST_SECONDS), requests_per_minute / 60
+        ) if requests_per_minute > 0 else None
+        self.tokens_bucket = Bucket(
+            "tokens", float(tokens_per_minute), tokens_per_minute / 60
+        ) if tokens_per_minute > 0 else None
+        self.store = store
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_wait = max_wait
+        self.limiters = limiters or {}
+        self.breakers = breakers or {}
+        self.hedging = hedging or {}
+        self.throttled_seconds = 0.0
+        self.retries = 0
+
+    def _demands(self, tokens: int) -> List[Tuple[Bucket, float]]:
+        demands = []
+        if self.requests_bucket is not None:
+            demands.append((self.requests_bucket, 1))
+        if self.tokens_bucket is not None and tokens:
+            demands.append((self.tokens_bucket, tokens))
+        return demands
+
+    def _reserve_wait(self, demands: List[Tuple[Bucket, float]], waited: float) -> float:
+        """Intenta reservar el presupuesto y retorna los segundos a esperar (0 si se reservó)."""
+        if not demands:
+            return 0.0
+        wait = self.store.take(demands)
+        if wait > 0 and waited + wait > self.max_wait:
+            logger.warning(f"Presupuesto de Mistral agotado, se rechaza la llamada (espera estimada {wait:.1f}s)")
+            raise RateLimitExceededError(math.ceil(wait))
+        if wait > 0:
+            self.throttled_seconds += wait
+        return wait
+
+    def _refund(self, demands: List[Tuple[Bucket, float]]) -> None:
+        """Devuelve el presupuesto reservado para un intento que no llegó a llamar a Mistral."""
+        for bucket, amount in demands:
+            self.store.adjust(bucket, amount)
+
+    def _backoff(self, endpoint: str, attempt: int, error: BaseException) -> float:
+        """Calcula la espera antes del siguiente intento, o relanza el error si no debe reintentarse."""
+        if attempt >= self.max_retries or not _is_retryable(error):
+            if _status_code(error) == 429:
+                raise RateLimitExceededError(math.ceil(_retry_after_seconds(error) or self.backoff_max)) from error
+            raise error
+        # Full jitter: espera aleatoria entre 0 y el tope exponencial del intento
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        retry_after = _retry_after_seconds(error)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        if _status_code(error) == 429:
+            self.store.pause(delay)
+        self.retries += 1
+        logger.warning(f"Llamada '{endpoint}' a Mistral falló ({error}); reintento {attempt + 1} en {delay:.1f}s")
+        return delay
+
+    def settle_tokens(self, estimated: int, actual: Optional[int]) -> None:
+        """Corrige el saldo de tokens con el consumo real informado por Mistral."""
+        if self.tokens_bucket is not None and actual is not None and actual != estimated:
+            self.store.adjust(self.tokens_bucket, estimated - actual)
+
+    async def asettle_tokens(self, estimated: int, actual: Optional[int]) -> None:
+        """Variante asíncrona de settle_tokens que no bloquea el event loop."""
+        await self._off_loop(self.settle_tokens, estimated, actual)
+
+    async def _off_loop(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Ejecuta una operación sobre el saldo en un hilo si el almacén bloquea (SQLite).
+
+        Un bloqueo de escritura disputado entre workers puede tardar hasta el timeout de la
+        conexión; en el event loop detendría todas las corrutinas del worker, incluido /health.
+        """
+        if self.store.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    def _attempt_guards(self, endpoint: str) -> Tuple[Optional[AdaptiveLimiter], Optional[CircuitBreaker]]:
+        return self.limiters.get(_STAGES.get(endpoint, endpoint)), self.breakers.get(endpoint)
+
+    @staticmethod
+    def _finish_attempt(limiter: Optional[AdaptiveLimiter], started_at: float, breaker: Optional[CircuitBreaker],
+                        probe: bool, error: Optional[BaseException]) -> None:
+        """Libera el cupo de concurrencia y registra el resultado del intento en el circuito."""
+        if limiter is not None:
+            limiter.release(started_at, congested=error is not None and _is_retryable(error))
+        if breaker is not None:
+            breaker.record(probe, _service_outcome(error))
+
+    def _reserve_hedge(self, endpoint: str, demands: List[Tuple[Bucket, float]]
+                       ) -> Optional[Callable[[Optional[BaseException]], None]]:
+        """Reserva sin esperar el cupo y el presupuesto de una copia del intento en curso.
+
+        La copia solo se lanza con capacidad sobrante: nunca espera presupuesto ni cupo, de
+        modo que no compite con las llamadas que ya están esperando ni se lanza mientras el
+        propio planificador está limitando el ritmo.
+
+        :return: Función que libera la reserva con el error de la copia (o None), o None si no hay margen.
+        """
+        limiter, breaker = self._attempt_guards(endpoint)
+        if breaker is not None and breaker.state != CLOSED:
+            return None
+        started_at = limiter.try_acquire() if limiter is not None else 0.0
+        if started_at is None:
+            return None
+        if self.store.take(demands) > 0:
+            if limiter is not None:
+                limiter.abandon()
+            return None
+        return lambda error: self._finish_attempt(limiter, started_at, breaker, False, error)
+
+    def call(self, endpoint: str, fn: Callable[..., Any], *args: Any, tokens: int = 0, **kwargs: Any) -> Any:
+        """Ejecuta una llamada síncrona a Mistral respetando el presupuesto y reintentando errores transitorios.
+
+        :param endpoint: Nombre de la llamada ("ocr", "files" o "chat"), usado en los logs.
+        :param fn: Método del SDK a invocar.
+        :param tokens: Tokens estimados que consume la llamada.
+        :return: La respuesta del SDK.
+        :raises RateLimitExceededError: Si el presupuesto no alcanza dentro del tiempo máximo de espera.
+        :raises CircuitOpenError: Si el circuito del endpoint está abierto.
+        """
+        demands = self._demands(tokens)
+        limiter, breaker = self._attempt_guards(endpoint)
+        attempt = 0
+        waited = 0.0
+        while True:
+            if breaker is not None:
+                breaker.check()
+            wait = self._reserve_wait(demands, waited)
+            if wait > 0:
+                waited += wait
+                time.sleep(wait)
+                continue
+            try:
+                probe = breaker.allow() if breaker is not None else False
+            except CircuitOpenError:
+                # El circuito se abrió (o ya hay una prueba en curso) mientras se reservaba el presupuesto
+                self._refund(demands)
+                raise
+            started_at = limiter.acquire() if limiter is not None else 0.0
+            hedging = self.hedging.get(endpoint) if not probe else None
+            try:
+                if hedging is not None:
+                    # La política libera el cupo de cada copia cuando termina, también el de la perdedora
+                    result = hedging.call(
+                        functools.partial(fn, *args, **kwargs), lambda: self._reserve_hedge(endpoint, demands),
+                        functools.partial(self._finish_attempt, limiter, started_at, breaker, probe),
+                    )
+                else:
+                    result = fn(*args, **kwargs)
+            except BaseException as e:
+                if hedging is None:
+                    self._finish_attempt(limiter, started_at, breaker, probe, e)
+                if not isinstance(e, Exception):
+                    raise
+                delay = self._backoff(endpoint, attempt, e)
+                attempt += 1
+                time.sleep(delay)
+            else:
+                if hedging is None:
+                    self._finish_attempt(limiter, started_at, breaker, probe, None)
+                return result
+
+    async def acall(self, endpoint: str, fn: Callable[..., Awaitable[Any]], *args: Any, tokens: int = 0,
+                    **kwargs: Any) -> Any:
+        """Variante asíncrona de call para los métodos *_async del SDK."""
+        demands = self._demands(tokens)
+        limiter, breaker = self._attempt_guards(endpoint)
+        attempt = 0
+        waited = 0.0
+        while True:
+            if breaker is not None:
+                breaker.check()
+            wait = await self._off_loop(self._reserve_wait, demands, waited)
+            if wait > 0:
+                waited += wait
+                await asyncio.sleep(wait)
+                continue
+            try:
+                probe = breaker.allow() if breaker is not None else False
+            except CircuitOpenError:
+                await self._off_loop(self._refund, demands)
+                raise
+            try:
+                started_at = await limiter.acquire_async() if limiter is not None else 0.0
+            except BaseException:
+                # Cancelada mientras esperaba cupo: liberar la prueba del circuito sin registrar resultado
+                if breaker is not None:
+                    breaker.record(probe, None)
+                raise
+            hedging = self.hedging.get(endpoint) if not probe else None
+            try:
+                if hedging is not None:
+                    result = await hedging.acall(
+                        functools.partial(fn, *args, **kwargs),
+                        lambda: self._off_loop(self._reserve_hedge, endpoint, demands),
+                        functools.partial(self._finish_attempt, limiter, started_at, breaker, probe),
+                    )
+                else:
+                    result = await fn(*args, **kwargs)
+            except BaseException as e:
+                # Incluye la cancelación de la tarea: el cupo se libera igual
+                if hedging is None:
+                    self._finish_attempt(limiter, started_at, breaker, probe, e)
+                if not isinstance(e, Exception):
+                    raise
+                # _backoff puede pausar el saldo compartido tras un 429
+                delay = await self._off_loop(self._backoff, endpoint, attempt, e)
+                attempt += 1
+                await asyncio.sleep(delay)
+            else:
+                if hedging is None:
+                    self._finish_attempt(limiter, started_at, breaker, probe, None)
+                return result
+
+    def circuit_stats(self) -> Dict[str, Any]:
+        """Estado del circuito de cada endpoint."""
+        return {endpoint: breaker.snapshot() for endpoint, breaker in self.breakers.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests_per_minute": RATE_LIMIT_REQUESTS_PER_MINUTE,
+            "tokens_per_minute": RATE_LIMIT_TOKENS_PER_MINUTE,
+            "throttled_seconds": round(self.throttled_seconds, 2),
+            "retries": self.retries,
+        }
+
+    def concurrency_stats(self) -> Dict[str, Any]:
+        """Límite actual, llamadas en vuelo y en espera de cada etapa."""
+        return {stage: limiter.snapshot() for stage, limiter in self.limiters.items()}
+
+    def close(self) -> None:
+        self.store.close()
+
+
+_scheduler: Optional[MistralCallScheduler] = None
+_scheduler_pid: Optional[int] = None
+_scheduler_lock = threading.Lock()
+
+
+def create_limiters() -> Dict[str, AdaptiveLimiter]:
+    """Crea los limitadores de concurrencia adaptativos de OCR y chat, o ninguno si están deshabilitados."""
+    if not ADAPTIVE_CONCURRENCY_ENABLED:
+        return {}
+    return {
+        "ocr": AdaptiveLimiter(
+            "ocr",
+            initial_limit=OCR_CONCURRENCY_INITIAL,
+            min_limit=OCR_CONCURRENCY_MIN,
+            max_limit=OCR_CONCURRENCY_MAX,
+            latency_target=OCR_LATENCY_TARGET_SECONDS,
+            backoff_ratio=ADAPTIVE_CONCURRENCY_BACKOFF_RATIO,
+        ),
+        "chat": AdaptiveLimiter(
+            "chat",
+            initial_limit=CHAT_CONCURRENCY_INITIAL,
+            min_limit=CHAT_CONCURRENCY_MIN,
+            max_limit=CHAT_CONCURRENCY_MAX,
+            latency_target=CHAT_LATENCY_TARGET_SECONDS,
+            backoff_ratio=ADAPTIVE_CONCURRENCY_BACKOFF_RATIO,
+        ),
+    }
+
+
+def create_breakers() -> Dict[str, CircuitBreaker]:
+    """Crea un circuito por endpoint de Mistral, o ninguno si están deshabilitados."""
+    if not CIRCUIT_BREAKER_ENABLED:
+        return {}
+    return {
+        endpoint: CircuitBreaker(
+            endpoint,
+            failure_threshold=CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            recovery_seconds=CIRCUIT_BREAKER_RECOVERY_SECONDS,
+            half_open_max_calls=CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS,
+        )
+        for endpoint in ("ocr", "files", "chat")
+    }
+
+
+def create_scheduler() -> MistralCallScheduler:
+    """Crea el planificador según la configuración; sin presupuesto ni reintentos si RATE_LIMIT_ENABLED es falso."""
+    if not RATE_LIMIT_ENABLED:
+        return MistralCallScheduler(
+            0, 0, MemoryBudgetStore(), max_retries=0, limiters=create_limiters(), breakers=create_breakers(),
+            hedging={"chat": chat_hedging},
+        )
+    store = SQLiteBudgetStore(RATE_LIMIT_STATE_PATH) if RATE_LIMIT_STATE_PATH else MemoryBudgetStore()
+    logger.info(
+        f"Límite de llamadas a Mistral: {RATE_LIMIT_REQUESTS_PER_MINUTE} RPM, {RATE_LIMIT_TOKENS_PER_MINUTE} TPM "
+        f"(compartido={bool(RATE_LIMIT_STATE_PATH)})"
+    )
+    return MistralCallScheduler(
+        RATE_LIMIT_REQUESTS_PER_MINUTE,
+        RATE_LIMIT_TOKENS_PER_MINUTE,
+        store,
+        max_retries=RATE_LIMIT_MAX_RETRIES,
+        backoff_base=RATE_LIMIT_BACKOFF_BASE_SECONDS,
+        backoff_max=RATE_LIMIT_BACKOFF_MAX_SECONDS,
+        max_wait=RATE_LIMIT_MAX_WAIT_SECONDS,
+        limiters=create_limiters(),
+        breakers=create_breakers(),
+        hedging={"chat": chat_hedging},
+    )
+
+
+def get_scheduler() -> MistralCallScheduler:
+    """Retorna el planificador del proceso actual, creándolo en el primer uso.
+
+    Cada proceso (workers de uvicorn o del pool de procesos) crea el suyo para no heredar
+    la conexión SQLite del proceso padre; el saldo se comparte a través del archivo.
+    """
+    global _scheduler, _scheduler_pid
+    with _scheduler_lock:
+        if _scheduler is None or _scheduler_pid != os.getpid():
+            _scheduler = create_scheduler()
+            _scheduler_pid = os.getpid()
+        return _scheduler
@@ -1,23 +1,212 @@
-from config.settings import WEBHOOK_URL
+import asyncio
+import ipaddress
+import socket
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+from urllib.parse import urlsplit
+
+import httpx
 import requests
 
+from config.settings import (
+    JOB_CALLBACK_ALLOWED_HOSTS,
+    WEBHOOK_URL,
+    WEBHOOK_COALESCE_WINDOW_SECONDS,
+    WEBHOOK_MAX_PENDING,
+    WEBHOOK_TIMEOUT_SECONDS,
+)
+from utils.logger import logger
+
+
+class InvalidCallbackURLError(ValueError):
+    """Se lanza cuando una URL de callback no es http(s) o apunta a un host no permitido."""
+
+
+def validate_callback_url(url: str, allowed_hosts: Sequence[str] = JOB_CALLBACK_ALLOWED_HOSTS) -> None:
+    """Comprueba que una URL de callback sea segura para que el servidor le haga POST.
+
+    Se exige http(s) y, si hay lista de hosts permitidos, que el host esté en ella; en cualquier
+    caso el host no puede resolver a direcciones privadas, de loopback, link-local ni reservadas.
+
+    :raises InvalidCallbackURLError: Si la URL no cumple alguna de las condiciones.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise InvalidCallbackURLError("callback_url must be an http(s) URL")
+    host = parts.hostname.lower()
+    if allowed_hosts and host not in allowed_hosts:
+        raise InvalidCallbackURLError(f"callback_url host '{host}' is not allowed")
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, parts.port or 443, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, UnicodeError, ValueError):
+        raise InvalidCallbackURLError(f"callback_url host '{host}' cannot be resolved")
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%", 1)[0])
+        if not ip.is_global:
+            raise InvalidCallbackURLError(f"callback_url host '{host}' resolves to a non-public address")
+
+
+class _Alert:
+    """Mensaje de alerta pendiente y sus repeticiones dentro de la ventana actual."""
+
+    __slots__ = ("announced", "repeats", "window_started")
+
+    def __init__(self):
+        self.announced = False
+        self.repeats = 0
+        self.window_started = 0.0
+
+
 class WebhookService:
-    def __init__(self, api_url: str = WEBHOOK_URL):
+    def __init__(self, api_url: str = WEBHOOK_URL, coalesce_window: float = WEBHOOK_COALESCE_WINDOW_SECONDS,
+                 max_pending: int = WEBHOOK_MAX_PENDING, timeout: float = WEBHOOK_TIMEOUT_SECONDS):
+        """Envío de alertas al webhook en segundo plano, agrupando los mensajes repetidos.
+
+        La primera aparición de un mensaje se envía de inmediato; las repeticiones dentro de
+        coalesce_window se resumen en un único mensaje con el número de veces que ocurrieron.
+
+        :param api_url: URL del webhook de alertas.
+        :param coalesce_window: Segundos durante los que se agrupan los mensajes idénticos.
+        :param max_pending: Mensajes distintos en espera como máximo; los nuevos se descartan.
+        :param timeout: Segundos máximos por cada envío al webhook.
+        """
         self.api_url = api_url
+        self.coalesce_window = coalesce_window
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.dropped = 0
+        self._alerts: Dict[str, _Alert] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
 
     def make_message(self, message):
         #Devolver un json estructurado con el mensaje
         return f"Estimado equipo, se ha presentado un error en el sistema: {message}"
-    def send_to_webhook(self, data):
+
+    def start(self) -> None:
+        """Inicia el envío de alertas en el event loop actual con un cliente HTTP asíncrono compartido."""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._client = httpx.AsyncClient(timeout=self.timeout, limits=httpx.Limits(max_connections=4))
+        self._task = asyncio.create_task(self._deliver_loop())
+        # Entregar las alertas registradas antes del arranque
+        self._wakeup.set()
+        logger.info(f"Envío de alertas al webhook iniciado (ventana de agrupación {self.coalesce_window:.0f}s)")
+
+    async def stop(self) -> None:
+        """Detiene el envío, entrega los resúmenes pendientes y cierra el cliente HTTP."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        await self._send_all(self._collect(flush=True))
+        await self._client.aclose()
+        self._client = None
+        logger.info("Envío de alertas al webhook detenido")
+
+    def send_to_webhook(self, data) -> None:
+        """Registra una alerta para enviarla en segundo plano; nunca bloquea ni lanza excepciones.
+
+        :param data: Mensaje de error a notificar.
+        """
+        message = str(data)
+        with self._lock:
+            alert = self._alerts.get(message)
+            if alert is None:
+                if len(self._alerts) >= self.max_pending:
+                    self.dropped += 1
+                    logger.warning(f"Alerta descartada, hay {self.max_pending} alertas distintas en espera")
+                    return
+                self._alerts[message] = _Alert()
+            else:
+                alert.repeats += 1
+        self._wake()
+
+    def _wake(self) -> None:
+        if self._loop is None or self._wakeup is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            # El event loop ya se cerró; las alertas quedan sin enviar
+            pass
+
+    def _collect(self, flush: bool = False) -> List[str]:
+        """Retorna los mensajes que deben enviarse ahora y olvida las alertas cuya ventana terminó sin repeticiones.
+
+        :param flush: Si se envían ya los resúmenes, aunque su ventana no haya terminado.
+        """
+        now = time.monotonic()
+        messages = []
+        with self._lock:
+            for message, alert in list(self._alerts.items()):
+                if not alert.announced:
+                    messages.append(message)
+                    alert.announced = True
+                    alert.window_started = now
+                elif flush or now - alert.window_started >= self.coalesce_window:
+                    if alert.repeats:
+                        messages.append(
+                            f"{message} (se repitió {alert.repeats} veces en los últimos "
+                            f"{now - alert.window_started:.0f} s)"
+                        )
+                    if alert.repeats and not flush:
+                        alert.repeats = 0
+                        alert.window_started = now
+                    else:
+                        del self._alerts[message]
+        return messages
+
+    def _next_deadline(self) -> Optional[float]:
+        """Segundos hasta que termine la ventana de agrupación más próxima, o None si no hay alertas."""
+        with self._lock:
+            if not self._alerts:
+                return None
+            earliest = min(alert.window_started for alert in self._alerts.values())
+        return max(0.0, earliest + self.coalesce_window - time.monotonic())
+
+    async def _deliver_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._next_deadline())
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self._send_all(self._collect())
+
+    async def _send_all(self, messages: List[str]) -> None:
+        for message in messages:
+            await self._post(message)
+
+    async def _post(self, message: str) -> None:
+        """Envía un mensaje al webhook; los errores se registran sin propagarse."""
+        try:
+            response = await self._client.post(self.api_url, json={'text': self.make_message(message)})
+            if response.status_code != 200:
+                logger.error(f"Error enviando alerta al webhook: {response.status_code} - {response.text}")
+        except Exception as e:
+            logger.error(f"Error enviando alerta al webhook: {e}")
+
+    def send_callback(self, url: str, payload: dict, attempts: int = 3, timeout: float = 10):
+        """Envía un resultado en JSON a una URL de callback, reintentando con espera exponencial."""
         headers = {
             'Content-Type': 'application/json'
         }
-
-        payload = {
-            'text': self.make_message(data)
-        }
-        response = requests.post(self.api_url,  json=payload, headers=headers)
-        if response.status_code != 200:
-            raise ConnectionError(f"Error en la solicitud: {response.status_code} - {response.text}")
-    
-
+        last_error = None
+        for attempt in range(attempts):
+            try:
+                # Sin seguir redirecciones: podrían llevar a un host que no pasó la validación
+                response = requests.post(url, json=payload, headers=headers, timeout=timeout, allow_redirects=False)
+                if response.status_code < 300:
+                    return
+                last_error = ConnectionError(f"Error en la solicitud: {response.status_code} - {response.text}")
+            except requests.RequestException as e:
+                last_error = ConnectionError(f"Error en la solicitud: {e}")
+            if attempt < attempts - 1:
+                time.sleep(2 ** attempt)
+        raise last_error
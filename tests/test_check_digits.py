@@ -0,0 +1,65 @@
+import pytest
+
+from utils.post_processing.utils.check_digits import is_valid_cuit, is_valid_nit, is_valid_ruc, nit_check_digit
+
+
+@pytest.mark.parametrize("base, check_digit", [
+    ("800197268", "4"),  # DIAN
+    ("899999068", "1"),  # Ecopetrol
+    ("890903938", "8"),  # Bancolombia
+    ("860034313", "7"),  # Davivienda
+])
+def test_valid_nit(base, check_digit):
+    assert nit_check_digit(base) == int(check_digit)
+    assert is_valid_nit(base, check_digit)
+
+
+@pytest.mark.parametrize("base, check_digit", [
+    ("800197268", "5"),
+    ("899999068", "0"),
+    ("800197268", ""),
+    ("800197268", "X"),
+    ("80019726A", "4"),
+    ("1234567890123456", "1"),
+])
+def test_invalid_nit(base, check_digit):
+    assert not is_valid_nit(base, check_digit)
+
+
+@pytest.mark.parametrize("number", [
+    "33693450239",  # AFIP
+    "30500010912",  # Banco de la Nación Argentina
+    "20123456786",
+])
+def test_valid_cuit(number):
+    assert is_valid_cuit(number)
+
+
+@pytest.mark.parametrize("number", [
+    "33693450238",
+    "30500010913",
+    "2012345678",
+    "201234567861",
+    "20-12345678-6",
+])
+def test_invalid_cuit(number):
+    assert not is_valid_cuit(number)
+
+
+@pytest.mark.parametrize("number", [
+    "20131312955",  # SUNAT
+    "20100047218",  # Banco de Crédito del Perú
+])
+def test_valid_ruc(number):
+    assert is_valid_ruc(number)
+
+
+@pytest.mark.parametrize("number", [
+    "20131312954",
+    "20100047219",
+    "30131312955",  # prefijo de tipo de contribuyente inexistente
+    "2013131295",
+    "2013131295A",
+])
+def test_invalid_ruc(number):
+    assert not is_valid_ruc(number)
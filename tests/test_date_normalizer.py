@@ -0,0 +1,56 @@
+import pytest
+
+from utils.post_processing.utils.date_normalizer import normalize_date, normalize_dates
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2020-01-15", "2020-01-15"),
+    ("2020/1/5", "2020-01-05"),
+    ("15/01/2020", "2020-01-15"),
+    ("05.03.2021", "2021-03-05"),
+    ("15 de enero de 2020", "2020-01-15"),
+    ("1 de Septiembre del 2019", "2019-09-01"),
+    ("15-ene-2020", "2020-01-15"),
+    ("marzo de 2020", "2020-03-01"),
+    ("03/2020", "2020-03-01"),
+    ("29/02/2020", "2020-02-29"),
+    ("15/01/2020 10:30", "2020-01-15 10:30"),
+])
+def test_normalize_date_recognized_formats(value, expected):
+    assert normalize_date(value) == expected
+
+
+@pytest.mark.parametrize("value", [
+    "31/02/2020",
+    "30 de febrero de 2021",
+    "29/02/2021",
+    "2020-04-31",
+    "13/13/2020",
+    "sin fecha",
+])
+def test_normalize_date_leaves_invalid_dates_untouched(value):
+    assert normalize_date(value) == value
+
+
+def test_normalize_date_month_first():
+    assert normalize_date("03/05/2020", day_first=False) == "2020-03-05"
+    assert normalize_date("03/05/2020", day_first=True) == "2020-05-03"
+
+
+def test_normalize_date_component_over_twelve_is_the_day():
+    assert normalize_date("25/12/2020", day_first=False) == "2020-12-25"
+    assert normalize_date("12/25/2020", day_first=True) == "2020-12-25"
+
+
+def test_normalize_date_month_first_rejects_impossible_dates():
+    assert normalize_date("02/30/2020", day_first=False) == "02/30/2020"
+
+
+def test_normalize_dates_uses_country_order():
+    us = {"location": {"country": "Estados Unidos"}, "registration": {"registration_date": "03/05/2020"}}
+    colombia = {"location": {"country": "Colombia"}, "registration": {"registration_date": "03/05/2020"}}
+
+    assert normalize_dates(us) == 1
+    assert normalize_dates(colombia) == 1
+    assert us["registration"]["registration_date"] == "2020-03-05"
+    assert colombia["registration"]["registration_date"] == "2020-05-03"
@@ -0,0 +1,42 @@
+import asyncio
+import threading
+
+import pytest
+
+from services.executor import PipelineExecutor, PipelineQueueFullError
+
+
+def test_cancelled_request_keeps_its_admission_until_the_job_finishes():
+    executor = PipelineExecutor(max_workers=1, max_pending=0)
+    started = threading.Event()
+    release = threading.Event()
+
+    def job():
+        started.set()
+        release.wait(5)
+        return "done"
+
+    async def main():
+        request = asyncio.ensure_future(executor.run(job))
+        await asyncio.to_thread(started.wait, 5)
+        request.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await request
+
+        # El trabajo sigue ocupando el worker: una nueva solicitud se rechaza
+        assert executor.in_flight == 1
+        with pytest.raises(PipelineQueueFullError):
+            await executor.run(job)
+
+        release.set()
+        for _ in range(100):
+            if executor.in_flight == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert executor.in_flight == 0
+
+    try:
+        asyncio.run(main())
+    finally:
+        release.set()
+        executor.shutdown()
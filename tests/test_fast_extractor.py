@@ -0,0 +1,187 @@
+from utils.post_processing.fast_extractor import extract_from_ocr
+
+RUT_OCR = """# Formulario del Registro Único Tributario - DIAN
+
+| 5. Número de Identificación Tributaria (NIT) | 800197268 |
+| 6. DV | 4 |
+| 35. Razón social | ACME COLOMBIA S.A.S. |
+| 24. Tipo de contribuyente | Persona jurídica 1 |
+| 41. Dirección principal | CL 100 # 10-20 |
+| 40. Ciudad/Municipio | Bogotá D.C. |
+| 39. Departamento | Bogotá D.C. |
+| 42. Correo electrónico | contacto@acme.com.co |
+| 44. Teléfono 1 | 601 555 1234 |
+| 46. Actividad principal | 6201 |
+| 47. Fecha inicio actividad | 15/03/2015 |
+| 48. Actividad secundaria | 6202 |
+| 49. Fecha inicio actividad | 01/06/2018 |
+
+53. Responsabilidades, calidades y atributos
+05- Impto. renta y compl. régimen ordinario
+07- Retención en la fuente a título de renta
+14- Informante de exógena
+42- Obligado a llevar contabilidad
+
+Fecha de actualización: 10/01/2023
+
+Representación legal - Representante legal principal
+| 98. Tipo de documento | Cédula de Ciudadanía |
+| 99. Número de identificación | 79.123.456 |
+| 101. Primer apellido | PÉREZ |
+| 102. Segundo apellido | GÓMEZ |
+| 103. Primer nombre | JUAN |
+| 104. Otros nombres | CARLOS |
+| Fecha inicio ejercicio representación | 20/02/2019 |
+"""
+
+
+def test_complete_rut_is_extracted_without_the_model():
+    result = extract_from_ocr(RUT_OCR)
+
+    assert result is not None
+    assert result["tax_information"]["tax_identification_number"] == "800197268-4"
+    assert result["company_information"]["legal_name"] == "ACME COLOMBIA S.A.S."
+    assert result["company_information"]["taxpayer_type"] == "Legal entity"
+    assert result["company_information"]["economic_activity"] == {
+        "primary": {"code": "6201", "start_date": "15/03/2015"},
+        "secondary": {"code": "6202", "start_date": "01/06/2018"},
+    }
+    assert result["business_classification"]["responsibilities"] == [
+        "Income tax and complementary taxes - ordinary regime",
+        "Income tax withholding",
+        "Exogenous information reporter",
+        "Required to keep accounting records",
+    ]
+    assert result["registration"]["last_update"] == "10/01/2023"
+    assert result["legal_representative"] == {
+        "first_name": "Juan Carlos",
+        "last_name": "Pérez Gómez",
+        "document_type": "CC",
+        "document_number": "79123456",
+        "representation_start_date": "20/02/2019",
+    }
+
+
+def test_rut_without_legal_representative_falls_back_to_the_model():
+    ocr = RUT_OCR[:RUT_OCR.index("Representación legal")]
+    assert extract_from_ocr(ocr) is None
+
+
+def test_rut_with_unknown_responsibility_code_falls_back_to_the_model():
+    ocr = RUT_OCR.replace("14- Informante de exógena", "99- Responsabilidad desconocida")
+    assert extract_from_ocr(ocr) is None
+
+
+def test_rut_with_untranslatable_taxpayer_type_falls_back_to_the_model():
+    ocr = RUT_OCR.replace("Persona jurídica 1", "Otro tipo")
+    assert extract_from_ocr(ocr) is None
+
+
+def test_rut_with_invalid_check_digit_falls_back_to_the_model():
+    assert extract_from_ocr(RUT_OCR.replace("| 6. DV | 4 |", "| 6. DV | 5 |")) is None
+
+
+AFIP_OCR = """# AFIP - Constancia de Inscripción
+
+| CUIT | 30-50001091-2 |
+| Denominación | BANCO DE LA NACION ARGENTINA |
+| Forma jurídica | Sociedad anónima |
+| Domicilio fiscal | BARTOLOME MITRE 326 |
+| Localidad | Ciudad Autónoma de Buenos Aires |
+| Código postal | 1036 |
+| Actividad principal | 641930 (F-883) Servicios de la banca mayorista |
+| Mes de inicio | 03/1991 |
+
+Impuestos
+- IVA
+- GANANCIAS SOCIEDADES
+- EMPLEADOR-APORTES SEG. SOCIAL
+"""
+
+
+def test_complete_afip_constancia_is_extracted_without_the_model():
+    result = extract_from_ocr(AFIP_OCR)
+
+    assert result is not None
+    assert result["tax_information"]["tax_document_type"] == "CUIT"
+    assert result["tax_information"]["tax_identification_number"] == "30-50001091-2"
+    assert result["company_information"]["legal_name"] == "BANCO DE LA NACION ARGENTINA"
+    assert result["company_information"]["taxpayer_type"] == "Corporation"
+    assert result["company_information"]["economic_activity"]["primary"] == {"code": "641930", "start_date": "03/1991"}
+    assert result["business_classification"]["responsibilities"] == [
+        "Value added tax (VAT)",
+        "Income tax - companies",
+        "Employer social security contributions",
+    ]
+    assert result["location"]["country"] == "Argentina"
+    assert result["location"]["postal_code"] == "1036"
+
+
+def test_afip_constancia_with_unknown_tax_falls_back_to_the_model():
+    assert extract_from_ocr(AFIP_OCR.replace("- IVA", "- IMPUESTO DESCONOCIDO")) is None
+
+
+def test_afip_constancia_without_activity_start_falls_back_to_the_model():
+    assert extract_from_ocr(AFIP_OCR.replace("| Mes de inicio | 03/1991 |\n", "")) is None
+
+
+FICHA_RUC_OCR = """# SUNAT - Reporte de Ficha RUC
+
+| Número de RUC | 20100047218 |
+| Denominación o Razón Social | BANCO DE CREDITO DEL PERU |
+| Tipo de Contribuyente | Sociedad anónima abierta |
+| Fecha de Inscripción | 09/08/1993 |
+| Domicilio Fiscal | JR. CENTENARIO 156 |
+| Distrito | La Molina |
+| Provincia | Lima |
+| Actividad Económica Principal | 6419 - Otros tipos de intermediación monetaria |
+
+Tributos Afectos
+| Tributo | Desde |
+|---|---|
+| IGV - OPER. INT. - CTA. PROPIA | 01/08/1993 |
+| RENTA - 3RA. CATEG. | 01/08/1993 |
+
+Representantes Legales
+| Documento | Nro. Documento | Apellidos y Nombres | Cargo | Fecha Desde |
+|---|---|---|---|---|
+| DNI | 40123456 | QUISPE MAMANI, ROSA ELENA | GERENTE GENERAL | 01/06/2010 |
+"""
+
+
+def test_complete_ficha_ruc_is_extracted_without_the_model():
+    result = extract_from_ocr(FICHA_RUC_OCR)
+
+    assert result is not None
+    assert result["tax_information"]["tax_document_type"] == "RUC"
+    assert result["tax_information"]["tax_identification_number"] == "20100047218"
+    assert result["company_information"]["taxpayer_type"] == "Publicly held corporation"
+    assert result["company_information"]["economic_activity"]["primary"]["code"] == "6419"
+    assert result["business_classification"]["responsibilities"] == [
+        "General sales tax (IGV)",
+        "Income tax - third category",
+    ]
+    assert result["registration"]["registration_date"] == "09/08/1993"
+    assert result["legal_representative"] == {
+        "first_name": "Rosa Elena",
+        "last_name": "Quispe Mamani",
+        "document_type": "DNI",
+        "document_number": "40123456",
+        "representation_start_date": "01/06/2010",
+    }
+
+
+def test_ficha_ruc_without_representatives_is_extracted_without_the_model():
+    ocr = FICHA_RUC_OCR[:FICHA_RUC_OCR.index("Representantes Legales")]
+    result = extract_from_ocr(ocr)
+
+    assert result is not None
+    assert result["legal_representative"]["first_name"] == ""
+
+
+def test_ficha_ruc_with_unsplittable_representative_name_falls_back_to_the_model():
+    assert extract_from_ocr(FICHA_RUC_OCR.replace("QUISPE MAMANI, ROSA ELENA", "QUISPE MAMANI ROSA ELENA")) is None
+
+
+def test_ficha_ruc_with_invalid_ruc_falls_back_to_the_model():
+    assert extract_from_ocr(FICHA_RUC_OCR.replace("20100047218", "20100047219")) is None
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import time
+
+from services.adaptive_limiter import AdaptiveLimiter
+from services.hedging import HedgingPolicy
+from services.rate_limiter import MemoryBudgetStore, MistralCallScheduler
+
+
+def _scheduler(limiter, policy):
+    return MistralCallScheduler(
+        0, 0, MemoryBudgetStore(), max_retries=0, limiters={"chat": limiter}, hedging={"chat": policy}
+    )
+
+
+def _hedging_policy():
+    # Con una latencia registrada de 10 ms, cualquier llamada más lenta se duplica
+    policy = HedgingPolicy("test", enabled=True, min_samples=1, max_ratio=1.0)
+    policy.tracker.record(0.01)
+    return policy
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "la condición no se cumplió a tiempo"
+        time.sleep(0.005)
+
+
+def test_losing_copy_keeps_its_slot_until_it_finishes():
+    limiter = AdaptiveLimiter("chat", initial_limit=4)
+    policy = _hedging_policy()
+    release_primary = threading.Event()
+    calls = []
+    lock = threading.Lock()
+
+    def fn():
+        with lock:
+            calls.append(None)
+            is_primary = len(calls) == 1
+        if is_primary:
+            release_primary.wait(5)
+            return "primary"
+        return "hedge"
+
+    try:
+        assert _scheduler(limiter, policy).call("chat", fn) == "hedge"
+        # La copia ganadora ya liberó su cupo; la original sigue en vuelo y conserva el suyo
+        _wait_for(lambda: limiter.snapshot()["in_flight"] == 1)
+        time.sleep(0.05)
+        assert limiter.snapshot()["in_flight"] == 1
+
+        release_primary.set()
+        _wait_for(lambda: limiter.snapshot()["in_flight"] == 0)
+        assert policy.hedge_wins == 1
+    finally:
+        release_primary.set()
+        policy.shutdown()
+
+
+def test_cancelled_losing_copy_releases_its_slot():
+    limiter = AdaptiveLimiter("chat", initial_limit=4)
+    policy = _hedging_policy()
+
+    async def main():
+        calls = []
+
+        async def fn():
+            calls.append(None)
+            if len(calls) == 1:
+                await asyncio.sleep(5)
+                return "primary"
+            return "hedge"
+
+        assert await _scheduler(limiter, policy).acall("chat", fn) == "hedge"
+        # La cancelación de la original y su callback se completan en las siguientes vueltas del loop
+        await asyncio.sleep(0.05)
+        return limiter.snapshot()["in_flight"]
+
+    assert asyncio.run(main()) == 0
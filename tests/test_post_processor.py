@@ -0,0 +1,23 @@
+from utils.post_processing.processor import ResponsePostProcessor
+
+
+def _result():
+    return {
+        "tax_information": {"tax_document_type": "", "tax_identification_number": "20-12345678-6"},
+        "legal_representative": {"document_type": ""},
+        "location": {"country": "Argentina"},
+        "business_classification": {"responsibilities": ["IVA"]},
+    }
+
+
+def test_failed_post_processing_leaves_the_result_untouched(monkeypatch):
+    def fail_after_mutating(data, ocr_markdown=""):
+        data["tax_information"]["tax_identification_number"] = "mutated"
+        data["business_classification"]["responsibilities"].append("mutated")
+        raise RuntimeError("fallo")
+
+    monkeypatch.setattr(ResponsePostProcessor, "_apply_general_fixes", staticmethod(fail_after_mutating))
+    data = _result()
+
+    assert ResponsePostProcessor.process_data(data) is False
+    assert data == _result()
@@ -0,0 +1,18 @@
+import pytest
+
+from services.circuit_breaker import HALF_OPEN, CircuitBreaker, CircuitOpenError
+from services.rate_limiter import MemoryBudgetStore, MistralCallScheduler
+
+
+def test_call_rejected_by_the_circuit_does_not_spend_budget():
+    # Presupuesto de una sola solicitud, sin espera posible
+    breaker = CircuitBreaker("chat")
+    scheduler = MistralCallScheduler(6, 0, MemoryBudgetStore(), max_retries=0, max_wait=0, breakers={"chat": breaker})
+    breaker.state = HALF_OPEN
+    assert breaker.allow()  # otra llamada ya está probando el servicio
+
+    with pytest.raises(CircuitOpenError):
+        scheduler.call("chat", lambda: "rejected")
+
+    breaker.record(True, True)
+    assert scheduler.call("chat", lambda: "ok") == "ok"
@@ -1,4 +1,5 @@
 import base64
+import hashlib
 import logging
 from pathlib import Path
 from utils.logger import logger
@@ -24,3 +25,36 @@ class FileEncoder:
         except Exception as e:
             logger.error(f"Error al codificar la imagen {image_path}: {e}")
             return None
+
+    @staticmethod
+    def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+        """Calcula el SHA-256 del contenido de un archivo leyéndolo por bloques.
+
+        :param file_path: Ruta del archivo.
+        :param chunk_size: Tamaño de cada bloque leído.
+        :return: Hash SHA-256 en hexadecimal.
+        """
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        """Calcula el SHA-256 de un contenido en memoria.
+
+        :param data: Contenido a resumir.
+        :return: Hash SHA-256 en hexadecimal.
+        """
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def to_data_url(data: bytes, mime_type: str = "image/jpeg") -> str:
+        """Construye un data URL en base64 a partir de un contenido en memoria.
+
+        :param data: Contenido del archivo.
+        :param mime_type: Tipo MIME declarado en el data URL.
+        :return: Data URL listo para enviarse a Mistral.
+        """
+        return f"data:{mime_type};base64,{base64.b64encode(data).decode('ascii')}"
@@ -0,0 +1,94 @@
+import io
+from typing import Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from config.settings import (
+    IMAGE_PREPROCESSING_ENABLED,
+    IMAGE_MAX_SIDE,
+    IMAGE_JPEG_QUALITY,
+    IMAGE_RECOMPRESS_MIN_BYTES,
+)
+from utils.logger import logger
+
+# Tipo MIME según la extensión, para las imágenes cuyo formato Pillow no reconoce
+MIME_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.webp': 'image/webp',
+    '.gif': 'image/gif',
+}
+
+
+def mime_type_for(file_ext: str, image_format: Optional[str] = None) -> str:
+    """Retorna el tipo MIME de una imagen según su formato real o, si no se conoce, su extensión.
+
+    :param file_ext: Extensión del archivo (por ejemplo ".png").
+    :param image_format: Formato detectado por Pillow (por ejemplo "PNG"), si se pudo identificar.
+    """
+    if image_format and image_format in Image.MIME:
+        return Image.MIME[image_format]
+    return MIME_TYPES.get(file_ext.lower(), 'image/jpeg')
+
+
+def preprocess_image(image_bytes: bytes, file_ext: str) -> Tuple[bytes, str]:
+    """Reduce y recomprime una imagen antes de enviarla a Mistral.
+
+    Las imágenes cuyo lado mayor supera IMAGE_MAX_SIDE, o que pesan más de
+    IMAGE_RECOMPRESS_MIN_BYTES, se redimensionan y se recodifican como JPEG con calidad
+    IMAGE_JPEG_QUALITY. Las demás se envían tal cual con su tipo MIME real, tomado del
+    formato que detecta Pillow y no de la extensión.
+
+    :param image_bytes: Contenido original de la imagen.
+    :param file_ext: Extensión original del archivo (por ejemplo ".png").
+    :return: Contenido a enviar y su tipo MIME.
+    """
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+    except Exception as e:
+        logger.warning(f"No se pudo identificar la imagen, se envía la original: {e}")
+        return image_bytes, mime_type_for(file_ext)
+
+    # El tipo MIME sale del contenido: una PNG guardada como .jpg se etiqueta como image/png
+    mime_type = mime_type_for(file_ext, image.format)
+    if not IMAGE_PREPROCESSING_ENABLED:
+        image.close()
+        return image_bytes, mime_type
+
+    try:
+        with image:
+            needs_resize = max(image.size) > IMAGE_MAX_SIDE
+            if not needs_resize and len(image_bytes) <= IMAGE_RECOMPRESS_MIN_BYTES:
+                return image_bytes, mime_type
+
+            # Respetar la orientación EXIF de las fotos tomadas con el teléfono
+            image = ImageOps.exif_transpose(image)
+            if needs_resize:
+                image.thumbnail((IMAGE_MAX_SIDE, IMAGE_MAX_SIDE), Image.LANCZOS)
+            image = _to_rgb(image)
+
+            output = io.BytesIO()
+            image.save(output, format="JPEG", quality=IMAGE_JPEG_QUALITY, optimize=True)
+    except Exception as e:
+        logger.warning(f"No se pudo preprocesar la imagen, se envía la original: {e}")
+        return image_bytes, mime_type
+
+    processed = output.getvalue()
+    if not needs_resize and len(processed) >= len(image_bytes):
+        return image_bytes, mime_type
+
+    logger.info(f"Imagen preprocesada: {len(image_bytes)} → {len(processed)} bytes ({image.size[0]}x{image.size[1]})")
+    return processed, 'image/jpeg'
+
+
+def _to_rgb(image: Image.Image) -> Image.Image:
+    """Convierte la imagen a RGB, aplanando la transparencia sobre fondo blanco."""
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    if image.mode != "RGB":
+        return image.convert("RGB")
+    return image
@@ -0,0 +1,57 @@
+import re
+from typing import List, Tuple
+
+# Objetos de página (/Type /Page) sin contar el árbol de páginas (/Type /Pages)
+_PAGE_OBJECT_PATTERN = re.compile(rb"/Type\s*/Page(?![A-Za-z])")
+# Marcas que hacen poco fiable el conteo: flujos de objetos comprimidos, donde las páginas no
+# son visibles, y fines de archivo adicionales de las actualizaciones incrementales, que
+# conservan las versiones anteriores de las páginas
+_OBJECT_STREAM_PATTERN = re.compile(rb"/Type\s*/ObjStm(?![A-Za-z])")
+_EOF_PATTERN = re.compile(rb"%%EOF")
+_LINEARIZED_PATTERN = re.compile(rb"/Linearized(?![A-Za-z])")
+# Bytes que se repiten entre bloques para no perder coincidencias partidas
+_SCAN_OVERLAP = 64
+
+
+def count_pdf_pages(pdf_path: str, chunk_size: int = 1024 * 1024) -> int:
+    """Estima el número de páginas de un PDF contando sus objetos de página.
+
+    No requiere dependencias externas y lee el archivo por bloques. Si el PDF usa flujos de
+    objetos comprimidos o tiene actualizaciones incrementales el conteo no es fiable y se
+    retorna 0, lo que equivale a "desconocido".
+
+    :param pdf_path: Ruta del archivo PDF.
+    :param chunk_size: Tamaño de cada bloque leído.
+    :return: Número de páginas detectadas, o 0 si no se pudo determinar.
+    """
+    pages = eofs = 0
+    linearized = False
+    tail = b""
+    with open(pdf_path, "rb") as pdf:
+        while True:
+            chunk = pdf.read(chunk_size)
+            buffer = tail + chunk
+            # Las coincidencias que empiezan en el solapamiento se cuentan con el bloque siguiente
+            limit = len(buffer) - _SCAN_OVERLAP if chunk else len(buffer)
+            if _OBJECT_STREAM_PATTERN.search(buffer):
+                return 0
+            linearized = linearized or _LINEARIZED_PATTERN.search(buffer) is not None
+            pages += sum(1 for match in _PAGE_OBJECT_PATTERN.finditer(buffer) if match.start() < limit)
+            eofs += sum(1 for match in _EOF_PATTERN.finditer(buffer) if match.start() < limit)
+            if not chunk:
+                break
+            tail = buffer[max(limit, 0):]
+    # Un PDF linealizado tiene dos secciones de referencias cruzadas sin ser una actualización
+    if eofs > (2 if linearized else 1):
+        return 0
+    return pages
+
+
+def page_ranges(page_count: int, pages_per_chunk: int) -> List[Tuple[int, int]]:
+    """Divide las páginas [0, page_count) en rangos consecutivos [inicio, fin).
+
+    :param page_count: Número total de páginas.
+    :param pages_per_chunk: Páginas por rango.
+    :return: Lista de rangos en orden.
+    """
+    return [(start, min(start + pages_per_chunk, page_count)) for start in range(0, page_count, pages_per_chunk)]
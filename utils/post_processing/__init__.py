@@ -1,3 +1,4 @@
 from utils.post_processing.processor import ResponsePostProcessor
+from utils.post_processing.models import ExtractionResult, parse_extraction, serialize_extraction
 
-__all__ = ['ResponsePostProcessor']
\ No newline at end of file
+__all__ = ['ResponsePostProcessor', 'ExtractionResult', 'parse_extraction', 'serialize_extraction']
\ No newline at end of file
@@ -3,36 +3,19 @@ from typing import Dict, Any, Optional
 
 from utils.logger import logger
 from utils.post_processing.country_processors.base_processor import CountryProcessor
-from utils.post_processing.country_processors.colombia_processor import ColombiaProcessor
-from utils.post_processing.country_processors.panama_processor import PanamaProcessor
-from utils.post_processing.country_processors.argentina_processor import ArgentinaProcessor
-from utils.post_processing.country_processors.peru_processor import PeruProcessor
+from utils.post_processing.country_processors.registry import (
+    ENTRY_POINT_GROUP,
+    fold_accents,
+    get_country_processor,
+    normalize_country,
+    register_country_processor
+)
+from utils.post_processing.utils.ocr_signals import scan_ocr
 
-# Registro de procesadores disponibles
-_PROCESSORS = {
-    'colombia': ColombiaProcessor(),
-    'panama': PanamaProcessor(),
-    'argentina': ArgentinaProcessor(),
-    'peru': PeruProcessor()
-}
-
-def get_country_processor(country: str) -> Optional[CountryProcessor]:
-    """
-    Retorna el procesador específico para el país indicado
-    
-    Args:
-        country: Nombre del país (en minúsculas)
-        
-    Returns:
-        Instancia del procesador específico o None si no hay coincidencia
-    """
-    if not country:
-        return None
-        
-    for key, processor in _PROCESSORS.items():
-        if key in country:
-            return processor
-    return None
+# Formatos de identificación fiscal usados para detectar el país a partir de los datos extraídos
+_COLOMBIA_NIT = re.compile(r'\d{9,10}-\d{1}|\d{1,3}\.\d{3}\.\d{3}-\d{1}')
+_PANAMA_ID = re.compile(r'\d{1,2}-\d{3,4}-\d{3,4}')
+_ARGENTINA_CUIT = re.compile(r'\d{2}-\d{8}-\d{1}')
 
 def detect_country(data: Dict[str, Any], ocr_markdown: str = "") -> Optional[str]:
     """
@@ -49,17 +32,17 @@ def detect_country(data: Dict[str, Any], ocr_markdown: str = "") -> Optional[str
     tax_id = tax_info.get('tax_identification_number', '')
     
     # Patrones para Colombia: NIT con dígito de verificación
-    if re.search(r'\d{9,10}-\d{1}', tax_id) or re.search(r'\d{1,3}\.\d{3}\.\d{3}-\d{1}', tax_id):
+    if _COLOMBIA_NIT.search(tax_id):
         logger.info("Patrón de NIT colombiano detectado por formato")
         return "Colombia"
     
     # Patrones para Panamá: ID con formato X-XXX-XXXX
-    elif re.search(r'\d{1,2}-\d{3,4}-\d{3,4}', tax_id):
+    elif _PANAMA_ID.search(tax_id):
         logger.info("Patrón de identificación panameña detectado por formato")
         return "Panama"
     
     # Patrones para Argentina: CUIT/CUIL con formato XX-XXXXXXXX-X
-    elif re.search(r'\d{2}-\d{8}-\d{1}', tax_id):
+    elif _ARGENTINA_CUIT.search(tax_id):
         logger.info("Patrón de CUIT/CUIL argentino detectado por formato")
         return "Argentina"
     
@@ -70,21 +53,33 @@ def detect_country(data: Dict[str, Any], ocr_markdown: str = "") -> Optional[str
     
     # Si no se detecta por los datos, intentar inferir del OCR
     elif ocr_markdown:
-        # Buscar patrones específicos de países en el OCR
-        if re.search(r'NIT|DIAN|Colombia|Colombiana|Bogot[aá]|Medell[ií]n|Cali', ocr_markdown, re.IGNORECASE):
+        # Buscar señales específicas de cada país en el índice del OCR
+        signals = scan_ocr(ocr_markdown)
+        if signals.has('NIT', 'DIAN', 'COLOMBIA'):
             logger.info("País Colombia detectado por OCR")
             return "Colombia"
         
-        elif re.search(r'RUC|Panam[aá]|Ciudad de Panam[aá]|Panamanian', ocr_markdown, re.IGNORECASE):
+        elif signals.has('RUC', 'PANAMA'):
             logger.info("País Panamá detectado por OCR")
             return "Panama"
         
-        elif re.search(r'CUIT|CUIL|AFIP|Argentina|Buenos Aires|Mendoza|C[oó]rdoba', ocr_markdown, re.IGNORECASE):
+        elif signals.has('CUIT', 'CUIL', 'AFIP', 'ARGENTINA'):
             logger.info("País Argentina detectado por OCR")
             return "Argentina"
         
-        elif re.search(r'RUC|Per[uú]|SUNAT|Lima|Arequipa|Trujillo', ocr_markdown, re.IGNORECASE):
+        elif signals.has('PERU', 'SUNAT'):
             logger.info("País Perú detectado por OCR")
             return "Peru"
     
-    return None
\ No newline at end of file
+    return None
+
+
+__all__ = [
+    'CountryProcessor',
+    'ENTRY_POINT_GROUP',
+    'detect_country',
+    'fold_accents',
+    'get_country_processor',
+    'normalize_country',
+    'register_country_processor'
+]
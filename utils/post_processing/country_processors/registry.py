@@ -0,0 +1,158 @@
+import re
+import threading
+import unicodedata
+from functools import lru_cache
+from importlib import import_module, metadata
+from typing import Dict, Optional
+
+from utils.logger import logger
+from utils.post_processing.country_processors.base_processor import CountryProcessor
+
+# Grupo de entry points donde paquetes externos pueden registrar procesadores de país,
+# con el nombre del país como nombre del entry point, por ejemplo:
+#   [project.entry-points."mistral_doc_extractor.country_processors"]
+#   chile = "mi_paquete.chile:ChileProcessor"
+ENTRY_POINT_GROUP = "mistral_doc_extractor.country_processors"
+
+# Procesadores incluidos en el proyecto; se importan solo cuando se usan por primera vez
+_BUILTIN_PROCESSORS = {
+    'colombia': 'utils.post_processing.country_processors.colombia_processor:ColombiaProcessor',
+    'panama': 'utils.post_processing.country_processors.panama_processor:PanamaProcessor',
+    'argentina': 'utils.post_processing.country_processors.argentina_processor:ArgentinaProcessor',
+    'peru': 'utils.post_processing.country_processors.peru_processor:PeruProcessor',
+}
+
+# Variantes conocidas del nombre de cada país (ya sin acentos y en minúsculas)
+_ALIASES = {
+    'colombia': 'colombia', 'co': 'colombia', 'col': 'colombia', 'colombian': 'colombia', 'colombiana': 'colombia',
+    'panama': 'panama', 'pa': 'panama', 'pan': 'panama', 'panamanian': 'panama', 'panamena': 'panama',
+    'argentina': 'argentina', 'ar': 'argentina', 'arg': 'argentina', 'argentine': 'argentina',
+    'argentine republic': 'argentina', 'republica argentina': 'argentina',
+    'peru': 'peru', 'pe': 'peru', 'per': 'peru', 'peruvian': 'peru', 'peruana': 'peru',
+}
+
+# Prefijos que se descartan antes de buscar el alias ("República de Colombia", "Republic of Peru")
+_COUNTRY_PREFIX = re.compile(r'^(?:the\s+)?(?:republica|republic|rep)\s+(?:de(?:l)?\s+|of\s+)?')
+_NON_ALPHA = re.compile(r'[^a-z]+')
+
+
+def fold_accents(text: str) -> str:
+    """Pasa el texto a minúsculas y elimina los acentos ("Panamá" → "panama")."""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+@lru_cache(maxsize=256)
+def normalize_country(country: Optional[str]) -> Optional[str]:
+    """
+    Normaliza el nombre de un país a la clave usada por el registro
+
+    Args:
+        country: Nombre del país tal como aparece en los datos ("Panamá", "Republic of Colombia", "PE")
+
+    Returns:
+        Clave del país ("colombia", "panama", ...) o None si no se reconoce
+    """
+    if not country:
+        return None
+    folded = _NON_ALPHA.sub(' ', fold_accents(country)).strip()
+    if folded in _ALIASES:
+        return _ALIASES[folded]
+    stripped = _COUNTRY_PREFIX.sub('', folded)
+    if stripped in _ALIASES:
+        return _ALIASES[stripped]
+    # Procesadores externos registrados con un nombre propio
+    if stripped in _registry.available():
+        return stripped
+    # Nombres compuestos como "Bogotá, Colombia": buscar una palabra que sea un país (no siglas)
+    for word in stripped.split():
+        if len(word) > 3 and word in _ALIASES:
+            return _ALIASES[word]
+    return None
+
+
+class CountryProcessorRegistry:
+    """Registro de procesadores por país con resolución O(1) y carga diferida."""
+
+    def __init__(self, builtins: Dict[str, str], entry_point_group: str):
+        self._targets = dict(builtins)
+        self._entry_point_group = entry_point_group
+        self._entry_points_loaded = False
+        self._instances: Dict[str, CountryProcessor] = {}
+        self._lock = threading.Lock()
+
+    def available(self) -> Dict[str, object]:
+        """Retorna los países registrados, incluidos los de entry points."""
+        self._load_entry_points()
+        return self._targets
+
+    def register(self, country: str, target) -> None:
+        """Registra un procesador para un país, como ruta "modulo:Clase" o como clase."""
+        with self._lock:
+            self._targets[country] = target
+            self._instances.pop(country, None)
+
+    def get(self, country: str) -> Optional[CountryProcessor]:
+        """Retorna la instancia del procesador del país, importándolo la primera vez que se pide."""
+        processor = self._instances.get(country)
+        if processor is not None:
+            return processor
+
+        target = self.available().get(country)
+        if target is None:
+            return None
+        with self._lock:
+            processor = self._instances.get(country)
+            if processor is None:
+                processor = self._load(target)()
+                self._instances[country] = processor
+        return processor
+
+    def _load_entry_points(self) -> None:
+        if self._entry_points_loaded:
+            return
+        with self._lock:
+            if self._entry_points_loaded:
+                return
+            try:
+                for entry_point in metadata.entry_points(group=self._entry_point_group):
+                    key = fold_accents(entry_point.name)
+                    self._targets.setdefault(key, entry_point)
+                    logger.info(f"Procesador de país '{key}' registrado desde {entry_point.value}")
+            except Exception as e:
+                logger.warning(f"No se pudieron cargar los procesadores de país externos: {e}")
+            self._entry_points_loaded = True
+
+    @staticmethod
+    def _load(target):
+        if isinstance(target, metadata.EntryPoint):
+            return target.load()
+        if isinstance(target, str):
+            module_name, class_name = target.split(':')
+            return getattr(import_module(module_name), class_name)
+        return target
+
+
+_registry = CountryProcessorRegistry(_BUILTIN_PROCESSORS, ENTRY_POINT_GROUP)
+
+
+def register_country_processor(country: str, target) -> None:
+    """Registra un procesador de país adicional (ruta "modulo:Clase" o clase)."""
+    _registry.register(fold_accents(country), target)
+    normalize_country.cache_clear()
+
+
+def get_country_processor(country: str) -> Optional[CountryProcessor]:
+    """
+    Retorna el procesador específico para el país indicado
+
+    Args:
+        country: Nombre del país, en cualquiera de sus variantes
+
+    Returns:
+        Instancia del procesador específico o None si no hay coincidencia
+    """
+    key = normalize_country(country)
+    if key is None:
+        return None
+    return _registry.get(key)
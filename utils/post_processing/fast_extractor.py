@@ -0,0 +1,499 @@
+import re
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from utils.logger import logger
+from utils.post_processing.country_processors import fold_accents
+from utils.post_processing.models import ExtractionResult
+from utils.post_processing.utils.check_digits import is_valid_cuit, is_valid_nit, is_valid_ruc
+from utils.post_processing.utils.ocr_signals import OCRSignals, scan_ocr
+
+# Pares "etiqueta: valor" en líneas de texto o en filas de tablas markdown ("| etiqueta | valor |")
+_LABELED_VALUE = re.compile(
+    r"^[ \t>*#-]*\|?[ \t*_]*(?:\d{1,3}\.[ \t]*)?(?P<label>[^\W\d_][^:|\n]{1,80}?)[ \t]*[:|][ \t]*(?P<value>[^|\n]*[^|\s])[ \t]*\|?[ \t]*$",
+    re.MULTILINE,
+)
+_MARKDOWN_EMPHASIS = re.compile(r"[*_`]+")
+_ACTIVITY_CODE = re.compile(r"\b(\d{4,6})\b")
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+
+# Etiquetas de cada campo en los formularios oficiales (sin acentos y en minúsculas)
+_FIELD_LABELS = {
+    "legal_name": ("razon social", "denominacion o razon social", "apellidos y nombres denominacion o razon social",
+                   "nombre o razon social", "denominacion"),
+    "commercial_name": ("nombre comercial",),
+    "abbreviation": ("sigla",),
+    "address": ("direccion principal", "direccion", "domicilio fiscal", "domicilio"),
+    "city": ("ciudad municipio", "municipio", "ciudad", "localidad", "distrito"),
+    "state": ("departamento", "provincia"),
+    "postal_code": ("codigo postal",),
+    "email": ("correo electronico", "email", "e mail"),
+    "phone_1": ("telefono 1", "telefono", "telefonos"),
+    "phone_2": ("telefono 2",),
+    "primary_activity": ("actividad principal", "actividad economica principal", "actividad economica"),
+    "secondary_activity": ("actividad secundaria", "actividad secundaria 1"),
+    "registration_date": ("fecha de inscripcion", "fecha inscripcion", "fecha de inicio de actividades",
+                          "fecha inicio de actividades"),
+    "nit_check_digit": ("dv", "digito de verificacion"),
+    "taxpayer_type": ("tipo de contribuyente", "tipo contribuyente", "tipo de persona", "forma juridica"),
+    "responsibilities": ("responsabilidades calidades y atributos", "responsabilidades"),
+    "activity_start_date": ("fecha inicio actividad", "fecha de inicio actividad", "fecha de inicio de la actividad",
+                            "fecha inicio de actividad", "mes de inicio", "mes inicio"),
+    "last_update": ("fecha de actualizacion", "fecha actualizacion", "fecha de ultima actualizacion",
+                    "ultima actualizacion"),
+    "representative_first_name": ("primer nombre",),
+    "representative_other_names": ("otros nombres",),
+    "representative_first_surname": ("primer apellido",),
+    "representative_second_surname": ("segundo apellido",),
+    "representative_document_type": ("tipo de documento",),
+    "representative_document_number": ("numero de identificacion", "numero de documento"),
+    "representation_start_date": ("fecha inicio ejercicio representacion", "fecha de inicio ejercicio representacion",
+                                  "fecha inicio representacion"),
+}
+
+# Tipos de contribuyente impresos en los formularios y su traducción al inglés que pide la plantilla
+_TAXPAYER_TYPES = {
+    "persona juridica": "Legal entity",
+    "persona natural": "Natural person",
+    "persona natural o sucesion iliquida": "Natural person or undivided estate",
+    "persona natural con negocio": "Natural person with business",
+    "persona natural sin negocio": "Natural person without business",
+    "sociedad anonima": "Corporation",
+    "sociedad anonima cerrada": "Closely held corporation",
+    "sociedad anonima abierta": "Publicly held corporation",
+    "sociedad de responsabilidad limitada": "Limited liability company",
+    "sociedad comercial de responsabilidad limitada": "Limited liability company",
+    "empresa individual de responsabilidad limitada": "Individual limited liability company",
+}
+
+# Códigos de responsabilidad del RUT de la DIAN y su traducción al inglés
+_DIAN_RESPONSIBILITIES = {
+    "05": "Income tax and complementary taxes - ordinary regime",
+    "07": "Income tax withholding",
+    "09": "VAT withholding",
+    "10": "Customs obligor",
+    "13": "Large taxpayer",
+    "14": "Exogenous information reporter",
+    "15": "Self-withholding agent",
+    "42": "Required to keep accounting records",
+    "47": "Simple taxation regime (SIMPLE)",
+    "48": "Value added tax (VAT) responsible",
+    "49": "Not responsible for VAT",
+    "52": "Electronic invoicer",
+    "55": "Beneficial owner information reporter",
+}
+
+# Tipos de documento de identidad del representante (texto o código del RUT) y su acrónimo
+_PERSON_DOCUMENT_TYPES = {
+    "cedula de ciudadania": "CC",
+    "cedula de extranjeria": "CE",
+    "documento nacional de identidad": "DNI",
+    "dni": "DNI",
+    "13": "CC",
+    "22": "CE",
+}
+
+# Impuestos registrados en la constancia de la AFIP y tributos afectos de la Ficha RUC de la SUNAT,
+# con el texto normalizado con el que empieza cada línea y su traducción al inglés
+_AFIP_TAXES = {
+    "iva": "Value added tax (VAT)",
+    "ganancias sociedades": "Income tax - companies",
+    "ganancias personas fisicas": "Income tax - individuals",
+    "ganancia minima presunta": "Minimum presumed income tax",
+    "bienes personales": "Personal assets tax",
+    "bp acciones o participaciones": "Personal assets tax - shares and equity interests",
+    "empleador aportes seg social": "Employer social security contributions",
+    "regimenes de informacion": "Information reporting regimes",
+    "monotributo": "Simplified regime (Monotributo)",
+}
+_SUNAT_TAXES = {
+    "igv": "General sales tax (IGV)",
+    "renta 3ra categ": "Income tax - third category",
+    "renta rg general 3ra categ": "Income tax - third category",
+    "renta 4ta categ": "Income tax - fourth category",
+    "renta 5ta categ": "Income tax - fifth category withholding",
+    "essalud seg regular trabajador": "EsSalud health insurance - employees",
+    "snp ley 19990": "National pension system (Law 19990)",
+    "itan": "Temporary net assets tax (ITAN)",
+}
+# Encabezados de las tablas de impuestos, que no son impuestos
+_TAX_TABLE_HEADERS = {"impuesto", "impuestos", "tributo", "tributos"}
+
+# Etiqueta tras la que cada formulario lista sus responsabilidades o impuestos (hasta la línea)
+_RESPONSIBILITY_LABELS = {
+    "colombia": re.compile(r"Responsabilidades", re.IGNORECASE),
+    "argentina": re.compile(r"Impuestos[^\n]*", re.IGNORECASE),
+    "peru": re.compile(r"Tributos\s+Afectos[^\n]*", re.IGNORECASE),
+}
+
+# Columnas de la tabla de representantes legales de la Ficha RUC
+_REPRESENTATIVE_COLUMNS = {
+    "document_type": ("tipo de documento", "documento", "tipo doc"),
+    "document_number": ("nro documento", "numero de documento", "nro doc"),
+    "name": ("apellidos y nombres", "nombres y apellidos", "nombre"),
+    "representation_start_date": ("fecha desde", "desde"),
+}
+_REPRESENTATIVES_LABEL = re.compile(r"Representantes\s+Legales[^\n]*", re.IGNORECASE)
+
+_RESPONSIBILITY_CODE = re.compile(r"(?<![\d.,/-])\b(\d{1,2})\b(?![.,/]\d)")
+_BLANK_LINE = re.compile(r"\n[ \t]*\n")
+_LEADING_SPACE = re.compile(r"\s*")
+_TABLE_SEPARATOR = re.compile(r"^[\s|:-]*$")
+
+# Formularios soportados: palabras clave de la entidad emisora, tipo de documento y nombre del país
+_LAYOUTS = {
+    "colombia": (("DIAN", "RUT"), "NIT", "Colombia"),
+    "argentina": (("AFIP",), "CUIT", "Argentina"),
+    "peru": (("SUNAT",), "RUC", "Peru"),
+}
+
+# Campos que cada formulario imprime siempre. La constancia de la AFIP no imprime tipo de
+# contribuyente, fecha de actualización ni representante, y la Ficha RUC no imprime la fecha
+# de inicio de cada actividad ni la de actualización. Los campos opcionales que el
+# formulario sí imprime (tipo de contribuyente, representantes) se exigen al encontrarlos
+_REQUIRED_FIELDS = {
+    "colombia": ("taxpayer_type", "responsibilities", "last_update", "primary.code", "primary.start_date",
+                 "legal_representative"),
+    "argentina": ("responsibilities", "primary.code", "primary.start_date"),
+    "peru": ("taxpayer_type", "responsibilities", "primary.code"),
+}
+
+
+def _labeled_values(ocr_markdown: str) -> Dict[str, List[str]]:
+    """Retorna los valores de cada etiqueta encontrada en el OCR, en orden, con la etiqueta normalizada."""
+    values: Dict[str, List[str]] = {}
+    for match in _LABELED_VALUE.finditer(ocr_markdown):
+        label = _normalize_label(match.group("label"))
+        value = _MARKDOWN_EMPHASIS.sub("", match.group("value")).strip()
+        if label and value:
+            values.setdefault(label, []).append(value)
+    return values
+
+
+def _normalize_label(text: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", fold_accents(_MARKDOWN_EMPHASIS.sub("", text))))
+
+
+def _field_values(values: Dict[str, List[str]], name: str) -> List[str]:
+    for label in _FIELD_LABELS[name]:
+        if label in values:
+            return values[label]
+    return []
+
+
+def _field(values: Dict[str, List[str]], name: str) -> str:
+    found = _field_values(values, name)
+    return found[0] if found else ""
+
+
+def _colombia_tax_id(signals: OCRSignals, values: Dict[str, List[str]]) -> Optional[str]:
+    number = signals.first_number(lambda n: n.is_colombian_nit, labels=("NIT",)) or \
+        signals.first_number(lambda n: n.is_colombian_nit)
+    if number is None:
+        return None
+    # El DV puede venir junto al NIT (900.123.456-7) o en su propia casilla
+    if len(number.groups) in (2, 4):
+        base, check_digit = number.digits[:-1], number.digits[-1]
+    else:
+        base, check_digit = number.digits, _field(values, "nit_check_digit").strip()
+    if not is_valid_nit(base, check_digit):
+        logger.info(f"NIT {number.text} descartado por la ruta rápida: dígito de verificación inválido")
+        return None
+    return f"{base}-{check_digit}"
+
+
+def _argentina_tax_id(signals: OCRSignals, values: Dict[str, List[str]]) -> Optional[str]:
+    number = signals.first_number(lambda n: n.is_cuit or n.is_eleven_digits, labels=("CUIT", "CUIL"))
+    if number is None or not is_valid_cuit(number.digits):
+        return None
+    return f"{number.digits[:2]}-{number.digits[2:10]}-{number.digits[10]}"
+
+
+def _peru_tax_id(signals: OCRSignals, values: Dict[str, List[str]]) -> Optional[str]:
+    number = signals.first_number(lambda n: n.is_eleven_digits, labels=("RUC",))
+    if number is None or not is_valid_ruc(number.digits):
+        return None
+    return number.digits
+
+
+_TAX_ID_EXTRACTORS = {
+    "colombia": _colombia_tax_id,
+    "argentina": _argentina_tax_id,
+    "peru": _peru_tax_id,
+}
+
+
+def _detect_layout(signals: OCRSignals) -> Optional[str]:
+    """Retorna el país del formulario si el OCR contiene exactamente una entidad emisora conocida."""
+    matches = [country for country, (issuers, _, _) in _LAYOUTS.items() if signals.has(*issuers)]
+    return matches[0] if len(matches) == 1 else None
+
+
+def _activity_code(value: str) -> str:
+    match = _ACTIVITY_CODE.search(value)
+    return match.group(1) if match else ""
+
+
+def _taxpayer_type(value: str) -> str:
+    """Traduce el tipo de contribuyente impreso (con o sin su código) si es uno de los conocidos."""
+    key = " ".join(re.findall(r"[a-z]+", fold_accents(value)))
+    return _TAXPAYER_TYPES.get(key, "")
+
+
+def _person_document_type(value: str) -> str:
+    key = " ".join(re.findall(r"[a-z]+", fold_accents(value))) or value.strip()
+    return _PERSON_DOCUMENT_TYPES.get(key, "")
+
+
+def _section(ocr_markdown: str, label: "re.Pattern[str]") -> Optional[str]:
+    """Retorna el texto que sigue a la etiqueta hasta la siguiente línea en blanco, o None si no aparece."""
+    match = label.search(ocr_markdown)
+    if match is None:
+        return None
+    start = _LEADING_SPACE.match(ocr_markdown, match.end()).end()
+    blank = _BLANK_LINE.search(ocr_markdown, start)
+    return ocr_markdown[start:blank.start() if blank else len(ocr_markdown)]
+
+
+def _dian_responsibilities(section: str) -> List[str]:
+    codes = [code.zfill(2) for code in _RESPONSIBILITY_CODE.findall(section)]
+    if not codes or any(code not in _DIAN_RESPONSIBILITIES for code in codes):
+        return []
+    return [_DIAN_RESPONSIBILITIES[code] for code in dict.fromkeys(codes)]
+
+
+def _listed_taxes(section: str, taxes: Dict[str, str]) -> List[str]:
+    """Traduce los impuestos listados uno por línea (o en la primera columna de una tabla)."""
+    translated = []
+    for line in section.splitlines():
+        if _TABLE_SEPARATOR.match(line):
+            continue
+        name = _normalize_label(line.strip().strip("|").split("|")[0])
+        name = re.sub(r"^(?:\d+ )+", "", name)
+        if not name or name in _TAX_TABLE_HEADERS:
+            continue
+        keys = [key for key in taxes if name.startswith(key)]
+        if not keys:
+            return []
+        translated.append(taxes[max(keys, key=len)])
+    return list(dict.fromkeys(translated))
+
+
+def _responsibilities(ocr_markdown: str, country: str) -> List[str]:
+    """Traduce las responsabilidades (RUT) o los impuestos (AFIP, SUNAT) listados tras su etiqueta.
+
+    Retorna una lista vacía si no aparece la sección o si contiene alguna entrada
+    desconocida, ya que la lista quedaría incompleta.
+    """
+    section = _section(ocr_markdown, _RESPONSIBILITY_LABELS[country])
+    if section is None:
+        return []
+    if country == "colombia":
+        return _dian_responsibilities(section)
+    return _listed_taxes(section, _AFIP_TAXES if country == "argentina" else _SUNAT_TAXES)
+
+
+def _rut_representative(ocr_markdown: str, signals: OCRSignals) -> Optional[Dict[str, str]]:
+    """Extrae el representante legal de las casillas que siguen a la sección de representación del RUT."""
+    representatives = signals.keywords.get("REPRESENTATIVE")
+    if not representatives:
+        return None
+    values = _labeled_values(ocr_markdown[representatives[0].start:])
+    first_name = " ".join(filter(None, (_field(values, "representative_first_name"),
+                                        _field(values, "representative_other_names"))))
+    last_name = " ".join(filter(None, (_field(values, "representative_first_surname"),
+                                       _field(values, "representative_second_surname"))))
+    return {
+        "first_name": first_name.title(),
+        "last_name": last_name.title(),
+        "document_type": _person_document_type(_field(values, "representative_document_type")),
+        "document_number": re.sub(r"\D", "", _field(values, "representative_document_number")),
+        "representation_start_date": _field(values, "representation_start_date"),
+    }
+
+
+def _ficha_ruc_representative(ocr_markdown: str, signals: OCRSignals) -> Optional[Dict[str, str]]:
+    """Extrae el primer representante de la tabla de representantes legales de la Ficha RUC.
+
+    El nombre solo se separa en apellidos y nombres si el formulario los separa con una coma;
+    si no, se deja vacío y el documento pasa al modelo de chat.
+    """
+    section = _section(ocr_markdown, _REPRESENTATIVES_LABEL)
+    if section is None:
+        return None
+    rows = [[cell.strip() for cell in line.strip().strip("|").split("|")]
+            for line in section.splitlines() if "|" in line and not _TABLE_SEPARATOR.match(line)]
+    if len(rows) < 2:
+        return {}
+    row = dict(zip((_normalize_label(cell) for cell in rows[0]), rows[1]))
+    column = {name: next((row[label] for label in labels if label in row), "")
+              for name, labels in _REPRESENTATIVE_COLUMNS.items()}
+    last_name, _, first_name = column["name"].partition(",")
+    return {
+        "first_name": first_name.strip().title(),
+        "last_name": last_name.strip().title() if first_name else "",
+        "document_type": _person_document_type(column["document_type"]),
+        "document_number": re.sub(r"\D", "", column["document_number"]),
+        "representation_start_date": column["representation_start_date"],
+    }
+
+
+# La constancia de la AFIP no imprime representante legal
+_REPRESENTATIVE_EXTRACTORS = {
+    "colombia": _rut_representative,
+    "peru": _ficha_ruc_representative,
+}
+
+
+def _missing_fields(result: ExtractionResult, required: Iterable[str]) -> List[str]:
+    """Retorna los campos que el formulario imprime y la ruta rápida no pudo extraer.
+
+    :param result: Resultado de la ruta rápida.
+    :param required: Campos exigidos para el formulario, de los de _REQUIRED_FIELDS.
+    """
+    company = result["company_information"]
+    activity = company["economic_activity"]
+    required = set(required)
+    missing = [name for name, value in (
+        ("taxpayer_type", company["taxpayer_type"]),
+        ("responsibilities", result["business_classification"]["responsibilities"]),
+        ("last_update", result["registration"]["last_update"]),
+        ("primary.code", activity["primary"]["code"]),
+        ("primary.start_date", activity["primary"]["start_date"]),
+    ) if name in required and not value]
+    if "primary.start_date" in required and activity["secondary"]["code"] and not activity["secondary"]["start_date"]:
+        missing.append("secondary.start_date")
+    if "legal_representative" in required:
+        missing.extend(
+            f"legal_representative.{name}" for name, value in result["legal_representative"].items() if not value
+        )
+    return missing
+
+
+def extract_from_ocr(ocr_markdown: str) -> Optional[ExtractionResult]:
+    """
+    Intenta extraer el documento completo solo con reglas sobre el OCR
+
+    Solo retorna un resultado cuando el formulario es de un emisor conocido (DIAN, AFIP,
+    SUNAT), el número fiscal supera la verificación de su dígito y se extrajeron todos los
+    campos que ese formulario imprime (ver _REQUIRED_FIELDS): razón social, tipo de
+    contribuyente, responsabilidades o impuestos, actividades con su fecha de inicio, fecha
+    de actualización y representante legal. En cualquier otro caso retorna None y se usa el
+    modelo de chat.
+
+    Args:
+        ocr_markdown: Texto OCR del documento
+
+    Returns:
+        Resultado con la estructura de la plantilla o None si la extracción no es confiable
+    """
+    if not ocr_markdown:
+        return None
+    signals = scan_ocr(ocr_markdown)
+    country = _detect_layout(signals)
+    if country is None:
+        return None
+
+    _, tax_document_type, country_name = _LAYOUTS[country]
+    values = _labeled_values(ocr_markdown)
+    tax_id = _TAX_ID_EXTRACTORS[country](signals, values)
+    legal_name = _field(values, "legal_name")
+    if not tax_id or not legal_name:
+        logger.info(f"Ruta rápida no aplicable al documento de {country_name}: faltan campos obligatorios")
+        return None
+
+    activity_start_dates = _field_values(values, "activity_start_date")
+    secondary_code = _activity_code(_field(values, "secondary_activity"))
+    representative_extractor = _REPRESENTATIVE_EXTRACTORS.get(country)
+    representative = representative_extractor(ocr_markdown, signals) if representative_extractor else None
+    email = _field(values, "email")
+    email_match = _EMAIL.search(email) if email else None
+    result: ExtractionResult = {
+        "fiscal_document": True,
+        "tax_information": {
+            "tax_document_type": tax_document_type,
+            "tax_identification_number": tax_id,
+            "verification_digit": "",
+            "tax_office": "",
+        },
+        "company_information": {
+            "legal_name": legal_name,
+            "commercial_name": _field(values, "commercial_name"),
+            "abbreviation": _field(values, "abbreviation"),
+            "taxpayer_type": _taxpayer_type(_field(values, "taxpayer_type")),
+            "economic_activity": {
+                "primary": {
+                    "code": _activity_code(_field(values, "primary_activity")),
+                    "start_date": activity_start_dates[0] if activity_start_dates else "",
+                },
+                "secondary": {
+                    "code": secondary_code,
+                    # El RUT repite la etiqueta de la fecha de inicio en la casilla de la actividad secundaria
+                    "start_date": activity_start_dates[1] if secondary_code and len(activity_start_dates) > 1 else "",
+                },
+            },
+        },
+        "legal_representative": {
+            "first_name": "",
+            "last_name": "",
+            "document_type": "",
+            "document_number": "",
+            "representation_start_date": "",
+            **(representative or {}),
+        },
+        "location": {
+            "country": country_name,
+            "state": _field(values, "state"),
+            "city": _field(values, "city"),
+            "address": _field(values, "address"),
+            "postal_code": _field(values, "postal_code"),
+            "email": email_match.group() if email_match else "",
+            "phone_1": re.sub(r"\D", "", _field(values, "phone_1")),
+            "phone_2": re.sub(r"\D", "", _field(values, "phone_2")),
+        },
+        "business_classification": {
+            "responsibilities": _responsibilities(ocr_markdown, country),
+        },
+        "registration": {
+            "registration_date": _field(values, "registration_date"),
+            "last_update": _field(values, "last_update"),
+        },
+    }
+    required = set(_REQUIRED_FIELDS[country])
+    # Los campos opcionales que el formulario imprime también deben extraerse
+    if _field(values, "taxpayer_type"):
+        required.add("taxpayer_type")
+    if representative is not None:
+        required.add("legal_representative")
+    missing = _missing_fields(result, required)
+    if missing:
+        logger.info(f"Ruta rápida no aplicable al documento de {country_name}: faltan {', '.join(missing)}")
+        return None
+    logger.info(f"Documento de {country_name} extraído por la ruta rápida sin llamar al modelo de chat")
+    return result
+
+
+class FastPathStats:
+    """Contadores de documentos resueltos por la ruta rápida frente a los que requirieron el chat."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.attempts = 0
+        self.hits = 0
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            self.attempts += 1
+            if hit:
+                self.hits += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "attempts": self.attempts,
+                "hits": self.hits,
+                "hit_ratio": round(self.hits / self.attempts, 4) if self.attempts else 0.0,
+            }
+
+
+fast_path_stats = FastPathStats()
@@ -0,0 +1,92 @@
+import json
+from typing import List, TypedDict, Union
+
+
+class TaxInformation(TypedDict, total=False):
+    tax_document_type: str
+    tax_identification_number: str
+    verification_digit: str
+    tax_office: str
+
+
+class EconomicActivityEntry(TypedDict, total=False):
+    code: str
+    start_date: str
+
+
+class EconomicActivity(TypedDict, total=False):
+    primary: EconomicActivityEntry
+    secondary: EconomicActivityEntry
+
+
+class CompanyInformation(TypedDict, total=False):
+    legal_name: str
+    commercial_name: str
+    abbreviation: str
+    taxpayer_type: str
+    economic_activity: EconomicActivity
+
+
+class LegalRepresentative(TypedDict, total=False):
+    first_name: str
+    last_name: str
+    document_type: str
+    document_number: str
+    representation_start_date: str
+
+
+class Location(TypedDict, total=False):
+    country: str
+    state: str
+    city: str
+    address: str
+    postal_code: str
+    email: str
+    phone_1: str
+    phone_2: str
+
+
+class BusinessClassification(TypedDict, total=False):
+    responsibilities: Union[str, List[str]]
+
+
+class Registration(TypedDict, total=False):
+    registration_date: str
+    last_update: str
+
+
+class ExtractionResult(TypedDict, total=False):
+    """Resultado de la extracción de un documento, con la estructura definida en la plantilla.
+
+    Se obtiene una sola vez a partir de la respuesta del modelo y los validadores y
+    procesadores por país lo modifican en sitio. Todos los campos son opcionales porque
+    el modelo puede omitir secciones.
+    """
+    fiscal_document: bool
+    tax_information: TaxInformation
+    company_information: CompanyInformation
+    legal_representative: LegalRepresentative
+    location: Location
+    business_classification: BusinessClassification
+    registration: Registration
+
+
+def parse_extraction(json_response: str) -> ExtractionResult:
+    """Convierte la respuesta JSON del modelo en un ExtractionResult.
+
+    :param json_response: Cadena JSON devuelta por el modelo o guardada en la caché.
+    :return: Resultado de la extracción.
+    :raises ValueError: Si la cadena no es un JSON válido o no es un objeto.
+    """
+    try:
+        data = json.loads(json_response)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"La respuesta no es un JSON válido: {e}")
+    if not isinstance(data, dict):
+        raise ValueError("La respuesta JSON no es un objeto")
+    return data
+
+
+def serialize_extraction(data: ExtractionResult) -> str:
+    """Serializa un ExtractionResult a JSON, por ejemplo para guardarlo en la caché."""
+    return json.dumps(data, ensure_ascii=False)
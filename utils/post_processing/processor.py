@@ -2,9 +2,11 @@ import json
 from typing import Dict, Any, Optional
 
 from utils.logger import logger
+from utils.post_processing.models import ExtractionResult
 from utils.post_processing.country_processors import (
     get_country_processor,
-    detect_country
+    detect_country,
+    normalize_country
 )
 from utils.post_processing.validators import (
     validate_tax_document,
@@ -13,6 +15,22 @@ from utils.post_processing.validators import (
 )
 from utils.post_processing.utils.date_normalizer import normalize_dates
 
+
+def _copy_containers(value: Any) -> Any:
+    """Copia los diccionarios y listas de un resultado JSON sin copiar sus valores.
+
+    Los valores (cadenas, números, booleanos) son inmutables y se comparten; los
+    procesadores solo modifican los contenedores. Con un resultado típico es unas tres
+    veces más rápido que copy.deepcopy, que mantiene un memo y despacha por tipo cada valor.
+    """
+    value_type = type(value)
+    if value_type is dict:
+        return {key: _copy_containers(item) for key, item in value.items()}
+    if value_type is list:
+        return [_copy_containers(item) for item in value]
+    return value
+
+
 class ResponsePostProcessor:
     """
     Clase principal para post-procesar y corregir datos extraídos de documentos fiscales
@@ -34,7 +52,42 @@ class ResponsePostProcessor:
         """
         try:
             data = json.loads(json_response)
+        except json.JSONDecodeError:
+            logger.error("Error decodificando JSON en el post-procesador")
+            return json_response
+
+        # data se acaba de decodificar y se descarta si falla: se corrige sin copiarlo
+        if not ResponsePostProcessor._process(data, ocr_markdown):
+            return json_response
+        return json.dumps(data)
+
+    @staticmethod
+    def process_data(data: ExtractionResult, ocr_markdown: str = "") -> bool:
+        """
+        Corrige en sitio el resultado de la extracción según las reglas específicas de cada país.
+        
+        Las correcciones se aplican sobre una copia de sus diccionarios y listas que solo
+        reemplaza el contenido de data si el post-procesamiento termina sin errores; si
+        falla, data queda intacto.
+        
+        Args:
+            data: Resultado ya validado por fiscal_validator, modificado en sitio
+            ocr_markdown: Texto OCR original para validaciones adicionales
             
+        Returns:
+            True si el post-procesamiento terminó sin errores
+        """
+        processed = _copy_containers(data)
+        if not ResponsePostProcessor._process(processed, ocr_markdown):
+            return False
+        data.clear()
+        data.update(processed)
+        return True
+
+    @staticmethod
+    def _process(data: Dict[str, Any], ocr_markdown: str) -> bool:
+        """Aplica las correcciones directamente sobre data; si falla, data puede quedar a medias."""
+        try:
             # Obtener o detectar el país
             country = data.get('location', {}).get('country', '').lower()
             if not country:
@@ -55,14 +108,11 @@ class ResponsePostProcessor:
             ResponsePostProcessor._apply_general_fixes(data, ocr_markdown)
             
             logger.info("Post-procesamiento completado correctamente")
-            return json.dumps(data)
+            return True
         
-        except json.JSONDecodeError:
-            logger.error("Error decodificando JSON en el post-procesador")
-            return json_response
         except Exception as e:
             logger.error(f"Error en el post-procesamiento: {e}")
-            return json_response
+            return False
     
     @staticmethod
     def _apply_general_fixes(data: Dict[str, Any], ocr_markdown: str = "") -> None:
@@ -70,7 +120,9 @@ class ResponsePostProcessor:
         # Validar y corregir los campos críticos
         tax_info = data.get('tax_information', {})
         legal_rep = data.get('legal_representative', {})
-        country = data.get('location', {}).get('country', '').lower()
+        raw_country = data.get('location', {}).get('country', '')
+        # Los validadores reciben la clave normalizada del país ("panama" para "Panamá")
+        country = normalize_country(raw_country) or raw_country.lower()
         
         # Validar tax_document_type
         validate_tax_document(tax_info, country, data, ocr_markdown)
@@ -82,7 +134,7 @@ class ResponsePostProcessor:
         validate_person_document(legal_rep, country, ocr_markdown)
         
         # Normalizar formato de fechas
-        normalize_dates(data)
+        normalize_dates(data, country)
         
         # Asegurar que fiscal_document sea booleano
         if 'fiscal_document' in data and not isinstance(data['fiscal_document'], bool):
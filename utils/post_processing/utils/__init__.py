@@ -1,8 +1,12 @@
 # Exportar utilidades específicas
-from utils.post_processing.utils.date_normalizer import normalize_dates
+from utils.post_processing.utils.date_normalizer import normalize_date, normalize_dates, normalize_dates_batch
 from utils.post_processing.utils.ocr_extractor import extract_tax_id_from_ocr
+from utils.post_processing.utils.ocr_signals import scan_ocr
 
 __all__ = [
+    'normalize_date',
     'normalize_dates',
-    'extract_tax_id_from_ocr'
+    'normalize_dates_batch',
+    'extract_tax_id_from_ocr',
+    'scan_ocr'
 ]
\ No newline at end of file
@@ -0,0 +1,51 @@
+from typing import Optional
+
+# Pesos oficiales de cada algoritmo, aplicados de derecha a izquierda sobre la base del número
+_NIT_WEIGHTS = (3, 7, 13, 17, 19, 23, 29, 37, 41, 43, 47, 53, 59, 67, 71)
+_MOD11_WEIGHTS = (2, 3, 4, 5, 6, 7)
+
+
+def nit_check_digit(base: str) -> Optional[int]:
+    """
+    Calcula el dígito de verificación de un NIT colombiano (algoritmo de la DIAN)
+
+    Args:
+        base: NIT sin dígito de verificación, solo dígitos
+
+    Returns:
+        Dígito de verificación o None si la base no es válida
+    """
+    if not base.isdigit() or len(base) > len(_NIT_WEIGHTS):
+        return None
+    total = sum(int(digit) * weight for digit, weight in zip(reversed(base), _NIT_WEIGHTS))
+    remainder = total % 11
+    return remainder if remainder in (0, 1) else 11 - remainder
+
+
+def is_valid_nit(base: str, check_digit: str) -> bool:
+    """Verifica el dígito de verificación de un NIT colombiano"""
+    return check_digit.isdigit() and nit_check_digit(base) == int(check_digit)
+
+
+def _mod11_check_digit(base: str) -> int:
+    total = sum(int(digit) * _MOD11_WEIGHTS[i % len(_MOD11_WEIGHTS)] for i, digit in enumerate(reversed(base)))
+    return 11 - total % 11
+
+
+def is_valid_cuit(number: str) -> bool:
+    """Verifica el dígito verificador de un CUIT/CUIL argentino de 11 dígitos (módulo 11)"""
+    if len(number) != 11 or not number.isdigit():
+        return False
+    check_digit = _mod11_check_digit(number[:10])
+    if check_digit == 11:
+        check_digit = 0
+    # Un resultado de 10 no es un CUIT válido: la AFIP cambia el prefijo en esos casos
+    return check_digit != 10 and check_digit == int(number[10])
+
+
+def is_valid_ruc(number: str) -> bool:
+    """Verifica el dígito verificador de un RUC peruano de 11 dígitos (módulo 11)"""
+    if len(number) != 11 or not number.isdigit() or number[:2] not in ('10', '15', '16', '17', '20'):
+        return False
+    check_digit = _mod11_check_digit(number[:10]) % 10
+    return check_digit == int(number[10])
@@ -1,54 +1,167 @@
+import datetime
 import re
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, Iterable, Optional
 
-def normalize_dates(data: Dict[str, Any]) -> None:
+from utils.post_processing.country_processors.registry import fold_accents
+
+# Campos que contienen fechas
+DATE_FIELDS = (
+    ('registration', 'registration_date'),
+    ('registration', 'last_update'),
+    ('company_information', 'economic_activity', 'primary', 'start_date'),
+    ('company_information', 'economic_activity', 'secondary', 'start_date'),
+    ('legal_representative', 'representation_start_date'),
+)
+
+# Países que escriben las fechas numéricas como MM/DD/YYYY; el resto usa DD/MM/YYYY
+_MONTH_FIRST_COUNTRIES = {'us', 'usa', 'united states', 'united states of america', 'estados unidos'}
+
+# Nombres de meses en español (y abreviaturas habituales), ya sin acentos
+_MONTHS = {
+    'enero': 1, 'ene': 1,
+    'febrero': 2, 'feb': 2,
+    'marzo': 3, 'mar': 3,
+    'abril': 4, 'abr': 4,
+    'mayo': 5, 'may': 5,
+    'junio': 6, 'jun': 6,
+    'julio': 7, 'jul': 7,
+    'agosto': 8, 'ago': 8,
+    'septiembre': 9, 'setiembre': 9, 'sep': 9, 'sept': 9, 'set': 9,
+    'octubre': 10, 'oct': 10,
+    'noviembre': 11, 'nov': 11,
+    'diciembre': 12, 'dic': 12,
+}
+
+# YYYY-MM-DD o YYYY/MM/DD
+_YEAR_FIRST = re.compile(r'(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})(?!\d)')
+# DD/MM/YYYY o MM/DD/YYYY, con "/", "-" o "."
+_NUMERIC = re.compile(r'(\d{1,2})[-/.](\d{1,2})[-/.](\d{4})(?!\d)')
+# "15 de enero de 2020", "15-ene-2020", "15 ene. 2020"
+_DAY_MONTH_NAME = re.compile(
+    r'(\d{1,2})(?:\s+de\s+|\s*[-/.\s]\s*)([^\W\d_]+)\.?(?:\s+del?\s+|\s*[-/.\s]\s*)(\d{4})(?!\d)',
+    re.IGNORECASE,
+)
+# "enero de 2020", "ene-2020"
+_MONTH_NAME_YEAR = re.compile(r'([^\W\d_]+)\.?(?:\s+del?\s+|\s*[-/.\s]\s*)(\d{4})(?!\d)', re.IGNORECASE)
+# MM-YYYY o MM/YYYY (convertir a YYYY-MM-01)
+_MONTH_YEAR = re.compile(r'(\d{1,2})[-/](\d{4})(?!\d)')
+
+
+def _format(year: int, month: int, day: int) -> Optional[str]:
+    # Las fechas inexistentes (31/02, 29/02 de un año no bisiesto) no se normalizan
+    try:
+        return datetime.date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+def _month_number(name: str) -> Optional[int]:
+    return _MONTHS.get(fold_accents(name))
+
+
+@lru_cache(maxsize=64)
+def _is_day_first(country: Optional[str]) -> bool:
+    """Indica si las fechas numéricas del país se escriben con el día primero."""
+    return not country or fold_accents(country).strip() not in _MONTH_FIRST_COUNTRIES
+
+
+def normalize_date(value: str, day_first: bool = True) -> str:
+    """
+    Normaliza una fecha al formato YYYY-MM-DD
+
+    Args:
+        value: Fecha tal como la devolvió el modelo
+        day_first: Si las fechas numéricas ambiguas se leen como DD/MM (True) o MM/DD (False)
+
+    Returns:
+        Fecha normalizada, o el valor original si no se reconoce el formato
+    """
+    text = value.strip()
+    normalized = None
+
+    match = _YEAR_FIRST.match(text)
+    if match:
+        normalized = _format(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+    else:
+        match = _NUMERIC.match(text)
+        if match:
+            first, second, year = int(match.group(1)), int(match.group(2)), int(match.group(3))
+            # Un componente mayor que 12 solo puede ser el día, sin importar el país
+            if first > 12 or (day_first and second <= 12):
+                normalized = _format(year, second, first)
+            else:
+                normalized = _format(year, first, second)
+        else:
+            match = _DAY_MONTH_NAME.match(text)
+            month = _month_number(match.group(2)) if match else None
+            if month:
+                normalized = _format(int(match.group(3)), month, int(match.group(1)))
+            else:
+                match = _MONTH_NAME_YEAR.match(text)
+                month = _month_number(match.group(1)) if match else None
+                if month:
+                    normalized = _format(int(match.group(2)), month, 1)
+                else:
+                    match = _MONTH_YEAR.match(text)
+                    if match:
+                        normalized = _format(int(match.group(2)), int(match.group(1)), 1)
+
+    if normalized is None:
+        return value
+    # Conservar lo que siga a la fecha (por ejemplo una hora)
+    return normalized + text[match.end():]
+
+
+def normalize_dates(data: Dict[str, Any], country: Optional[str] = None) -> int:
     """
     Normaliza todas las fechas al formato YYYY-MM-DD
-    
+
     Args:
         data: Datos del documento con fechas a normalizar
+        country: País del documento; si se omite se toma de location.country
+
+    Returns:
+        Número de campos modificados
+    """
+    if country is None:
+        location = data.get('location')
+        country = location.get('country', '') if isinstance(location, dict) else ''
+    day_first = _is_day_first(country)
+
+    changed = 0
+    for path in DATE_FIELDS:
+        changed += _normalize_date_field(data, path, day_first)
+    return changed
+
+
+def normalize_dates_batch(records: Iterable[Dict[str, Any]], country: Optional[str] = None) -> int:
+    """
+    Normaliza en sitio las fechas de muchos documentos en una sola llamada
+
+    Args:
+        records: Documentos a normalizar
+        country: País común a todos los documentos; si se omite se usa el de cada documento
+
+    Returns:
+        Número total de campos modificados
     """
-    # Patrones comunes de fechas
-    date_patterns = [
-        # DD/MM/YYYY
-        (r'(\d{1,2})/(\d{1,2})/(\d{4})', lambda m: f"{m.group(3)}-{m.group(2).zfill(2)}-{m.group(1).zfill(2)}"),
-        # MM/DD/YYYY
-        (r'(\d{1,2})/(\d{1,2})/(\d{4})', lambda m: f"{m.group(3)}-{m.group(1).zfill(2)}-{m.group(2).zfill(2)}"),
-        # DD-MM-YYYY
-        (r'(\d{1,2})-(\d{1,2})-(\d{4})', lambda m: f"{m.group(3)}-{m.group(2).zfill(2)}-{m.group(1).zfill(2)}"),
-        # YYYY/MM/DD
-        (r'(\d{4})/(\d{1,2})/(\d{1,2})', lambda m: f"{m.group(1)}-{m.group(2).zfill(2)}-{m.group(3).zfill(2)}"),
-        # MM-YYYY (convertir a YYYY-MM-01)
-        (r'(\d{1,2})-(\d{4})', lambda m: f"{m.group(2)}-{m.group(1).zfill(2)}-01"),
-    ]
-    
-    # Campos que contienen fechas
-    date_fields = [
-        ['registration', 'registration_date'],
-        ['registration', 'last_update'],
-        ['company_information', 'economic_activity', 'primary', 'start_date'],
-        ['company_information', 'economic_activity', 'secondary', 'start_date'],
-        ['legal_representative', 'representation_start_date']
-    ]
-    
-    # Normalizar cada campo de fecha
-    for path in date_fields:
-        _normalize_date_field(data, path, date_patterns)
-
-def _normalize_date_field(data: Dict[str, Any], path: list, patterns: list) -> None:
+    return sum(normalize_dates(record, country) for record in records)
+
+
+def _normalize_date_field(data: Dict[str, Any], path: tuple, day_first: bool) -> int:
     """Normaliza un campo de fecha específico"""
     current = data
-    for i, key in enumerate(path):
-        if i == len(path) - 1:
-            # Llegamos al campo de fecha
-            date_value = current.get(key, '')
-            if date_value and isinstance(date_value, str):
-                # Aplicar patrones de normalización
-                for pattern, replacement in patterns:
-                    if re.match(pattern, date_value):
-                        current[key] = re.sub(pattern, replacement, date_value)
-                        break
-        elif key in current:
-            current = current[key]
-        else:
-            break
\ No newline at end of file
+    for key in path[:-1]:
+        current = current.get(key)
+        if not isinstance(current, dict):
+            return 0
+
+    date_value = current.get(path[-1], '')
+    if not date_value or not isinstance(date_value, str):
+        return 0
+    normalized = normalize_date(date_value, day_first)
+    if normalized == date_value:
+        return 0
+    current[path[-1]] = normalized
+    return 1
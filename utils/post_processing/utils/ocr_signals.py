@@ -0,0 +1,232 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Palabras clave reconocidas en el OCR. El orden importa: las frases largas van antes
+# que sus abreviaturas para que la alternancia elija la coincidencia más específica.
+_KEYWORD_PATTERNS = [
+    ("RUT", r"\bRUT\b|Registro\s+[ÚúUu]nico\s+Tributario"),
+    ("RUC", r"\bR\.?U\.?C\b\.?|Registro\s+[ÚúUu]nico\s+(?:de\s+)?Contribuyente"),
+    ("DIAN", r"\bDIAN\b|Direcci[óo]n\s+de\s+Impuestos\s+y\s+Aduanas"),
+    ("AFIP", r"\bAFIP\b|Administraci[óo]n\s+Federal\s+de\s+Ingresos\s+P[úu]blicos"),
+    ("SUNAT", r"\bSUNAT\b|Superintendencia\s+Nacional\s+de\s+Aduanas"),
+    ("PANAMA_BUSINESS", r"PanamaEmprende|Aviso\s+de\s+Operaci[óo]n|establecimiento\s+comercial"),
+    ("NIT", r"\bN\.?I\.?T\b\.?"),
+    ("CUIT", r"\bC\.?U\.?I\.?T\b\.?"),
+    ("CUIL", r"\bC\.?U\.?I\.?L\b\.?"),
+    ("DNI", r"\bDNI\b"),
+    ("CEDULA_CIUDADANIA", r"C[eé]dula\s*de\s*Ciudadan[ií]a"),
+    ("CEDULA_EXTRANJERIA", r"C[eé]dula\s*de\s*Extranjer[ií]a"),
+    ("CEDULA_IDENTIDAD", r"C[eé]dula\s*de\s*Identidad"),
+    ("CEDULA", r"C[eé]dula"),
+    ("PASAPORTE", r"Pasaporte"),
+    ("CC", r"\bC\.?C\b\.?"),
+    ("CE", r"\bC\.?E\b\.?"),
+    ("CI", r"\bC\.?I\b\.?"),
+    ("TI", r"\bT\.?I\b\.?"),
+    ("REPRESENTATIVE", r"Representante|Gerente|Director"),
+    ("COLOMBIA", r"\bColombian?a?\b|\bBogot[aá]\b|\bMedell[ií]n\b|\bCali\b"),
+    ("PANAMA", r"\bPanam[aá]\b|\bPanamanian\b"),
+    ("ARGENTINA", r"\bArgentina\b|\bBuenos\s+Aires\b|\bMendoza\b|\bC[oó]rdoba\b"),
+    ("PERU", r"\bPer[uú]\b|\bLima\b|\bArequipa\b|\bTrujillo\b"),
+]
+
+# Familias de palabras clave que los validadores consultan como una sola
+CEDULA_KINDS = ("CEDULA_CIUDADANIA", "CEDULA_EXTRANJERIA", "CEDULA_IDENTIDAD", "CEDULA")
+
+_DATE_PATTERN = (
+    r"\b\d{4}-\d{1,2}-\d{1,2}\b"
+    r"|\b\d{1,2}[/\-.]\d{1,2}[/\-.]\d{4}\b"
+    r"|\b\d{1,2}\s+de\s+[A-Za-zÁÉÍÓÚáéíóú]+\s+de\s+\d{4}\b"
+)
+# Identificadores alfanuméricos (pasaportes, carnés): mayúsculas con al menos una letra y un dígito
+_ALNUM_ID_PATTERN = r"(?-i:\b(?=[A-Z0-9]*\d)(?=[0-9]*[A-Z])[A-Z0-9]{6,12}\b)"
+_NUMBER_PATTERN = r"\d+(?:[.,\-]\d+)*"
+
+# Expresión maestra: una sola pasada sobre el texto reconoce todas las señales
+_MASTER_PATTERN = re.compile(
+    "|".join(f"(?P<{kind}>{pattern})" for kind, pattern in _KEYWORD_PATTERNS)
+    + f"|(?P<DATE>{_DATE_PATTERN})"
+    + f"|(?P<ALNUM_ID>{_ALNUM_ID_PATTERN})"
+    + f"|(?P<NUMBER>{_NUMBER_PATTERN})"
+    + r"|(?P<NEWLINE>\n)",
+    re.IGNORECASE,
+)
+# Texto permitido entre una etiqueta (por ejemplo "NIT") y el número que identifica,
+# incluido el separador de columnas de las tablas markdown
+_LABEL_GAP = re.compile(r"[\s*|]*(?:No\.?|N[°º]\.?|Nro\.?|N[uú]mero)?[\s*:=#|]*", re.IGNORECASE)
+_MAX_LABEL_GAP = 16
+_DIGIT_GROUPS = re.compile(r"\d+")
+
+
+class Keyword(NamedTuple):
+    kind: str
+    text: str
+    start: int
+    end: int
+    line: int
+
+
+class NumberToken(NamedTuple):
+    """Secuencia numérica del OCR, con sus grupos de dígitos y la etiqueta que la precede."""
+    text: str
+    digits: str
+    groups: Tuple[int, ...]
+    start: int
+    end: int
+    line: int
+    label: Optional[str]
+    alphanumeric: bool = False
+
+    @property
+    def is_colombian_nit(self) -> bool:
+        """NIT de 9-10 dígitos con dígito de verificación opcional, o con puntos (900.123.456-7)."""
+        if self.groups in ((9,), (10,), (9, 1), (10, 1)):
+            return True
+        return len(self.groups) in (3, 4) and 1 <= self.groups[0] <= 3 and self.groups[1:3] == (3, 3) \
+            and self.groups[3:] in ((), (1,))
+
+    @property
+    def is_panama_id(self) -> bool:
+        """Identificación panameña con formato X-XXX-XXXX."""
+        return len(self.groups) == 3 and 1 <= self.groups[0] <= 2 and 3 <= self.groups[1] <= 4 \
+            and 3 <= self.groups[2] <= 4 and "-" in self.text
+
+    @property
+    def is_cuit(self) -> bool:
+        """CUIT/CUIL argentino con formato XX-XXXXXXXX-X."""
+        return self.groups == (2, 8, 1)
+
+    @property
+    def is_eleven_digits(self) -> bool:
+        """Número de 11 dígitos sin separadores (RUC peruano o CUIT sin formato)."""
+        return self.groups == (11,)
+
+
+class OCRSignals:
+    """Índice de señales del OCR: palabras clave, números candidatos y fechas con su posición y línea."""
+
+    def __init__(self, keywords: Dict[str, List[Keyword]], numbers: List[NumberToken], dates: List[Keyword],
+                 tokens_by_line: Dict[int, List[Tuple[int, object]]]):
+        self.keywords = keywords
+        self.numbers = numbers
+        self.dates = dates
+        self._tokens_by_line = tokens_by_line
+
+    def has(self, *kinds: str) -> bool:
+        """Indica si aparece alguna de las palabras clave indicadas."""
+        return any(kind in self.keywords for kind in kinds)
+
+    def first_number(self, predicate: Callable[[NumberToken], bool], labels: Iterable[str] = ()) -> Optional[NumberToken]:
+        """Retorna el primer número que cumple la condición y, si se indican, que va tras una de las etiquetas."""
+        labels = tuple(labels)
+        for number in self.numbers:
+            if labels and number.label not in labels:
+                continue
+            if predicate(number):
+                return number
+        return None
+
+    def has_labeled_number(self, *labels: str) -> bool:
+        """Indica si alguna de las etiquetas va seguida directamente de un número."""
+        return any(number.label in labels for number in self.numbers)
+
+    def find_after_representative(self, doc_kinds: Iterable[str], predicate: Callable[[NumberToken], bool]) -> Optional[NumberToken]:
+        """Busca, en la misma línea, un representante, luego un tipo de documento y luego un número válido.
+
+        :param doc_kinds: Palabras clave del tipo de documento (por ejemplo "CC" o "CEDULA").
+        :param predicate: Condición que debe cumplir el número del documento.
+        :return: El primer número que cumple el patrón o None.
+        """
+        doc_kinds = set(doc_kinds)
+        for representative in self.keywords.get("REPRESENTATIVE", []):
+            seen_doc_kind = False
+            for start, token in self._tokens_by_line.get(representative.line, []):
+                if start < representative.end:
+                    continue
+                if isinstance(token, Keyword):
+                    seen_doc_kind = seen_doc_kind or token.kind in doc_kinds
+                elif seen_doc_kind and predicate(token):
+                    return token
+        return None
+
+
+# Índices recientes por hash del OCR: basta con unos pocos para que los validadores de un
+# mismo documento compartan el índice sin retener textos completos de documentos anteriores
+_SCAN_CACHE_SIZE = 4
+_scan_cache: "OrderedDict[bytes, OCRSignals]" = OrderedDict()
+_scan_cache_lock = threading.Lock()
+
+
+def scan_ocr(ocr_markdown: str) -> OCRSignals:
+    """Recorre el OCR una sola vez y construye su índice de señales.
+
+    El resultado se memoiza por hash del texto, de modo que todos los validadores de un
+    mismo documento comparten el mismo índice.
+
+    :param ocr_markdown: Texto OCR del documento en formato markdown.
+    :return: Índice de señales del documento.
+    """
+    key = hashlib.blake2b((ocr_markdown or "").encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    with _scan_cache_lock:
+        signals = _scan_cache.get(key)
+        if signals is not None:
+            _scan_cache.move_to_end(key)
+            return signals
+    signals = _scan(ocr_markdown)
+    with _scan_cache_lock:
+        _scan_cache[key] = signals
+        _scan_cache.move_to_end(key)
+        while len(_scan_cache) > _SCAN_CACHE_SIZE:
+            _scan_cache.popitem(last=False)
+    return signals
+
+
+def _scan(ocr_markdown: str) -> OCRSignals:
+    keywords: Dict[str, List[Keyword]] = {}
+    numbers: List[NumberToken] = []
+    dates: List[Keyword] = []
+    tokens_by_line: Dict[int, List[Tuple[int, object]]] = {}
+    line = 0
+    previous: Optional[Keyword] = None
+
+    for match in _MASTER_PATTERN.finditer(ocr_markdown or ""):
+        kind = match.lastgroup
+        if kind == "NEWLINE":
+            line += 1
+            previous = None
+            continue
+
+        text = match.group()
+        start, end = match.span()
+        if kind in ("NUMBER", "ALNUM_ID"):
+            label = None
+            if previous is not None and start - previous.end <= _MAX_LABEL_GAP \
+                    and _LABEL_GAP.fullmatch(ocr_markdown, previous.end, start):
+                label = previous.kind
+            groups = tuple(len(group) for group in _DIGIT_GROUPS.findall(text)) if kind == "NUMBER" else ()
+            token = NumberToken(
+                text=text,
+                digits="".join(c for c in text if c.isdigit()),
+                groups=groups,
+                start=start,
+                end=end,
+                line=line,
+                label=label,
+                alphanumeric=kind == "ALNUM_ID",
+            )
+            numbers.append(token)
+            previous = None
+        elif kind == "DATE":
+            token = Keyword(kind, text, start, end, line)
+            dates.append(token)
+            previous = None
+        else:
+            token = Keyword(kind, text, start, end, line)
+            keywords.setdefault(kind, []).append(token)
+            previous = token
+        tokens_by_line.setdefault(line, []).append((start, token))
+
+    return OCRSignals(keywords, numbers, dates, tokens_by_line)
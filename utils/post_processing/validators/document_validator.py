@@ -1,6 +1,15 @@
 import re
-from typing import Dict, Any
+from typing import Callable, Dict, Any
 from utils.logger import logger
+from utils.post_processing.utils.ocr_signals import CEDULA_KINDS, NumberToken, scan_ocr
+
+def _digits(min_length: int, max_length: int) -> Callable[[NumberToken], bool]:
+    """Condición para números de documento de entre min_length y max_length dígitos"""
+    return lambda number: not number.alphanumeric and min_length <= len(number.digits) <= max_length
+
+def _alphanumeric(min_length: int, max_length: int) -> Callable[[NumberToken], bool]:
+    """Condición para documentos alfanuméricos como pasaportes"""
+    return lambda number: min_length <= len(number.text) <= max_length and (number.alphanumeric or len(number.groups) == 1)
 
 def validate_person_document(legal_rep: Dict[str, Any], country: str, ocr_markdown: str = "") -> None:
     """
@@ -26,37 +35,38 @@ def validate_document_type(legal_rep: Dict[str, Any], country: str, ocr_markdown
     
     # Si no hay document_type pero tenemos OCR, intentar extraerlo
     if not current_type and ocr_markdown:
-        # Patrones para buscar el tipo de documento en el OCR
-        rep_doc_patterns = {
+        # Tipos de documento del representante legal: palabras clave del documento y formato del número
+        rep_doc_signals = {
             'colombia': [
-                (r'(?:Representante|Gerente|Director).*?(?:C\.?C\.?|C[eé]dula).*?(\d{6,12})', 'CC'),
-                (r'(?:Representante|Gerente|Director).*?(?:C\.?E\.?).*?(\d{6,12})', 'CE'),
-                (r'(?:Representante|Gerente|Director).*?(?:Pasaporte).*?([A-Z0-9]{6,12})', 'PP')
+                (('CC',) + CEDULA_KINDS, _digits(6, 12), 'CC'),
+                (('CE',), _digits(6, 12), 'CE'),
+                (('PASAPORTE',), _alphanumeric(6, 12), 'PP')
             ],
             'panama': [
-                (r'(?:Representante|Gerente|Director).*?(?:C\.?I\.?|C[eé]dula).*?(\d{1,2}-\d{3,4}-\d{3,4})', 'CI'),
-                (r'(?:Representante|Gerente|Director).*?(?:Pasaporte).*?([A-Z0-9]{6,12})', 'PASAPORTE')
+                (('CI',) + CEDULA_KINDS, lambda n: n.is_panama_id, 'CI'),
+                (('PASAPORTE',), _alphanumeric(6, 12), 'PASAPORTE')
             ],
             'argentina': [
-                (r'(?:Representante|Gerente|Director).*?(?:DNI).*?(\d{7,8})', 'DNI'),
-                (r'(?:Representante|Gerente|Director).*?(?:CUIT|CUIL).*?(\d{2}-\d{8}-\d{1})', 'CUIT')
+                (('DNI',), _digits(7, 8), 'DNI'),
+                (('CUIT', 'CUIL'), lambda n: n.is_cuit, 'CUIT')
             ],
             'peru': [
-                (r'(?:Representante|Gerente|Director).*?(?:DNI).*?(\d{8})', 'DNI'),
-                (r'(?:Representante|Gerente|Director).*?(?:CE).*?([A-Z0-9]{9,12})', 'CE')
+                (('DNI',), _digits(8, 8), 'DNI'),
+                (('CE',), _alphanumeric(9, 12), 'CE')
             ]
         }
         
-        # Buscar patrones en el OCR para el país detectado
-        for c, patterns in rep_doc_patterns.items():
+        # Consultar el índice de señales del OCR para el país detectado
+        signals = scan_ocr(ocr_markdown)
+        for c, candidates in rep_doc_signals.items():
             if c in country:
-                for pattern, doc_type in patterns:
-                    match = re.search(pattern, ocr_markdown, re.IGNORECASE)
-                    if match:
+                for doc_kinds, predicate, doc_type in candidates:
+                    number = signals.find_after_representative(doc_kinds, predicate)
+                    if number:
                         current_type = doc_type
                         # Si encontramos también el número, guardarlo
-                        legal_rep['document_number'] = match.group(1)
-                        logger.info(f"Tipo de documento '{doc_type}' y número '{match.group(1)}' del representante legal detectados por OCR")
+                        legal_rep['document_number'] = number.text
+                        logger.info(f"Tipo de documento '{doc_type}' y número '{number.text}' del representante legal detectados por OCR")
                         break
                 
                 if current_type:
@@ -68,13 +78,13 @@ def validate_document_type(legal_rep: Dict[str, Any], country: str, ocr_markdown
         if 'colombia' in country:
             legal_rep['document_type'] = 'CC'
             logger.info("Asignando document_type por defecto para Colombia: CC")
-        elif 'panama' in country or 'panamá' in country:
+        elif 'panama' in country:
             legal_rep['document_type'] = 'CI'
             logger.info("Asignando document_type por defecto para Panamá: CI")
         elif 'argentina' in country:
             legal_rep['document_type'] = 'DNI'
             logger.info("Asignando document_type por defecto para Argentina: DNI")
-        elif 'peru' in country or 'perú' in country:
+        elif 'peru' in country:
             legal_rep['document_type'] = 'DNI'
             logger.info("Asignando document_type por defecto para Perú: DNI")
         return
@@ -119,23 +129,23 @@ def validate_document_number(legal_rep: Dict[str, Any], country: str, ocr_markdo
     
     # Si no hay document_number pero tenemos OCR y doc_type, intentar extraerlo
     if not doc_number and ocr_markdown and doc_type:
-        # Patrones para buscar el número de documento en el OCR según el tipo
-        rep_num_patterns = {
-            'CC': r'(?:Representante|Gerente|Director).*?(?:C\.?C\.?|C[eé]dula).*?(?:No\.?|Numero|Número)?:?\s*(\d{6,12})',
-            'CE': r'(?:Representante|Gerente|Director).*?(?:C\.?E\.?).*?(?:No\.?|Numero|Número)?:?\s*(\d{6,12})',
-            'TI': r'(?:Representante|Gerente|Director).*?(?:T\.?I\.?).*?(?:No\.?|Numero|Número)?:?\s*(\d{6,12})',
-            'PP': r'(?:Representante|Gerente|Director).*?(?:Pasaporte).*?(?:No\.?|Numero|Número)?:?\s*([A-Z0-9]{6,12})',
-            'CI': r'(?:Representante|Gerente|Director).*?(?:C\.?I\.?|C[eé]dula).*?(?:No\.?|Numero|Número)?:?\s*(\d{1,2}-\d{3,4}-\d{3,4}|\d{5,12})',
-            'DNI': r'(?:Representante|Gerente|Director).*?(?:DNI).*?(?:No\.?|Numero|Número)?:?\s*(\d{7,8})',
-            'CUIT': r'(?:Representante|Gerente|Director).*?(?:CUIT).*?(?:No\.?|Numero|Número)?:?\s*(\d{2}-\d{8}-\d{1}|\d{11})',
-            'CUIL': r'(?:Representante|Gerente|Director).*?(?:CUIL).*?(?:No\.?|Numero|Número)?:?\s*(\d{2}-\d{8}-\d{1}|\d{11})'
+        # Palabras clave y formato del número del representante legal según el tipo de documento
+        rep_num_signals = {
+            'CC': (('CC',) + CEDULA_KINDS, _digits(6, 12)),
+            'CE': (('CE',), _digits(6, 12)),
+            'TI': (('TI',), _digits(6, 12)),
+            'PP': (('PASAPORTE',), _alphanumeric(6, 12)),
+            'CI': (('CI',) + CEDULA_KINDS, lambda n: n.is_panama_id or _digits(5, 12)(n)),
+            'DNI': (('DNI',), _digits(7, 8)),
+            'CUIT': (('CUIT',), lambda n: n.is_cuit or n.is_eleven_digits),
+            'CUIL': (('CUIL',), lambda n: n.is_cuit or n.is_eleven_digits)
         }
         
-        if doc_type in rep_num_patterns:
-            pattern = rep_num_patterns[doc_type]
-            match = re.search(pattern, ocr_markdown, re.IGNORECASE)
-            if match:
-                doc_number = match.group(1)
+        if doc_type in rep_num_signals:
+            doc_kinds, predicate = rep_num_signals[doc_type]
+            number = scan_ocr(ocr_markdown).find_after_representative(doc_kinds, predicate)
+            if number:
+                doc_number = number.text
                 legal_rep['document_number'] = doc_number
                 logger.info(f"Número de documento del representante legal detectado por OCR: {doc_number}")
     
@@ -156,7 +166,7 @@ def validate_document_number(legal_rep: Dict[str, Any], country: str, ocr_markdo
         if doc_type == 'CC' and (len(clean_number) < 5 or len(clean_number) > 12):
             logger.warning(f"Posible número de documento colombiano inválido: {clean_number}, longitud: {len(clean_number)}")
         
-    elif 'panama' in country or 'panamá' in country:
+    elif 'panama' in country:
         # CI panameña generalmente sigue el formato X-XXX-XXXX
         if doc_type == 'CI':
             if '-' in doc_number:
@@ -177,7 +187,7 @@ def validate_document_number(legal_rep: Dict[str, Any], country: str, ocr_markdo
         elif (doc_type == 'CUIT' or doc_type == 'CUIL') and len(clean_number) != 11:
             logger.warning(f"CUIT/CUIL debería tener 11 dígitos, encontrado: {len(clean_number)}")
         
-    elif 'peru' in country or 'perú' in country:
+    elif 'peru' in country:
         # DNI peruano tiene 8 dígitos
         if doc_type == 'DNI' and len(clean_number) != 8:
             logger.warning(f"DNI peruano debería tener 8 dígitos, encontrado: {len(clean_number)}")
@@ -1,6 +1,6 @@
-import re
 from typing import Dict, Any
 from utils.logger import logger
+from utils.post_processing.utils.ocr_signals import scan_ocr
 
 def validate_tax_document(tax_info: Dict[str, Any], country: str, data: Dict[str, Any], ocr_markdown: str = "") -> None:
     """
@@ -28,36 +28,39 @@ def validate_tax_document(tax_info: Dict[str, Any], country: str, data: Dict[str
     
     # Si el tax_document_type está vacío, intentar extraerlo del OCR
     if not current_type and ocr_markdown:
-        # Patrones para buscar el tipo de documento en el OCR
-        type_patterns = {
+        # Señales del OCR que indican el tipo de documento, en orden de prioridad
+        # (etiqueta seguida de un número, o mención explícita del documento)
+        type_signals = {
             'colombia': [
-                (r'NIT\s*:?\s*\d', 'NIT'),
-                (r'C[eé]dula\s*de\s*Ciudadan[ií]a', 'CC'),
-                (r'C\.?C\.?\s*:?\s*\d', 'CC'),
-                (r'C[eé]dula\s*de\s*Extranjer[ií]a', 'CE'),
-                (r'C\.?E\.?\s*:?\s*\d', 'CE')
+                (('NIT',), True, 'NIT'),
+                (('CEDULA_CIUDADANIA',), False, 'CC'),
+                (('CC',), True, 'CC'),
+                (('CEDULA_EXTRANJERIA',), False, 'CE'),
+                (('CE',), True, 'CE')
             ],
             'panama': [
-                (r'RUC\s*:?\s*\d', 'RUC'),
-                (r'C[eé]dula\s*de\s*Identidad', 'CI'),
-                (r'C\.?I\.?\s*:?\s*\d', 'CI')
+                (('RUC',), True, 'RUC'),
+                (('CEDULA_IDENTIDAD',), False, 'CI'),
+                (('CI',), True, 'CI')
             ],
             'argentina': [
-                (r'CUIT\s*:?\s*\d', 'CUIT'),
-                (r'CUIL\s*:?\s*\d', 'CUIL'),
-                (r'DNI\s*:?\s*\d', 'DNI')
+                (('CUIT',), True, 'CUIT'),
+                (('CUIL',), True, 'CUIL'),
+                (('DNI',), True, 'DNI')
             ],
             'peru': [
-                (r'RUC\s*:?\s*\d', 'RUC'),
-                (r'DNI\s*:?\s*\d', 'DNI')
+                (('RUC',), True, 'RUC'),
+                (('DNI',), True, 'DNI')
             ]
         }
         
-        # Buscar patrones en el OCR para el país detectado
-        for c, patterns in type_patterns.items():
+        # Consultar el índice de señales del OCR para el país detectado
+        signals = scan_ocr(ocr_markdown)
+        for c, candidates in type_signals.items():
             if c in country:
-                for pattern, doc_type in patterns:
-                    if re.search(pattern, ocr_markdown, re.IGNORECASE):
+                for kinds, needs_number, doc_type in candidates:
+                    found = signals.has_labeled_number(*kinds) if needs_number else signals.has(*kinds)
+                    if found:
                         current_type = doc_type
                         logger.info(f"Tipo de documento fiscal '{doc_type}' detectado por OCR")
                         break
@@ -34,11 +34,11 @@ def validate_tax_id(tax_info: Dict[str, Any], country: str, ocr_markdown: str =
     # Validaciones específicas por país
     if 'colombia' in country:
         _validate_colombia_tax_id(tax_info, doc_type, tax_id, clean_id)
-    elif 'panama' in country or 'panamá' in country:
+    elif 'panama' in country:
         _validate_panama_tax_id(tax_info, tax_id, clean_id)
     elif 'argentina' in country:
         _validate_argentina_tax_id(tax_info, doc_type, tax_id, clean_id)
-    elif 'peru' in country or 'perú' in country:
+    elif 'peru' in country:
         _validate_peru_tax_id(tax_info, doc_type, clean_id)
     
     # Actualizar con el ID limpio
@@ -0,0 +1,119 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from typing import NamedTuple, Optional
+
+from fastapi import UploadFile
+
+from utils.logger import logger
+
+
+class UploadTooLargeError(Exception):
+    """Se lanza cuando el archivo subido supera el tamaño máximo permitido."""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"El archivo supera el tamaño máximo permitido de {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+class SpooledUpload(NamedTuple):
+    path: str
+    size: int
+    content_hash: str
+
+
+class BufferedUpload(NamedTuple):
+    data: bytes
+    content_hash: str
+
+
+class ReceivedUpload(NamedTuple):
+    """Archivo recibido y listo para el pipeline: en disco (PDF) o en memoria (imagen)."""
+    filename: str
+    file_ext: str
+    content_hash: str
+    path: Optional[str] = None
+    data: Optional[bytes] = None
+
+
+async def spool_upload(upload: UploadFile, suffix: str, spool_dir: str, max_bytes: int, chunk_size: int) -> SpooledUpload:
+    """Copia por bloques un archivo subido a un archivo temporal único.
+
+    La memoria usada es la de un bloque sin importar el tamaño del archivo, y el SHA-256
+    se calcula durante la copia para no volver a leer el archivo. Las escrituras se hacen
+    en un hilo para no bloquear el event loop.
+
+    :param upload: Archivo recibido por FastAPI.
+    :param suffix: Extensión del archivo temporal (se conserva para detectar el tipo).
+    :param spool_dir: Directorio donde se crean los archivos temporales.
+    :param max_bytes: Tamaño máximo permitido en bytes.
+    :param chunk_size: Tamaño de cada bloque leído.
+    :return: Ruta, tamaño y hash del archivo temporal.
+    :raises UploadTooLargeError: Si el archivo supera max_bytes; el temporal se elimina.
+    """
+    os.makedirs(spool_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix="upload-", dir=spool_dir)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(max_bytes)
+                await asyncio.to_thread(_write_chunk, buffer, digest, chunk)
+    except BaseException:
+        remove_spooled_file(path)
+        raise
+    return SpooledUpload(path=path, size=size, content_hash=digest.hexdigest())
+
+
+def _write_chunk(buffer, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    buffer.write(chunk)
+
+
+async def read_upload(upload: UploadFile, max_bytes: int, chunk_size: int) -> BufferedUpload:
+    """Lee por bloques un archivo subido a memoria, aplicando el tamaño máximo durante la lectura.
+
+    Se usa para imágenes, que se procesan sin pasar por un archivo temporal.
+
+    :param upload: Archivo recibido por FastAPI.
+    :param max_bytes: Tamaño máximo permitido en bytes.
+    :param chunk_size: Tamaño de cada bloque leído.
+    :return: Contenido y hash SHA-256 del archivo.
+    :raises UploadTooLargeError: Si el archivo supera max_bytes.
+    """
+    digest = hashlib.sha256()
+    chunks = []
+    size = 0
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLargeError(max_bytes)
+        digest.update(chunk)
+        chunks.append(chunk)
+    return BufferedUpload(data=b"".join(chunks), content_hash=digest.hexdigest())
+
+
+def remove_spooled_file(path: str) -> None:
+    """Elimina un archivo temporal, registrando el error sin propagarlo."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Error deleting file: {e}")
+
+
+def discard_received_upload(received: ReceivedUpload) -> None:
+    """Libera el archivo temporal de una carga recibida, si lo tiene."""
+    if received.path is not None:
+        remove_spooled_file(received.path)